@@ -26,8 +26,9 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging; LOG_LEVEL=DEBUG for verbose output (filter decisions are
+# traced per query instead, see FILTER_TRACE_SAMPLE_RATE and /api/explain)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 # initialize the app with the extension
 db.init_app(app)
@@ -38,4 +39,11 @@ with app.app_context():
     import routes  # noqa: F401
     
     # Create all tables
-    db.create_all()
\ No newline at end of file
+    db.create_all()
+    models.upgrade_schema()
+
+# Parse the profile dataset once per process. Run Gunicorn with --preload so
+# this happens before forking and workers share the parsed data.
+if os.environ.get("PRELOAD_PROFILE_STORE", "1") == "1":
+    from profile_store import preload_profile_store
+    preload_profile_store()
@@ -1,80 +1,182 @@
-import time
 import logging
-from datetime import datetime, timedelta
-from models import FilterRequest
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from itertools import chain
+from models import FilterRequest, Job
 from brightdata_service import BrightDataService
+from job_queue import JobWorkerPool, RetryLater, enqueue_job, notify_request_finished
+from profile_ingest import PROFILE_INGEST, ProfileIngestor
+from profile_store import get_profile_store
 from app import db, app
 
 logger = logging.getLogger(__name__)
 
-def process_pending_requests():
-    """Background processor to check and complete pending API requests"""
-    with app.app_context():
-        service = BrightDataService()
-        
-        # Get pending requests older than 30 seconds
-        cutoff_time = datetime.utcnow() - timedelta(seconds=30)
-        pending_requests = FilterRequest.query.filter(
-            FilterRequest.status == 'building',
-            FilterRequest.created_at <= cutoff_time
-        ).all()
+SNAPSHOT_JOB = "snapshot"
+
+# Seconds between checks of every waiting snapshot, which run ready ones ahead of their backoff
+SNAPSHOT_EXPEDITE_INTERVAL = float(os.environ.get("SNAPSHOT_EXPEDITE_INTERVAL", 10))
+# Seconds between sweeps for requests without a job and requests whose job gave up
+MAINTENANCE_INTERVAL = 60
+
+_service = BrightDataService()
+
+
+def enqueue_snapshot_job(filter_request: FilterRequest) -> Job:
+    """Queue processing of a request's Bright Data snapshot (commit to submit it)"""
+    return enqueue_job(SNAPSHOT_JOB, filter_request.id)
+
+
+def enqueue_building_requests() -> int:
+    """Queue a job for every building request that was created without one"""
+    queued = db.session.query(Job.filter_request_id).filter(
+        Job.kind == SNAPSHOT_JOB,
+        Job.filter_request_id.isnot(None)
+    )
+    pending_requests = FilterRequest.query.filter(
+        FilterRequest.status == 'building',
+        FilterRequest.snapshot_id.isnot(None),
+        FilterRequest.id.notin_(queued)
+    ).all()
+    
+    for request in pending_requests:
+        enqueue_snapshot_job(request)
+    db.session.commit()
+    
+    logger.info(f"Queued {len(pending_requests)} pending requests")
+    return len(pending_requests)
+
+
+def process_snapshot_job(job: Job):
+    """Check a request's snapshot and, once it is ready, download and filter it"""
+    request = db.session.get(FilterRequest, job.filter_request_id)
+    if request is None or request.status != 'building':
+        return
+    
+    # Check snapshot status
+    is_ready, status_msg = _service.check_snapshot_status(request.snapshot_id)
+    
+    if not is_ready:
+        # Still building, or a transient error talking to the API
+        raise RetryLater(status_msg)
+    
+    # Download and process data; request errors propagate and the job is retried with backoff
+    profiles = _service.download_snapshot(request.snapshot_id)
+    
+    if profiles is None:
+        raise RetryLater("Snapshot is still building")
+    
+    # Merge the downloaded profiles into the local profile store as they stream past
+    ingestor = ProfileIngestor(get_profile_store()) if PROFILE_INGEST else None
+    if ingestor is not None:
+        profiles = ingestor.tee(profiles)
+    
+    # Profiles are streamed from the download; peek to tell an empty snapshot apart
+    first_profile = next(profiles, None)
+    
+    if first_profile is not None:
+        # Apply additional filters
+        filtered_profiles = _service.apply_additional_filter(
+            chain([first_profile], profiles),
+            extra_company=request.extra_company or "",
+            linkedin_url=request.linkedin_url or "",
+            job_title=request.job_title or ""
+        )
         
-        logger.info(f"Processing {len(pending_requests)} pending requests")
+        # Update request with results
+        request.status = 'completed'
+        request.completed_at = datetime.utcnow()
+        request.result_count = len(filtered_profiles)
+        request.set_results(filtered_profiles)
         
-        for request in pending_requests:
-            try:
-                # Check snapshot status
-                is_ready, status_msg = service.check_snapshot_status(request.snapshot_id)
-                
-                if is_ready:
-                    # Download and process data
-                    profiles = service.download_snapshot(request.snapshot_id)
-                    
-                    if profiles:
-                        # Apply additional filters
-                        filtered_profiles = service.apply_additional_filter(
-                            profiles,
-                            extra_company=request.extra_company or "",
-                            linkedin_url=request.linkedin_url or "",
-                            job_title=request.job_title or ""
-                        )
-                        
-                        # Update request with results
-                        request.status = 'completed'
-                        request.completed_at = datetime.utcnow()
-                        request.result_count = len(filtered_profiles)
-                        request.set_results(filtered_profiles)
-                        
-                        logger.info(f"Request {request.id} completed with {len(filtered_profiles)} results")
-                    else:
-                        # No data returned
-                        request.status = 'failed'
-                        request.completed_at = datetime.utcnow()
-                        logger.warning(f"Request {request.id} failed - no data returned")
-                        
-                    db.session.commit()
-                    
-                elif "error" in status_msg.lower():
-                    # Error occurred
-                    request.status = 'failed'
-                    request.completed_at = datetime.utcnow()
-                    db.session.commit()
-                    logger.error(f"Request {request.id} failed: {status_msg}")
-                    
-                # If still building, leave as is
-                    
-            except Exception as e:
-                logger.error(f"Error processing request {request.id}: {str(e)}")
-                request.status = 'failed'
-                request.completed_at = datetime.utcnow()
-                db.session.commit()
+        logger.info(f"Request {request.id} completed with {len(filtered_profiles)} results")
+    else:
+        # No data returned
+        request.status = 'failed'
+        request.completed_at = datetime.utcnow()
+        logger.warning(f"Request {request.id} failed - no data returned")
+    
+    if ingestor is not None:
+        ingestor.finish()
+    
+    db.session.commit()
+    notify_request_finished(request)
+
+
+JOB_HANDLERS = {SNAPSHOT_JOB: process_snapshot_job}
+
+
+def expedite_ready_snapshots() -> int:
+    """
+    Check the snapshots of all jobs waiting out a backoff concurrently and make
+    the ones that are ready due now, so they are not held back by the backoff
+    """
+    waiting = db.session.query(Job, FilterRequest.snapshot_id).join(
+        FilterRequest, Job.filter_request_id == FilterRequest.id
+    ).filter(
+        Job.kind == SNAPSHOT_JOB,
+        Job.status == 'queued',
+        Job.run_after > datetime.utcnow(),
+        FilterRequest.snapshot_id.isnot(None)
+    ).all()
+    if not waiting:
+        return 0
+    
+    statuses = _service.check_snapshot_statuses(list({snapshot_id for _, snapshot_id in waiting}))
+    ready = 0
+    for job, snapshot_id in waiting:
+        if statuses[snapshot_id][0]:
+            job.run_after = datetime.utcnow()
+            ready += 1
+    db.session.commit()
+    
+    if ready:
+        logger.info(f"{ready} of {len(waiting)} waiting snapshots are ready")
+    return ready
+
+
+def fail_abandoned_requests():
+    """Mark requests failed whose snapshot job gave up after its last attempt"""
+    abandoned = FilterRequest.query.join(Job, Job.filter_request_id == FilterRequest.id).filter(
+        Job.kind == SNAPSHOT_JOB,
+        Job.status == 'failed',
+        FilterRequest.status == 'building'
+    ).all()
+    for request in abandoned:
+        request.status = 'failed'
+        request.completed_at = datetime.utcnow()
+        db.session.commit()
+        notify_request_finished(request)
+
 
 if __name__ == "__main__":
-    # Run background processor
-    while True:
-        try:
-            process_pending_requests()
-        except Exception as e:
-            logger.error(f"Background processor error: {str(e)}")
-        
-        time.sleep(30)  # Check every 30 seconds
\ No newline at end of file
+    # Run background processor: a pool of workers draining the job queue.
+    # Several processes can run this at once; jobs are claimed atomically.
+    with app.app_context():
+        enqueue_building_requests()
+    
+    pool = JobWorkerPool(JOB_HANDLERS)
+    pool.start()
+    
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    last_maintenance = time.monotonic()
+    try:
+        while not stopping.wait(SNAPSHOT_EXPEDITE_INTERVAL):
+            with app.app_context():
+                try:
+                    if expedite_ready_snapshots():
+                        pool.wake()
+                    if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                        last_maintenance = time.monotonic()
+                        enqueue_building_requests()
+                        fail_abandoned_requests()
+                except Exception as e:
+                    logger.error(f"Background processor error: {str(e)}")
+                    db.session.rollback()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Synthetic profile CSVs for benchmarking, in the same format as the real
+dataset (Python-literal experience and current_company cells).
+
+Companies follow a Zipf-like popularity curve over a pool that grows with
+the row count, so a popular company matches a similar share of profiles at
+every size. The anchor companies used by the benchmark queries (see
+run_benchmarks.QUERIES) sit near the top of the curve. Experience depth is
+skewed like real profiles: most have a handful of entries, a few have many.
+Some titles, LinkedIn URLs and cells are missing or malformed, as in the
+real data. Rows are written as they are generated, so memory stays flat.
+
+Usage:
+    python benchmarks/generate_profiles.py <rows> <output.csv> [seed]
+"""
+
+import csv
+import itertools
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_engine import TITLE_CATEGORIES  # noqa: E402
+
+# (name, LinkedIn slug) of the companies the benchmark queries search for
+ANCHOR_COMPANIES = [("Kast", "kast"), ("Abound", "abound"), ("Chainlink Labs", "chainlink-labs")]
+
+COMPANY_WORDS = ["Blue", "Nova", "Quantum", "Apex", "Bright", "Iron", "Silver", "Atlas", "Vertex", "Lumen",
+                 "Cobalt", "Harbor", "Summit", "Pioneer", "Crest", "Echo", "Falcon", "Granite", "Helix", "Orbit"]
+COMPANY_SUFFIXES = ["Labs", "Capital", "Systems", "Technologies", "Group", "Partners", "Networks", "Health",
+                    "Finance", "Studio", "AI", "Protocol", "Ventures", "Analytics", "Software", "Inc"]
+FIRST_NAMES = ["Alice", "Bob", "Carol", "Dan", "Eve", "Farah", "Gabriel", "Hana", "Ivan", "Julia", "Kenji",
+               "Lena", "Mateo", "Nina", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tariq", "Uma", "Victor"]
+LAST_NAMES = ["Smith", "Jones", "White", "Brown", "Black", "Garcia", "Müller", "Nguyen", "Okafor", "Rossi",
+              "Sato", "Kowalski", "Haddad", "Silva", "Johansson", "Patel", "Kim", "Dubois", "Yilmaz", "Cohen"]
+CITIES = ["New York, New York, United States", "London, England, United Kingdom", "Berlin, Germany",
+          "Singapore", "San Francisco Bay Area", "Lisbon, Portugal", "İstanbul, Türkiye", "Toronto, Canada", ""]
+SENIORITY = ["", "", "Senior ", "Junior ", "Lead ", "Principal ", "Associate "]
+DESCRIPTION_WORDS = ["built", "led", "scaled", "shipped", "designed", "managed", "launched", "growth", "platform",
+                     "team", "revenue", "customers", "infrastructure", "strategy", "product", "market", "data"]
+
+# Experience entries per profile and how often each count occurs
+EXPERIENCE_DEPTHS = list(range(16))
+EXPERIENCE_WEIGHTS = [4, 9, 14, 16, 15, 12, 9, 7, 5, 3, 2, 1.5, 1, 0.7, 0.5, 0.3]
+
+ACRONYMS = {"ceo", "cfo", "hr", "ux", "ui", "vp"}
+TITLES = sorted({title for titles in TITLE_CATEGORIES.values() for title in titles if not title.endswith(" of")})
+FREE_TITLES = ["Founder & CEO", "Co-Founder", "Chief Executive Officer", "Intern", "Board Member",
+               "Research Scientist", "Community Lead", "Head of Growth", "Investor", "Volunteer"]
+
+
+def company_pool(rows: int, rng: random.Random) -> List[Dict[str, str]]:
+    """Companies in popularity order, anchors near the top"""
+    size = max(50, rows // 25)
+    names = set()
+    pool = []
+    for first, second, suffix in itertools.product(COMPANY_WORDS, COMPANY_WORDS + [""], COMPANY_SUFFIXES):
+        name = " ".join(part for part in (first, second, suffix) if part)
+        if name not in names:
+            names.add(name)
+            pool.append(name)
+    rng.shuffle(pool)
+    while len(pool) < size:
+        pool.append(f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} {len(pool)}")
+
+    companies = [{"name": name, "slug": name.lower().replace(" ", "-")} for name in pool[:size]]
+    for rank, (name, slug) in enumerate(ANCHOR_COMPANIES):
+        companies.insert(2 + rank * 3, {"name": name, "slug": slug})
+    return companies
+
+
+def company_url(company: Dict[str, str], rng: random.Random) -> str:
+    """The company's LinkedIn URL in one of the forms found in the data"""
+    prefix = rng.choice(["https://www.", "https://www.", "https://", "http://", "www.", ""])
+    suffix = rng.choice(["", "", "/", "/about/", "?trk=public_profile"])
+    return f"{prefix}linkedin.com/company/{company['slug']}{suffix}"
+
+
+def job_title(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.08:
+        return ""
+    if roll < 0.2:
+        return rng.choice(FREE_TITLES)
+    words = (rng.choice(SENIORITY) + rng.choice(TITLES)).split()
+    return " ".join(word.upper() if word in ACRONYMS else word if word == "of" else word.capitalize() for word in words)
+
+
+def experience_entry(company: Dict[str, str], rng: random.Random, year: int) -> Dict[str, Any]:
+    entry = {
+        "title": job_title(rng),
+        "company": company["name"],
+        "location": rng.choice(CITIES),
+        "start_date": f"{year}",
+        "end_date": f"{year + rng.randint(1, 4)}" if rng.random() < 0.8 else "Present",
+        "duration": f"{rng.randint(1, 4)} years",
+        "description": " ".join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(0, 40))),
+    }
+    roll = rng.random()
+    if roll < 0.6:
+        entry["url"] = company_url(company, rng)
+    elif roll < 0.75:
+        entry["company_linkedin_url"] = company_url(company, rng)
+    elif roll < 0.8:
+        entry["url"] = None
+    return entry
+
+
+def generate_row(index: int, companies: List[Dict[str, str]], cum_weights: List[float],
+                 rng: random.Random) -> Dict[str, Any]:
+    depth = rng.choices(EXPERIENCE_DEPTHS, EXPERIENCE_WEIGHTS)[0]
+    employers = rng.choices(companies, cum_weights=cum_weights, k=depth + 1)
+    current = employers[0]
+    experiences = [experience_entry(company, rng, 2024 - position * 2) for position, company in enumerate(employers[:depth])]
+    current_title = experiences[0]["title"] if experiences else job_title(rng)
+
+    current_company = {"name": current["name"]}
+    if rng.random() < 0.75:
+        current_company["link"] = company_url(current, rng)
+    if current_title and rng.random() < 0.5:
+        current_company["title"] = current_title
+
+    roll = rng.random()
+    if roll < 0.85:
+        experience_cell = repr(experiences)
+    elif roll < 0.97:
+        experience_cell = ""
+    else:
+        experience_cell = repr(experiences)[:40]  # truncated cell, as in some scraped rows
+
+    last_name = rng.choice(LAST_NAMES)
+    if rng.random() < 0.25:
+        last_name = f"{last_name}-{rng.choice(LAST_NAMES)}"
+    name = f"{rng.choice(FIRST_NAMES)} {chr(ord('A') + rng.randrange(26))}. {last_name}"
+    return {
+        "name": name,
+        "url": f"https://www.linkedin.com/in/{name.lower().replace('. ', '-').replace(' ', '-')}-{index:x}",
+        "city": rng.choice(CITIES),
+        "position": f"{current_title} at {current['name']}" if current_title and rng.random() < 0.7 else "",
+        "avatar": f"https://media.licdn.com/dms/image/{index:08x}/profile" if rng.random() < 0.6 else "",
+        "current_company": repr(current_company) if rng.random() < 0.95 else "",
+        "current_company_name": current["name"] if rng.random() < 0.9 else "",
+        "title": current_title if rng.random() < 0.8 else "",
+        "experience": experience_cell,
+        "company_linkedin_link": company_url(current, rng) if "link" in current_company else "",
+    }
+
+
+def generate_profiles(rows: int, output_path: str, seed: int = 1) -> str:
+    """Write rows synthetic profiles to output_path and return the path"""
+    rng = random.Random(seed)
+    companies = company_pool(rows, rng)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(companies))))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    partial_path = f"{output_path}.partial"
+    with open(partial_path, 'w', newline='', encoding='utf-8') as f:
+        writer = None
+        for index in range(rows):
+            row = generate_row(index, companies, cum_weights, rng)
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+    os.replace(partial_path, output_path)
+    return output_path
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1])
+    path = sys.argv[2]
+    generate_profiles(row_count, path, int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+    print(f"Wrote {row_count} profiles to {path}")
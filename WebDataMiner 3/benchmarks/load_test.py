@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the Flask routes.
+
+Starts a local app instance on a synthetic dataset (see generate_profiles)
+with a fresh SQLite database, or the PostgreSQL database given with
+--database-url. It can also target an instance that is already running
+(--url). Each virtual user is a thread with its own HTTP session that runs
+a scripted mix of traffic in a closed loop:
+- search: POST /filter with a company from the dataset, sometimes with a
+  LinkedIn URL or job title; repeated searches hit the result cache
+- results: GET /results/<id> for one of its searches (template rendering)
+- api: GET /api/results/<id> pages, as the results page loads them
+- download: GET /download/<id> in json, ndjson or csv, gzip-compressed
+
+The mix is run at each concurrency level for a fixed duration after a
+warm-up. Per route and level it reports throughput, error rate, latency
+percentiles and a latency histogram.
+
+Usage:
+    python benchmarks/load_test.py [--rows 10000] [--concurrency 1,4,16] [--duration 30] [--save report.json]
+    python benchmarks/load_test.py --server gunicorn --workers 4 --database-url postgresql://localhost/web3leads
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --companies "Kast,Abound"
+"""
+
+import argparse
+import bisect
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, APP_DIR)
+
+from generate_profiles import ANCHOR_COMPANIES, company_pool, generate_profiles  # noqa: E402
+from run_benchmarks import DEFAULT_DATA_DIR, git_commit, percentile  # noqa: E402
+
+DEFAULT_MIX = {"search": 2, "results": 2, "api": 5, "download": 1}
+JOB_TITLES = ["", "", "", "CEO", "manager", "engineer", "Director", "data"]
+EXPORT_FORMATS = ["json", "ndjson", "csv"]
+
+# Upper bounds of the latency histogram, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class RouteStats:
+    """Latencies and outcomes of one route at one concurrency level"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.bytes = 0
+
+    def record(self, latency_ms: float, error: Optional[str], size: int):
+        self.latencies_ms.append(latency_ms)
+        self.bytes += size
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        values = sorted(self.latencies_ms)
+        error_count = sum(self.errors.values())
+        histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for value in values:
+            histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+        return {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / duration, 2),
+            "errors": error_count,
+            "error_rate": round(error_count / len(values), 4) if values else 0.0,
+            "error_kinds": dict(self.errors),
+            "p50_ms": round(percentile(values, 0.5), 2) if values else None,
+            "p90_ms": round(percentile(values, 0.9), 2) if values else None,
+            "p99_ms": round(percentile(values, 0.99), 2) if values else None,
+            "max_ms": round(values[-1], 2) if values else None,
+            "mean_bytes": self.bytes // len(values) if values else 0,
+            "histogram_ms": {("+Inf" if index == len(LATENCY_BUCKETS_MS) else str(LATENCY_BUCKETS_MS[index])): count
+                             for index, count in enumerate(histogram)},
+        }
+
+
+class VirtualUser(threading.Thread):
+    """One client session running the traffic mix until stopped"""
+
+    def __init__(self, index: int, base_url: str, companies: List[Tuple[str, str]], mix: Dict[str, float],
+                 stats: Dict[str, RouteStats], lock: threading.Lock, stop: threading.Event, seed: int):
+        super().__init__(name=f"virtual-user-{index}", daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.companies = companies
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+        self.stats = stats
+        self.lock = lock
+        self.stop = stop
+        self.recording = False
+        self.rng = random.Random(seed * 1000 + index)
+        self.http = requests.Session()
+        self.request_ids: List[Tuple[int, int]] = []  # (request id, result count)
+
+    def run(self):
+        while not self.stop.is_set():
+            action = self.rng.choices(self.actions, self.weights)[0]
+            if action == "search" or not self.request_ids:
+                self.search()
+            elif action == "results":
+                request_id, _ = self.rng.choice(self.request_ids)
+                self.call("GET /results/<id>", "GET", f"/results/{request_id}")
+            elif action == "api":
+                request_id, result_count = self.rng.choice(self.request_ids)
+                offset = self.rng.randrange(0, max(result_count, 1), 24) if result_count else 0
+                self.call("GET /api/results/<id>", "GET", f"/api/results/{request_id}",
+                          params={"offset": offset, "limit": 24})
+            elif action == "download":
+                request_id, _ = self.rng.choice(self.request_ids)
+                self.call("GET /download/<id>", "GET", f"/download/{request_id}",
+                          params={"format": self.rng.choice(EXPORT_FORMATS)}, stream=True)
+
+    def search(self):
+        company, slug = self.rng.choice(self.companies)
+        form = {"base_company": company}
+        if slug and self.rng.random() < 0.4:
+            form["linkedin_url"] = f"https://www.linkedin.com/company/{slug}/"
+        form["job_title"] = self.rng.choice(JOB_TITLES)
+        body = self.call("POST /filter", "POST", "/filter", data=form)
+        if body and body.get("success"):
+            self.request_ids.append((body["request_id"], body.get("result_count") or 0))
+            del self.request_ids[:-20]
+
+    def call(self, route: str, method: str, path: str, stream: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        """Run one request, record it under route, and return the JSON body of JSON responses"""
+        error = None
+        size = 0
+        body = None
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=120, allow_redirects=False,
+                                         stream=stream, headers={"Accept-Encoding": "gzip"}, **kwargs)
+            if stream:
+                for chunk in response.raw.stream(64 * 1024, decode_content=False):
+                    size += len(chunk)
+            else:
+                size = len(response.content)
+            if response.status_code >= 300:
+                error = f"HTTP {response.status_code}"
+            elif response.headers.get("Content-Type", "").startswith("application/json") and not stream:
+                body = response.json()
+        except requests.RequestException as e:
+            error = type(e).__name__
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        if self.recording:
+            with self.lock:
+                self.stats.setdefault(route, RouteStats()).record(latency_ms, error, size)
+        return body
+
+
+def run_level(base_url: str, concurrency: int, duration: float, warmup: float, companies: List[Tuple[str, str]],
+              mix: Dict[str, float], seed: int) -> Dict[str, Any]:
+    """Run the mix with concurrency virtual users; only requests after the warm-up are recorded"""
+    stats: Dict[str, RouteStats] = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+    users = [VirtualUser(index, base_url, companies, mix, stats, lock, stop, seed) for index in range(concurrency)]
+    for user in users:
+        user.start()
+
+    time.sleep(warmup)
+    for user in users:
+        user.recording = True
+    started = time.perf_counter()
+    time.sleep(duration)
+    for user in users:
+        user.recording = False
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for user in users:
+        user.join(130)
+
+    routes = {route: route_stats.summary(elapsed) for route, route_stats in sorted(stats.items())}
+    total_requests = sum(route["requests"] for route in routes.values())
+    total_errors = sum(route["errors"] for route in routes.values())
+    return {
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "routes": routes,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(csv_path: str, server: str, workers: int, database_url: str, log_level: str,
+                 startup_timeout: float, log_path: str) -> Tuple[subprocess.Popen, str]:
+    """Launch the app on a free local port, logging to log_path, and wait until it answers"""
+    port = free_port()
+    env = dict(os.environ, PROFILE_CSV_PATH=csv_path, DATABASE_URL=database_url, LOG_LEVEL=log_level,
+               PROFILE_INGEST="0")
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "--preload", "--workers", str(workers), "--threads", "4",
+                   "--bind", f"127.0.0.1:{port}", "--log-level", log_level.lower(), "main:app"]
+    else:
+        command = [sys.executable, "-c",
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    with open(log_path, 'ab') as log_file:
+        process = subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{server} exited with status {process.returncode} during start-up, see {log_path}")
+        try:
+            if requests.get(base_url + "/", timeout=5).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{server} did not answer within {startup_timeout:.0f}s, see {log_path}")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def search_companies(rows: int, seed: int, count: int = 40) -> List[Tuple[str, str]]:
+    """(name, LinkedIn slug) of companies to search for: the anchors, popular companies and a few misses"""
+    pool = company_pool(rows, random.Random(seed))
+    companies = [(company["name"], company["slug"]) for company in pool[:count]]
+    companies += list(ANCHOR_COMPANIES) * 3
+    companies += [("Nonexistent Holdings", ""), ("Zzyzx", "")]
+    return companies
+
+
+def print_report(report: Dict[str, Any]):
+    for level in report["levels"]:
+        print(f"\nconcurrency {level['concurrency']}: {level['throughput_rps']} req/s, "
+              f"error rate {level['error_rate']:.2%}")
+        print(f"  {'route':<24} {'req':>6} {'req/s':>8} {'err%':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+        for route, stats in level["routes"].items():
+            print(f"  {route:<24} {stats['requests']:>6} {stats['throughput_rps']:>8} {stats['error_rate']:>7.2%} "
+                  f"{stats['p50_ms']:>9} {stats['p90_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        action, _, weight = part.partition("=")
+        if action.strip() not in DEFAULT_MIX:
+            raise ValueError(f"unknown action {action.strip()!r}, expected one of {', '.join(DEFAULT_MIX)}")
+        mix[action.strip()] = float(weight)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the Flask routes")
+    parser.add_argument("--url", help="test a running instance instead of starting one")
+    parser.add_argument("--rows", type=int, default=10_000, help="synthetic dataset size for a started instance")
+    parser.add_argument("--csv", help="profile CSV for a started instance instead of a synthetic one")
+    parser.add_argument("--server", choices=("flask", "gunicorn"), default="gunicorn",
+                        help="how to start the instance (gunicorn needs to be installed)")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn worker processes")
+    parser.add_argument("--database-url", help="database for a started instance (default: a fresh SQLite file)")
+    parser.add_argument("--log-level", default="WARNING", help="LOG_LEVEL of a started instance")
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--companies", help="comma-separated companies to search for (default: from the dataset)")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated numbers of virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before each level")
+    parser.add_argument("--mix", default=",".join(f"{action}={weight}" for action, weight in DEFAULT_MIX.items()),
+                        help="relative weights of search, results, api and download")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.companies:
+        companies = [(company.strip(), "") for company in args.companies.split(",") if company.strip()]
+    else:
+        companies = search_companies(args.rows, args.seed)
+
+    process = None
+    temp_dir = tempfile.mkdtemp(prefix="load-test-")
+    base_url = args.url
+    try:
+        if base_url is None:
+            from profile_snapshot import compile_snapshot
+
+            csv_path = args.csv or os.path.join(args.data_dir, f"profiles_{args.rows}_{args.seed}.csv")
+            if not os.path.exists(csv_path):
+                generate_profiles(args.rows, csv_path, args.seed)
+            compile_snapshot(csv_path)
+
+            database_url = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'load_test.db')}"
+            os.makedirs(args.data_dir, exist_ok=True)
+            log_path = os.path.join(args.data_dir, "load_test_server.log")
+            process, base_url = start_server(csv_path, args.server, args.workers, database_url, args.log_level,
+                                             args.startup_timeout, log_path)
+            print(f"Started {args.server} at {base_url} on {csv_path}", file=sys.stderr)
+
+        report = {
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "commit": git_commit(),
+            "config": {"url": args.url, "rows": None if args.url or args.csv else args.rows, "csv": args.csv,
+                       "server": None if args.url else args.server, "workers": args.workers,
+                       "database": "external" if args.url else ("sqlite" if args.database_url is None else "custom"),
+                       "duration": args.duration, "warmup": args.warmup, "mix": mix, "seed": args.seed},
+            "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+            "levels": [],
+        }
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            print(f"Running {concurrency} virtual users for {args.duration:.0f}s", file=sys.stderr)
+            report["levels"].append(run_level(base_url, concurrency, args.duration, args.warmup, companies, mix,
+                                              args.seed))
+    finally:
+        if process is not None:
+            stop_server(process)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmark the profile filter on synthetic datasets.
+
+For every dataset size a fresh process generates (or reuses) a synthetic
+CSV, then measures:
+- load: parsing the CSV, compiling the snapshot and opening it, as workers do
+- queries: latency percentiles of filter_profiles for each engine and query,
+  the result count, the mean per-stage timings (filter_stats.FilterStats)
+  and the peak and retained Python allocations of one run (tracemalloc)
+- memory: RSS after loading, after the queries, and peak RSS of the process
+
+Engines are "vectorized" and "loop" (CSVDataService.filter_profiles),
+"parallel" (the loop engine sharded over --workers processes, see
+parallel_filter) and "stream" (apply_additional_filter over rows decoded from
+the snapshot, the path Bright Data downloads take). All but the vectorized
+engine walk every profile in Python, so they only run up to --slow-max-rows.
+
+Results can be saved as a JSON baseline and compared against a later run;
+the comparison exits with status 1 if any median latency, load time or peak
+RSS got worse by more than --threshold.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 10000,100000,1000000] [--save baseline.json]
+    python benchmarks/run_benchmarks.py --compare baseline.json [--save current.json]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from generate_profiles import generate_profiles  # noqa: E402
+
+# name -> (company_name, linkedin_url, job_title)
+QUERIES = {
+    "company": ("Kast", "", ""),
+    "company_linkedin": ("Kast", "linkedin.com/company/kast", ""),
+    "ceo_inference": ("Kast", "linkedin.com/company/kast", "CEO"),
+    "management_category": ("", "", "manager"),
+}
+
+ENGINES = ("vectorized", "loop", "parallel", "stream")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, "data")
+# Processes for the parallel engine; at least 2 so the sharded path runs on a single core too
+DEFAULT_WORKERS = max(2, os.cpu_count() or 1)
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linearly interpolated percentile of already sorted values"""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    values = sorted(value * 1000 for value in seconds)
+    return {
+        "runs": len(values),
+        "min_ms": round(values[0], 3),
+        "p50_ms": round(percentile(values, 0.5), 3),
+        "p90_ms": round(percentile(values, 0.9), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3),
+        "mean_ms": round(statistics.fmean(values), 3),
+    }
+
+
+def measure_allocations(run: Callable[[], Any]) -> Tuple[int, int]:
+    """
+    Bytes allocated by Python while run executes: the peak, and what is
+    still held once its result is released (e.g. caches built on first use)
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = run()
+        peak = tracemalloc.get_traced_memory()[1]
+        del result
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return peak - before, retained - before
+
+
+def benchmark_query(run: Callable[[], List[Dict[str, Any]]], run_with_stats: Callable[..., List[Dict[str, Any]]],
+                    repeat: int) -> Dict[str, Any]:
+    """Latency, result count, stage timings and allocations of one engine/query pair"""
+    from filter_stats import FilterMetrics, FilterStats
+
+    started = time.perf_counter()
+    results = run()
+    first_seconds = time.perf_counter() - started
+    result_count = len(results)
+    del results
+
+    timings = []
+    stage_totals: Dict[str, float] = {}
+    for _ in range(repeat):
+        stats = FilterStats(FilterMetrics())
+        started = time.perf_counter()
+        run_with_stats(stats)
+        timings.append(time.perf_counter() - started)
+        for stage, milliseconds in stats.to_dict()["timings_ms"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + milliseconds
+
+    alloc_peak, alloc_retained = measure_allocations(run)
+    return {
+        "results": result_count,
+        "first_ms": round(first_seconds * 1000, 3),
+        **latency_summary(timings),
+        "stages_ms": {stage: round(total / repeat, 3) for stage, total in stage_totals.items()},
+        "alloc_peak_bytes": alloc_peak,
+        "alloc_retained_bytes": alloc_retained,
+    }
+
+
+def benchmark_size(rows: int, data_dir: str, engines: List[str], repeat: int, slow_repeat: int,
+                   slow_max_rows: int, seed: int, workers: int) -> Dict[str, Any]:
+    """Generate, load and query one dataset size; runs in its own process so memory figures are per size"""
+    logging.basicConfig(level=logging.WARNING)
+    import parallel_filter
+    from csv_data_service import CSVDataService
+    from profile_snapshot import compile_snapshot
+
+    csv_path = os.path.join(data_dir, f"profiles_{rows}_{seed}.csv")
+    if not os.path.exists(csv_path):
+        started = time.perf_counter()
+        generate_profiles(rows, csv_path, seed)
+        print(f"  generated {csv_path} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    load: Dict[str, Any] = {"csv_bytes": os.path.getsize(csv_path)}
+    started = time.perf_counter()
+    service = CSVDataService(csv_path, use_snapshot=False)
+    load["csv_seconds"] = round(time.perf_counter() - started, 3)
+    del service
+
+    started = time.perf_counter()
+    snapshot_path = compile_snapshot(csv_path)
+    load["snapshot_compile_seconds"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    service = CSVDataService(csv_path, snapshot_path=snapshot_path)
+    load["snapshot_open_seconds"] = round(time.perf_counter() - started, 3)
+    load["rss_bytes"] = rss_bytes()
+    print(f"  {rows} rows: csv {load['csv_seconds']}s, snapshot compile {load['snapshot_compile_seconds']}s, "
+          f"open {load['snapshot_open_seconds']}s", file=sys.stderr)
+
+    queries: Dict[str, Dict[str, Any]] = {}
+    for engine in engines:
+        if engine != "vectorized" and rows > slow_max_rows:
+            queries[engine] = {"skipped": f"more than {slow_max_rows} rows"}
+            continue
+
+        # The parallel engine is the loop engine with sharding forced on, every other engine runs without it
+        parallel_filter.FILTER_WORKERS = workers if engine == "parallel" else 1
+        parallel_filter.FILTER_PARALLEL_MIN_PROFILES = 0
+        engine_results = {}
+        for name, (company_name, linkedin_url, job_title) in QUERIES.items():
+            if engine == "stream":
+                def run(stats=None):
+                    return service.apply_additional_filter(service.iter_records(), company_name, linkedin_url, job_title)
+                runs = slow_repeat
+            else:
+                def run(stats=None):
+                    return service.filter_profiles(company_name, linkedin_url, job_title,
+                                                   engine="loop" if engine == "parallel" else engine, stats=stats)
+                runs = repeat if engine == "vectorized" else slow_repeat
+
+            engine_results[name] = benchmark_query(run, run, runs)
+            print(f"  {rows} rows {engine:>10} {name:<20} p50 {engine_results[name]['p50_ms']:>10.2f}ms "
+                  f"({engine_results[name]['results']} results)", file=sys.stderr)
+        queries[engine] = engine_results
+        parallel_filter.FILTER_WORKERS = 1
+
+    return {
+        "rows": rows,
+        "load": load,
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "queries": queries,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: List[int], data_dir: str = DEFAULT_DATA_DIR, engines: Tuple[str, ...] = ENGINES,
+                   repeat: int = 20, slow_repeat: int = 3, slow_max_rows: int = 100_000, seed: int = 1,
+                   workers: int = DEFAULT_WORKERS) -> Dict[str, Any]:
+    """Benchmark every size in a fresh process and return the report"""
+    report = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"engines": list(engines), "repeat": repeat, "slow_repeat": slow_repeat,
+                   "slow_max_rows": slow_max_rows, "seed": seed, "workers": workers, "queries": QUERIES},
+        "sizes": {},
+    }
+    # Not a multiprocessing.Pool: its daemonic processes could not start the parallel engine's workers
+    context = multiprocessing.get_context("spawn")
+    for rows in sizes:
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            report["sizes"][str(rows)] = executor.submit(benchmark_size, rows, data_dir, list(engines), repeat,
+                                                         slow_repeat, slow_max_rows, seed, workers).result()
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print current against baseline and return a description of every
+    regression: a median latency, load time or peak RSS more than threshold
+    (a fraction) above the baseline. Differences below a small absolute
+    floor per unit are timer noise and never count.
+    """
+    regressions = []
+    floors = {"s": 0.05, "ms": 1.0, "MiB": 10.0}
+
+    def check(label: str, old: Optional[float], new: Optional[float], unit: str):
+        if old is None or new is None:
+            return
+        change = (new - old) / old if old else 0.0
+        flag = "REGRESSION" if change > threshold and new - old > floors[unit] else ""
+        print(f"{label:<58} {old:>12.2f} -> {new:>12.2f} {unit:<3} {change:>+8.1%} {flag}")
+        if flag:
+            regressions.append(f"{label}: {old:.2f} -> {new:.2f} {unit} ({change:+.1%})")
+
+    print(f"baseline {baseline.get('commit')} ({baseline.get('created_at')}) -> "
+          f"current {current.get('commit')} ({current.get('created_at')})")
+    for size, current_size in current["sizes"].items():
+        baseline_size = baseline["sizes"].get(size)
+        if baseline_size is None:
+            continue
+        for key in ("csv_seconds", "snapshot_compile_seconds", "snapshot_open_seconds"):
+            check(f"{size} load {key}", baseline_size["load"].get(key), current_size["load"].get(key), "s")
+        check(f"{size} peak RSS", baseline_size["peak_rss_bytes"] / 2 ** 20, current_size["peak_rss_bytes"] / 2 ** 20, "MiB")
+        for engine, engine_results in current_size["queries"].items():
+            baseline_engine = baseline_size["queries"].get(engine, {})
+            for name, result in engine_results.items():
+                if not isinstance(result, dict) or name not in baseline_engine:
+                    continue
+                check(f"{size} {engine} {name} p50", baseline_engine[name]["p50_ms"], result["p50_ms"], "ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the profile filter on synthetic datasets")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated dataset sizes in rows")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"comma-separated subset of {', '.join(ENGINES)}")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query for the vectorized engine")
+    parser.add_argument("--slow-repeat", type=int, default=3,
+                        help="timed runs per query for the loop, parallel and stream engines")
+    parser.add_argument("--slow-max-rows", type=int, default=100_000,
+                        help="largest dataset the loop, parallel and stream engines run on")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"processes for the parallel engine (default {DEFAULT_WORKERS})")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated CSVs are kept and reused")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fractional slowdown reported as a regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    engines = tuple(engine.strip() for engine in args.engines.split(",") if engine.strip())
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+
+    report = run_benchmarks([int(size) for size in args.sizes.split(",")], args.data_dir, engines,
+                            args.repeat, args.slow_repeat, args.slow_max_rows, args.seed, args.workers)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.save}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
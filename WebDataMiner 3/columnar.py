@@ -0,0 +1,121 @@
+import mmap
+import os
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from profile_index import NGRAM, NgramIndex
+from title_matcher import TitleMatcher
+
+Blob = Union[bytes, mmap.mmap]
+
+
+class StringColumn:
+    """
+    Immutable column of strings stored as a single UTF-8 blob plus an offsets array.
+
+    Value i lives at blob[offsets[i]:offsets[i + 1] - 1]; every value is followed
+    by a NUL separator so that substring scans over the whole blob can never
+    match across two rows. Columns can be written to disk and reopened with
+    mmap, which makes loading them a constant-time operation.
+    
+    A column can carry an NgramIndex, in which case substring lookups only
+    touch candidate rows instead of scanning the blob.
+    """
+
+    SEPARATOR = b"\x00"
+
+    def __init__(self, blob: Blob, offsets: np.ndarray, index: Optional[NgramIndex] = None):
+        self.blob = blob
+        self.offsets = offsets
+        self.index = index
+
+    @classmethod
+    def from_strings(cls, values: Iterable[str]) -> "StringColumn":
+        """Build an in-memory column from an iterable of strings"""
+        encoded = [value.encode('utf-8') + cls.SEPARATOR for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        start = int(self.offsets[index])
+        end = int(self.offsets[index + 1]) - 1
+        return self.blob[start:end].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def build_index(self) -> "StringColumn":
+        """Build the n-gram index for this column, returns self"""
+        self.index = NgramIndex.build(self)
+        return self
+    
+    def save(self, directory: str, name: str):
+        """Write the column as <name>.blob and <name>.offsets.npy, plus <name>.index/ if indexed"""
+        with open(os.path.join(directory, f"{name}.blob"), 'wb') as f:
+            f.write(self.blob)
+        np.save(os.path.join(directory, f"{name}.offsets.npy"), self.offsets)
+        if self.index is not None:
+            self.index.save(os.path.join(directory, f"{name}.index"))
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> "StringColumn":
+        """Open a saved column without reading it into memory"""
+        offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode='r')
+        index_path = os.path.join(directory, f"{name}.index")
+        index = NgramIndex.load(index_path) if os.path.isdir(index_path) else None
+        
+        blob_path = os.path.join(directory, f"{name}.blob")
+        if os.path.getsize(blob_path) == 0:
+            return cls(b"", offsets, index)
+        with open(blob_path, 'rb') as f:
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(blob, offsets, index)
+
+    def search_rows(self, pattern: "re.Pattern[bytes]") -> np.ndarray:
+        """
+        Sorted indices of the rows containing a match for a compiled bytes regex.
+        The scan runs over the whole blob in C; Python only sees the hits.
+        """
+        positions = np.fromiter((match.start() for match in pattern.finditer(self.blob)), dtype=np.int64)
+        if len(positions) == 0:
+            return positions
+        rows = np.searchsorted(self.offsets, positions, side='right') - 1
+        # A pattern that can match the empty string also matches at the very end
+        return np.unique(rows[rows < len(self)])
+
+    def contains_rows(self, needle: str) -> np.ndarray:
+        """Sorted indices of the rows whose value contains needle"""
+        encoded = needle.encode('utf-8')
+        if self.SEPARATOR in encoded:
+            return np.empty(0, dtype=np.int64)
+        if not encoded:
+            return np.arange(len(self), dtype=np.int64)
+        if self.index is not None:
+            rows = self.index.contains_rows(needle)
+            if rows is not None:
+                return rows
+        return self.search_rows(re.compile(re.escape(encoded)))
+
+    def match_rows(self, matcher: TitleMatcher) -> np.ndarray:
+        """
+        Sorted indices of the rows containing any of the matcher's titles.
+        Uses the n-gram index when every title is long enough, otherwise one
+        regex pass over the blob.
+        """
+        if self.index is not None and matcher and all(len(title) >= NGRAM for title in matcher):
+            return np.unique(np.concatenate([self.index.contains_rows(title) for title in set(matcher)]))
+        if matcher.bytes_pattern is None:
+            return np.empty(0, dtype=np.int64)
+        return self.search_rows(matcher.bytes_pattern)
+    
+    def non_empty_rows(self) -> np.ndarray:
+        """Indices of the rows holding a non-empty string"""
+        return np.flatnonzero(np.diff(self.offsets) > 1)
@@ -1,25 +1,200 @@
 #!/usr/bin/env python3
 
+import numpy as np
 import pandas as pd
-import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-import ast
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import copy
+import hashlib
 import os
+import time
+from functools import lru_cache
+
+from filter_engine import (TITLE_CATEGORIES, FilterQuery, FilterTrace, Match, ProfileSource, build_result,
+                           explain_profile, filter_records, iter_matches, match_records, normalize_linkedin_url,
+                           parse_value, unique_matches, uses_title_categories)
+from filter_stats import FilterStats
+from parallel_filter import match_parallel, use_parallel
+from profile_columns import ExperienceTable, ProfileColumns
+from profile_ingest import ProfileDelta
+from profile_snapshot import ProfileSnapshot
+from vectorized_filter import VectorizedFilterEngine
 
 logger = logging.getLogger(__name__)
 
-class CSVDataService:
+DEFAULT_CSV_PATH = "attached_assets/output_with_titles_and_links_1749932632525.csv"
+
+# "vectorized" runs the filter as column scans, "loop" is the reference per-profile implementation
+FILTER_ENGINES = ("vectorized", "loop")
+DEFAULT_FILTER_ENGINE = os.environ.get("FILTER_ENGINE", "vectorized")
+
+# Build n-gram indexes over company, LinkedIn and title columns at load time
+BUILD_INDEXES = os.environ.get("PROFILE_INDEX", "1") == "1"
+
+# Modules whose code decides which profiles match; cached results are keyed on their contents
+FILTER_LOGIC_MODULES = ("filter_engine.py", "csv_data_service.py", "vectorized_filter.py", "profile_columns.py",
+                        "title_matcher.py", "columnar.py", "profile_index.py")
+
+
+# Where a dataset was loaded from: (CSV path, CSV content hash or None if
+# unknown, ingest log path or None, ingest log bytes applied)
+DatasetSource = Tuple[str, Optional[str], Optional[str], int]
+
+
+class DatasetChanged(Exception):
+    """Raised when a dataset can no longer be loaded from its source, e.g. the CSV was replaced"""
+
+
+class BatchUnavailable(Exception):
+    """Raised when a batch of searches would have to run on the per-profile loop engine"""
+
+
+@lru_cache(maxsize=1)
+def filter_logic_version() -> str:
+    """Hash of the matching code, so cached results expire when the logic changes"""
+    digest = hashlib.sha1()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in FILTER_LOGIC_MODULES:
+        with open(os.path.join(base_dir, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class CSVDataService(ProfileSource):
     """Service class for reading and filtering LinkedIn profile data from CSV file"""
     
-    def __init__(self, csv_file_path: str = "attached_assets/output_with_titles_and_links_1749932632525.csv"):
+    def __init__(self, csv_file_path: str = DEFAULT_CSV_PATH, snapshot_path: Optional[str] = None,
+                 use_snapshot: bool = True, engine: str = DEFAULT_FILTER_ENGINE,
+                 snapshot: Optional[ProfileSnapshot] = None):
+        if engine not in FILTER_ENGINES:
+            raise ValueError(f"Unknown filter engine: {engine}")
+        
         self.csv_file_path = csv_file_path
-        self.data = None
-        self._load_data()
+        self.engine = engine
+        self.dataset_version: Optional[str] = None  # set by ProfileStore
+        self.base_version: Optional[str] = None  # dataset_version of the base dataset, set by ProfileStore
+        self.source: DatasetSource = (csv_file_path, None, None, 0)  # completed by ProfileStore
+        self.snapshot: Optional[ProfileSnapshot] = snapshot
+        self.experience_table: Optional[ExperienceTable] = None
+        self.profile_columns: Optional[ProfileColumns] = None
+        self.vectorized_engine: Optional[VectorizedFilterEngine] = None
+        self.delta: Optional[ProfileDelta] = None
+        self._data = None
+        self._records = None
+        self._url_rows: Optional[Dict[str, List[int]]] = None
+        self._duplicate_group_ids: Optional[Dict[str, int]] = None
+        self._load_data(snapshot_path, use_snapshot)
+        
+        if self.experience_table is not None and self.profile_columns is not None:
+            self.vectorized_engine = VectorizedFilterEngine(self.profile_columns, self.experience_table)
+    
+    @property
+    def data(self) -> pd.DataFrame:
+        """Profile rows as a DataFrame, materialized from the snapshot on first access"""
+        if self._data is None and self.snapshot is not None:
+            self._data = pd.DataFrame.from_records(self.get_records(), columns=self.snapshot.columns)
+        return self._data
+    
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        self._data = value
+        self._records = None
+    
+    @property
+    def profile_count(self) -> int:
+        """Number of profile ids, including ingested profiles and the base rows they supersede"""
+        if self.delta is not None:
+            return self.delta.base_count + len(self.delta)
+        if self.snapshot is not None:
+            return len(self.snapshot)
+        return len(self._data) if self._data is not None else 0
+    
+    @property
+    def live_profile_count(self) -> int:
+        """Number of current profiles: profile ids minus the base rows ingested profiles supersede"""
+        return self.profile_count - (len(self.delta.replaced) if self.delta is not None else 0)
+    
+    def get_records(self) -> List[Dict[str, Any]]:
+        """Profile rows as a list of dicts, built once and reused across queries"""
+        if self.delta is not None:
+            return self.get_records_base() + self.delta.records
+        return self.get_records_base()
+    
+    def get_records_base(self) -> List[Dict[str, Any]]:
+        """The base dataset's rows as a list of dicts, without ingested profiles"""
+        if self._records is None:
+            if self.snapshot is not None:
+                self._records = list(self.snapshot.iter_records())
+            elif self._data is not None:
+                self._records = self._data.to_dict('records')
+            else:
+                self._records = []
+        return self._records
+    
+    def get_record_range(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """Profile rows start to end, sliced from the base and delta rows without joining them first"""
+        if self.delta is None:
+            return self.get_records()[start:end]
+        base_count = self.delta.base_count
+        records = self.get_records_base()[start:min(end, base_count)] if start < base_count else []
+        if end > base_count:
+            records += self.delta.record_range(max(start, base_count), end)
+        return records
+    
+    def get_record(self, profile_id: int) -> Dict[str, Any]:
+        """A single profile row by its position in the dataset"""
+        if self.delta is not None and profile_id >= self.delta.base_count:
+            return self.delta.record(profile_id)
+        if self._records is None and self.snapshot is not None:
+            return self.snapshot.record(profile_id)
+        return self.get_records()[profile_id]
+    
+    def profile_url_rows(self) -> Dict[str, List[int]]:
+        """Normalized profile URL -> base rows with that URL, built on first use"""
+        if self._url_rows is None:
+            url_rows: Dict[str, List[int]] = {}
+            if self.profile_columns is not None:
+                for row, url in enumerate(self.profile_columns.url):
+                    if url:
+                        url_rows.setdefault(url, []).append(row)
+            self._url_rows = url_rows
+        return self._url_rows
     
-    def _load_data(self):
-        """Load and preprocess the CSV data"""
+    def duplicate_group_ids(self) -> Dict[str, int]:
+        """Duplicate key -> duplicate group of the base rows, built on first use"""
+        if self._duplicate_group_ids is None:
+            group_ids: Dict[str, int] = {}
+            if self.profile_columns is not None:
+                for key, group in zip(self.profile_columns.duplicate_key, self.profile_columns.duplicate_group.tolist()):
+                    group_ids.setdefault(key, group)
+            self._duplicate_group_ids = group_ids
+        return self._duplicate_group_ids
+    
+    def empty_delta(self) -> ProfileDelta:
+        """An empty ProfileDelta over this dataset, to extend with ingested profiles"""
+        return ProfileDelta(self, build_indexes=BUILD_INDEXES)
+    
+    def with_delta(self, delta: ProfileDelta) -> "CSVDataService":
+        """
+        A service over this dataset plus the ingested profiles in delta (see
+        profile_ingest). The base data and indexes are shared.
+        """
+        service = copy.copy(self)
+        service.delta = delta
+        return service
+    
+    def _load_data(self, snapshot_path: Optional[str] = None, use_snapshot: bool = True):
+        """Load the compiled snapshot if it is current, otherwise load and preprocess the CSV"""
         try:
+            if use_snapshot:
+                if self.snapshot is None:
+                    self.snapshot = ProfileSnapshot.open_if_fresh(self.csv_file_path, snapshot_path)
+                if self.snapshot is not None:
+                    self.experience_table = self.snapshot.experience_table
+                    self.profile_columns = self.snapshot.profile_columns
+                    logger.info(f"Opened snapshot with {len(self.snapshot)} profiles from {self.snapshot.snapshot_path}")
+                    return
+            
             if not os.path.exists(self.csv_file_path):
                 logger.error(f"CSV file not found: {self.csv_file_path}")
                 self.data = pd.DataFrame()
@@ -35,7 +210,18 @@ class CSVDataService:
             # Parse JSON-like string fields
             for col in ['current_company', 'experience']:
                 if col in self.data.columns:
-                    self.data[col] = self.data[col].apply(self._safe_parse_json)
+                    self.data[col] = self.data[col].apply(parse_value)
+            
+            # Flatten experience entries and derive the compared fields once so
+            # matching can scan columns
+            records = self.get_records()
+            self.experience_table = ExperienceTable.from_records(records, parse_value, normalize_linkedin_url)
+            self.profile_columns = ProfileColumns.from_records(records, parse_value, normalize_linkedin_url)
+            if BUILD_INDEXES:
+                self.experience_table.build_indexes()
+                self.profile_columns.build_indexes()
+            self.experience_table.build_title_categories(TITLE_CATEGORIES)
+            self.profile_columns.build_title_categories(TITLE_CATEGORIES, self.experience_table)
             
             logger.info(f"Preprocessed CSV data successfully")
             
@@ -43,325 +229,234 @@ class CSVDataService:
             logger.error(f"Error loading CSV data: {str(e)}")
             self.data = pd.DataFrame()
     
-    def _safe_parse_json(self, value):
-        """Safely parse JSON-like strings"""
-        if not value or value == '':
-            return {}
-        
-        try:
-            # Handle string representations of Python dictionaries/lists
-            if isinstance(value, str):
-                # Try to evaluate as Python literal
-                return ast.literal_eval(value)
-            return value
-        except (ValueError, SyntaxError):
-            try:
-                # Try JSON parsing as fallback
-                return json.loads(value)
-            except json.JSONDecodeError:
-                logger.debug(f"Could not parse value: {value[:100]}...")
-                return {}
+    def loop_profile_columns(self) -> Optional[ProfileColumns]:
+        """
+        Precomputed columns the loop engine reads instead of parsing rows, with
+        their Python values decoded (see ProfileColumns.current_values). None
+        when ingested profiles are layered on top: the base columns do not
+        cover them.
+        """
+        if self.profile_columns is None or self.delta is not None:
+            return None
+        self.profile_columns.current_values()
+        return self.profile_columns
     
-    def normalize_linkedin_url(self, url):
-        """Remove https://www. and trailing slashes from LinkedIn URL."""
-        if not url:
-            return ""
-        
-        # Remove protocol and www
-        normalized = url.lower()
-        normalized = normalized.replace("https://www.", "")
-        normalized = normalized.replace("https://", "")
-        normalized = normalized.replace("http://www.", "")
-        normalized = normalized.replace("http://", "")
-        normalized = normalized.replace("www.", "")
-        
-        # Remove trailing slash
-        normalized = normalized.rstrip("/")
-        
-        return normalized
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Every current profile row, ingested profiles included"""
+        profile_ids = range(self.profile_count) if self.delta is None else self.delta.live_profile_ids()
+        return (self.get_record(profile_id) for profile_id in profile_ids)
+    
+    def filter_profiles(self, company_name: str = "", linkedin_url: str = "", job_title: str = "",
+                        engine: Optional[str] = None, stats: Optional[FilterStats] = None) -> List[Dict[str, Any]]:
+        """
+        Filter profiles based on company name, LinkedIn URL, and job title
+        Returns list of matching profiles. Pass a FilterStats as stats to get
+        the time spent and profiles passing in each stage.
+        """
+        stats = stats if stats is not None else FilterStats()
+        return self.hydrate_matches(self.match_profiles(company_name, linkedin_url, job_title, engine, stats), stats)
     
-    def get_expanded_job_titles(self, input_title: str) -> List[str]:
+    def match_profiles(self, company_name: str = "", linkedin_url: str = "", job_title: str = "",
+                       engine: Optional[str] = None, stats: Optional[FilterStats] = None) -> List[Match]:
         """
-        Get all job titles in the same category as the input title.
-        Returns list of titles to match against, including the original input.
+        Like filter_profiles, but returns the de-duplicated matches as
+        (profile id, matched job title, executive inference) tuples. The job
+        title is None when no filter was given and the raw row is the result.
         """
-        if not input_title:
+        stats = stats if stats is not None else FilterStats()
+        with stats.stage("title_expansion"):
+            query = FilterQuery(company_name, linkedin_url, job_title)
+        return self.match_query(query, engine, stats)
+    
+    def match_query(self, query: FilterQuery, engine: Optional[str] = None,
+                    stats: Optional[FilterStats] = None) -> List[Match]:
+        """match_profiles for an already normalized query"""
+        if self.profile_count == 0:
+            logger.error("No data available for filtering")
             return []
         
-        input_lower = input_title.lower().strip()
+        if query.is_empty:
+            query.log()
+            return [(profile_id, None, False) for profile_id in
+                    (range(self.profile_count) if self.delta is None else self.delta.live_profile_ids())]
+        
+        stats = stats if stats is not None else FilterStats()
+        started = time.perf_counter()
         
-        # Job title categories with expanded matches
-        title_categories = {
-            "executive": ["ceo", "founder", "co-founder", "co founder", "owner", "president", "partner", "chief executive officer", "cofounder"],
-            "engineering": ["engineer", "developer", "programmer", "architect", "technical lead", "tech lead", "software engineer", "senior engineer", "principal engineer", "staff engineer"],
-            "marketing": ["marketing", "marketer", "marketing manager", "marketing director", "marketing specialist", "brand manager", "digital marketing", "content marketing"],
-            "sales": ["sales", "sales manager", "sales director", "sales representative", "account manager", "business development", "sales executive"],
-            "finance": ["finance", "financial", "accountant", "accounting", "cfo", "chief financial officer", "financial analyst", "finance manager"],
-            "operations": ["operations", "operations manager", "ops", "operational", "operations director", "operations specialist"],
-            "hr": ["hr", "human resources", "people", "talent", "recruiter", "recruitment", "hr manager", "people manager"],
-            "product": ["product", "product manager", "product director", "product owner", "product specialist", "product lead"],
-            "design": ["design", "designer", "ux", "ui", "user experience", "user interface", "creative", "graphic designer", "product designer"],
-            "data": ["data", "analyst", "data analyst", "data scientist", "analytics", "business analyst", "data engineer"],
-            "consulting": ["consultant", "consulting", "advisor", "advisory", "strategist", "strategy"],
-            "management": ["manager", "director", "head of", "vp", "vice president", "chief", "lead", "supervisor"]
-        }
+        engine = engine or self.engine
+        if engine == "vectorized" and self.vectorized_engine is not None:
+            query.log()
+            matches = self.vectorized_engine.match(query, stats)
+            if self.delta is not None:
+                matches += self.delta.match(query, stats)
+        else:
+            engine = "loop"
+            matches = None
+            if use_parallel(self):
+                try:
+                    matches = match_parallel(self, query, stats)
+                except DatasetChanged as e:
+                    logger.warning(f"Filtering in the request thread, workers could not load the dataset: {str(e)}")
+            if matches is None:
+                with stats.stage("load"):
+                    records = self.get_records()
+                    profile_columns = self.loop_profile_columns()
+                matches = match_records(records, query,
+                                        experience_table=self.experience_table if self.delta is None else None,
+                                        stats=stats, profile_columns=profile_columns)
         
-        # Find which category the input title belongs to
-        for category, titles in title_categories.items():
-            if any(title in input_lower for title in titles):
-                logger.info(f"Input title '{input_title}' matched category '{category}' with {len(titles)} expanded titles")
-                return titles
+        with stats.stage("dedup"):
+            if self.delta is not None:
+                matches = self.delta.drop_replaced(matches)
+            unique = self._unique_matches(matches)
+        stats.add_count("dedup", len(unique))
         
-        # If no category match, return the original title
-        return [input_lower]
+        stats.engine = engine
+        stats.metrics.observe_query(engine, time.perf_counter() - started)
+        logger.info(f"Filtered {self.profile_count} profiles -> {len(matches)} matches -> {len(unique)} unique profiles")
+        
+        trace = FilterTrace.sample()
+        if trace is not None:
+            self.trace_query(query, trace)
+        return unique
     
-    def title_matches_any(self, display_title: str, expanded_titles: List[str]) -> bool:
+    def trace_query(self, query: FilterQuery, trace: FilterTrace):
         """
-        Check if display_title contains any of the expanded job titles.
+        Record every profile's filter decision for query in trace and log it.
+        Runs the reference loop engine, so only sampled queries pay for it.
         """
-        if not display_title or not expanded_titles:
-            return False
-        
-        display_lower = display_title.lower()
-        return any(title in display_lower for title in expanded_titles)
+        experience_table = self.experience_table if self.delta is None else None
+        for _ in iter_matches(self.get_records(), query, experience_table, trace,
+                              profile_columns=self.loop_profile_columns()):
+            pass
+        trace.log(query)
     
-    def filter_profiles(self, company_name: str = "", linkedin_url: str = "", job_title: str = "") -> List[Dict[str, Any]]:
+    def profile_ids_for_url(self, profile_url: str) -> List[int]:
+        """Rows (base and ingested) whose normalized profile URL is profile_url"""
+        url = normalize_linkedin_url(profile_url.strip())
+        if not url:
+            return []
+        profile_ids = list(self.profile_url_rows().get(url, ()))
+        if self.delta is not None:
+            profile_ids += self.delta.profile_ids_for_url(url)
+        return profile_ids
+    
+    def explain(self, query: FilterQuery, profile_url: str) -> List[Dict[str, Any]]:
         """
-        Filter profiles based on company name, LinkedIn URL, and job title
-        Returns list of matching profiles
+        Why each row with profile_url is or is not in the results for query:
+        the outcome of every filter step (see filter_engine.FilterTrace) and
+        whether the row made it into the de-duplicated results. excluded_by
+        is the filter step it failed, "superseded" if an ingested profile
+        replaced it or "duplicate" if an earlier match with the same name and
+        company was kept instead.
         """
-        if self.data is None or self.data.empty:
-            logger.error("No data available for filtering")
+        profile_ids = self.profile_ids_for_url(profile_url)
+        if not profile_ids:
             return []
         
-        # Convert to list of dictionaries for processing
-        profiles = self.data.to_dict('records')
+        result_ids = {match[0] for match in self.match_query(query)}
+        replaced = set(self.delta.replaced.tolist()) if self.delta is not None else set()
+        explanations = []
+        for profile_id in profile_ids:
+            decision = explain_profile(self.get_record(profile_id), query)
+            decision["profile_id"] = profile_id
+            decision["in_results"] = profile_id in result_ids
+            if profile_id in replaced:
+                decision["excluded_by"] = "superseded"
+            elif decision["included"] and not decision["in_results"]:
+                decision["excluded_by"] = "duplicate"
+            explanations.append(decision)
+        return explanations
+    
+    def match_profiles_batch(self, specs: List[Tuple[str, str, str]], engine: Optional[str] = None,
+                             stats: Optional[FilterStats] = None) -> List[List[Match]]:
+        """
+        match_profiles for many (company_name, linkedin_url, job_title) specs
+        against the same dataset. Specs that normalize to the same query are
+        evaluated once, each with the vectorized engine, whose company lookups
+        go through the n-gram index instead of scanning the dataset. Raises
+        BatchUnavailable rather than running a batch on the loop engine, where
+        every spec would be a full pass over the profiles. stats, if given,
+        accumulates over the whole batch.
+        """
+        engine = engine or self.engine
+        if specs and self.profile_count and (engine != "vectorized" or self.vectorized_engine is None):
+            raise BatchUnavailable(f"Batch search needs the vectorized engine (engine {engine}, "
+                                   f"columns loaded: {self.vectorized_engine is not None})")
+        stats = stats if stats is not None else FilterStats()
+        unique_results: Dict[Tuple[str, str, str], List[Match]] = {}
+        batch_results = []
+        for company_name, linkedin_url, job_title in specs:
+            with stats.stage("title_expansion"):
+                query = FilterQuery(company_name, linkedin_url, job_title)
+            if query.key not in unique_results:
+                unique_results[query.key] = self.match_query(query, engine, stats)
+            batch_results.append(unique_results[query.key])
         
-        return self.apply_additional_filter(profiles, company_name, linkedin_url, job_title)
+        logger.info(f"Batch of {len(specs)} specs evaluated as {len(unique_results)} distinct queries")
+        return batch_results
     
-    def apply_additional_filter(self, profiles: List[Dict[str, Any]], 
-                              extra_company: str = "", 
-                              linkedin_url: str = "", 
-                              job_title: str = "") -> List[Dict[str, Any]]:
+    def category_counts(self, profile_ids: Optional[List[int]] = None) -> Dict[str, Dict[str, int]]:
         """
-        Apply additional filters with the correct flow:
-        1. Check experience for company name AND linkedin match
-        2. If none, check current_company for company name AND linkedin match
-        3. Check current_company_name for name matching
-        4. For title display, use only title from current_company if matched there
+        Number of profiles among profile_ids (default: every current profile)
+        in each job title category: by current title, by any experience
+        title, by position, and by any of the three. Read from the
+        precomputed category bitmaps; empty if the dataset has none.
         """
-        if not profiles:
-            return []
-            
-        matched = []
-
-        input_company = extra_company.strip().lower() if extra_company else ""
-        normalized_linkedin = self.normalize_linkedin_url(linkedin_url) if linkedin_url else ""
-        input_title = job_title.strip().lower() if job_title else ""
-
-        # Get expanded job titles based on category matching
-        expanded_titles = self.get_expanded_job_titles(job_title) if job_title else []
-
-        logger.info(f"Applying filters - Company: '{input_company}', LinkedIn: '{normalized_linkedin}', Title: '{input_title}'")
-        if expanded_titles:
-            logger.info(f"Expanded titles for matching: {expanded_titles}")
-
-        # If no additional filters are provided, return all profiles
-        if not input_company and not normalized_linkedin and not input_title:
-            return profiles
-
-        for profile in profiles:
-            experiences = profile.get("experience", [])
-            if experiences is None:
-                experiences = []
-            
-            # Handle case where experience is a string that needs parsing
-            if isinstance(experiences, str):
-                experiences = self._safe_parse_json(experiences)
-                if not isinstance(experiences, list):
-                    experiences = []
-            
-            # Get current company info
-            current_company_name = ""
-            current_title = ""
-            current_company_linkedin = ""
-            
-            if "current_company_name" in profile:  # Original format
-                current_company_name = str(profile.get("current_company_name", "")).strip().lower()
-                current_title = str(profile.get("title", "")).strip()
-            
-            # Also check current_company field (structured data)
-            current_company = profile.get("current_company")
-            if isinstance(current_company, str):
-                current_company = self._safe_parse_json(current_company)
-            
-            if isinstance(current_company, dict):
-                if not current_company_name:
-                    current_company_name = str(current_company.get("name", "")).strip().lower()
-                if not current_title:
-                    current_title = str(current_company.get("title", "")).strip()
-                
-                # Check for LinkedIn URL in current company
-                company_url = current_company.get("link") or current_company.get("url", "")
-                if company_url:
-                    current_company_linkedin = self.normalize_linkedin_url(str(company_url))
-
-            profile_name = profile.get("name", "Unknown")
-            logger.debug(f"Checking profile: {profile_name}")
-            logger.debug(f"Current company: '{current_company_name}', title: '{current_title}'")
-            logger.debug(f"Experience count: {len(experiences)}")
-
-            # Step 1: Check experience for company name AND LinkedIn URL match
-            experience_match = False
-            experience_matched_title = ""
-            
-            if input_company and normalized_linkedin:
-                for i, exp in enumerate(experiences):
-                    if isinstance(exp, dict):
-                        exp_company = str(exp.get("company", "")).strip().lower()
-                        exp_url = exp.get("url") or exp.get("company_linkedin_url", "")
-                        exp_linkedin = self.normalize_linkedin_url(str(exp_url))
-                        exp_title = str(exp.get("title", "")).strip()
-                        
-                        logger.debug(f"Experience {i}: company='{exp_company}', linkedin='{exp_linkedin}', title='{exp_title}'")
-                        
-                        if input_company in exp_company and normalized_linkedin in exp_linkedin:
-                            experience_match = True
-                            experience_matched_title = exp_title
-                            logger.debug(f"Experience match found: {exp_company} + {exp_linkedin}")
-                            break
-            
-            # Step 2: If no experience match, check current_company for company name AND LinkedIn URL
-            current_company_match = False
-            current_company_matched_title = ""
-            
-            if not experience_match and input_company and normalized_linkedin:
-                if (input_company in current_company_name and 
-                    normalized_linkedin in current_company_linkedin):
-                    current_company_match = True
-                    current_company_matched_title = current_title
-                    logger.debug(f"Current company match found: {current_company_name} + {current_company_linkedin}")
-            
-            # Step 3: Check current_company_name for name matching (only if no LinkedIn URL specified)
-            current_name_match = False
-            current_name_matched_title = ""
-            
-            if not experience_match and not current_company_match and input_company and not normalized_linkedin:
-                if input_company in current_company_name:
-                    current_name_match = True
-                    current_name_matched_title = current_title
-                    logger.debug(f"Current company name match found: {current_company_name}")
-            
-            # Determine if profile has company/linkedin match
-            # If LinkedIn URL is provided, require strict matching (experience_match or current_company_match)
-            if normalized_linkedin:
-                has_company_match = experience_match or current_company_match
-            else:
-                has_company_match = experience_match or current_company_match or current_name_match
-            
-            # If no company filter provided, include all
-            if not input_company and not normalized_linkedin:
-                has_company_match = True
-            
-            # Job title filter using expanded categories
-            job_title_match = True
-            matched_job_title = ""
-            
-            if expanded_titles:
-                job_title_match = False
-                
-                # Check current title first against all expanded titles
-                if current_title and self.title_matches_any(current_title, expanded_titles):
-                    job_title_match = True
-                    matched_job_title = current_title  # Use full current title
-                    logger.debug(f"Job title match in current title: {current_title}")
-                
-                # If not found in current title, check experience titles
-                if not job_title_match:
-                    for exp in experiences:
-                        if isinstance(exp, dict):
-                            exp_title = str(exp.get("title", "")).strip()
-                            if exp_title and self.title_matches_any(exp_title, expanded_titles):
-                                job_title_match = True
-                                matched_job_title = exp_title  # Use full experience title
-                                logger.debug(f"Job title match in experience: {exp_title}")
-                                break
-                
-                # If still no match, check for position field for executive searches
-                if not job_title_match and "position" in profile:
-                    position = str(profile.get("position", "")).strip()
-                    if position and self.title_matches_any(position, expanded_titles):
-                        job_title_match = True
-                        matched_job_title = position
-                        logger.debug(f"Job title match in position field: {position}")
-            
-            # Step 4: For display title, prioritize current_company title if matched there
-            display_title = ""
-            if current_company_match or current_name_match:
-                display_title = current_company_matched_title or current_name_matched_title
-            elif experience_match:
-                display_title = experience_matched_title
-            elif matched_job_title:
-                display_title = matched_job_title
-            elif current_title:
-                display_title = current_title
-            
-            # Step 5: Final filter - match expanded job titles with display_title
-            final_title_match = True
-            executive_role_inference = False
-            
-            if expanded_titles and display_title:
-                final_title_match = self.title_matches_any(display_title, expanded_titles)
-                logger.debug(f"Final title filter: expanded titles {expanded_titles} in '{display_title}' = {final_title_match}")
-            elif expanded_titles and not display_title:
-                # Special case: For executive searches (CEO, Founder, etc.), include profiles 
-                # with perfect company matches even if they lack title data
-                is_executive_search = any(title in ["ceo", "founder", "co-founder", "cofounder", "owner", "president"] 
-                                        for title in expanded_titles)
-                
-                if is_executive_search and has_company_match and (experience_match or current_company_match):
-                    final_title_match = True
-                    executive_role_inference = True
-                    display_title = "Executive Role (CEO/Founder)"
-                    logger.debug(f"Executive role inference: including profile with company match but missing title data")
-                else:
-                    final_title_match = False
-                    logger.debug(f"Final title filter: no display title available for expanded titles {expanded_titles}")
-            
-            # Include profile if it passes all filters including the final title match
-            if has_company_match and job_title_match and final_title_match:
-                # Create a clean profile dict with standardized fields
-                clean_profile = {
-                    "name": profile.get("name", "Unknown"),
-                    "url": profile.get("url", ""),
-                    "city": profile.get("city", ""),
-                    "position": profile.get("position", ""),
-                    "avatar": profile.get("avatar", ""),
-                    "current_company_name": profile.get("current_company_name", ""),
-                    "title": profile.get("title", ""),
-                    "experience": experiences,
-                    "current_company": current_company if isinstance(current_company, dict) else {},
-                    "matched_job_title": display_title,
-                    "company_linkedin_link": profile.get("company_linkedin_link", "")
-                }
-                
-                if executive_role_inference:
-                    clean_profile["executive_inference"] = True
-                
-                matched.append(clean_profile)
-                logger.debug(f"Profile {profile_name} included in results with title: {display_title}")
+        tables = [self.profile_columns] + ([segment.profile_columns for segment in self.delta.segments]
+                                           if self.delta is not None else [])
+        if any(table is None or not uses_title_categories(table.title_categories) for table in tables):
+            return {}
+        
+        if profile_ids is None:
+            profile_ids = range(self.profile_count) if self.delta is None else self.delta.live_profile_ids()
+        rows = np.asarray(profile_ids, dtype=np.int64)
+        current, experience, position = (np.concatenate([getattr(table, name) for table in tables])[rows]
+                                         for name in ProfileColumns.BITMAPS)
+        
+        counts = {}
+        for index, category in enumerate(TITLE_CATEGORIES):
+            bit = 1 << index
+            in_current = (current & bit) != 0
+            in_experience = (experience & bit) != 0
+            in_position = (position & bit) != 0
+            counts[category] = {
+                "current_title": int(in_current.sum()),
+                "experience": int(in_experience.sum()),
+                "position": int(in_position.sum()),
+                "any": int((in_current | in_experience | in_position).sum()),
+            }
+        return counts
+    
+    def hydrate_matches(self, matches: List[Match], stats: Optional[FilterStats] = None) -> List[Dict[str, Any]]:
+        """Build result dicts for matches returned by match_profiles"""
+        if stats is None:
+            return list(self.iter_hydrated(matches))
+        with stats.stage("hydrate"):
+            return list(self.iter_hydrated(matches))
+    
+    def iter_hydrated(self, matches: Iterable[Match]) -> Iterator[Dict[str, Any]]:
+        """Like hydrate_matches, one result at a time"""
+        for profile_id, display_title, executive_inference in matches:
+            if display_title is None:
+                yield self.get_record(profile_id)
             else:
-                logger.debug(f"Profile {profile_name} filtered out - Company: {has_company_match}, Title: {job_title_match}, Final Title: {final_title_match}")
-
-        # Remove duplicates based on name and current company
-        seen = set()
-        unique_profiles = []
-        for profile in matched:
-            key = (profile.get("name", "").lower().strip(), 
-                   profile.get("current_company_name", "").lower().strip())
-            if key not in seen:
-                seen.add(key)
-                unique_profiles.append(profile)
-
-        logger.info(f"Filtered {len(profiles)} profiles -> {len(matched)} matches -> {len(unique_profiles)} unique profiles")
-        return unique_profiles
+                yield build_result(self.get_record(profile_id), display_title, executive_inference)
+    
+    def _unique_matches(self, matches: List[Match]) -> List[Match]:
+        """unique_matches using the precomputed duplicate groups, without decoding profiles"""
+        if self.profile_columns is None:
+            return unique_matches(matches, self.get_record)
+        
+        profile_ids = np.fromiter((match[0] for match in matches), dtype=np.int64, count=len(matches))
+        groups = (self.profile_columns.duplicate_group[profile_ids] if self.delta is None
+                  else self.delta.duplicate_groups(profile_ids))
+        _, first_indices = np.unique(groups, return_index=True)
+        return [matches[index] for index in np.sort(first_indices).tolist()]
+    
+    def apply_additional_filter(self, profiles: Iterable[Dict[str, Any]], 
+                              extra_company: str = "", 
+                              linkedin_url: str = "", 
+                              job_title: str = "") -> List[Dict[str, Any]]:
+        """Filter an arbitrary iterable of profile rows, see filter_engine.filter_records"""
+        return filter_records(profiles, extra_company, linkedin_url, job_title)
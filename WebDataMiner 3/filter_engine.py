@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+"""
+Profile matching shared by every data source.
+
+Profiles from the CSV snapshot, from Bright Data snapshot downloads and from
+stored results all go through this module: one job title category table, one
+set of normalization rules and one definition of the five-step filter.
+Sources are adapted to the profile CSV's row shape (see ProfileSource), which
+is what the filter reads.
+
+iter_matches is the row-at-a-time implementation and works on any stream of
+rows. vectorized_filter.VectorizedFilterEngine evaluates the same FilterQuery
+over precomputed columns and must return identical matches
+(`python vectorized_filter.py` checks this).
+"""
+
+import ast
+import json
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sized, Tuple
+
+from filter_stats import FilterStats
+from profile_columns import ExperienceTable, ProfileColumns, TitleCategories, format_duplicate_key
+from title_matcher import TitleMatcher, compile_titles
+
+logger = logging.getLogger(__name__)
+
+# Fraction of queries whose per-profile filter decisions are traced and logged
+FILTER_TRACE_SAMPLE_RATE = float(os.environ.get("FILTER_TRACE_SAMPLE_RATE", 0))
+# Decisions kept (and logged) per traced query; all profiles are still counted
+FILTER_TRACE_MAX_PROFILES = int(os.environ.get("FILTER_TRACE_MAX_PROFILES", 20))
+
+# (profile id, matched job title or None when the search has no filters, executive role inferred)
+Match = Tuple[int, Optional[str], bool]
+
+EXECUTIVE_TITLES = ["ceo", "founder", "co-founder", "cofounder", "owner", "president"]
+EXECUTIVE_DISPLAY_TITLE = "Executive Role (CEO/Founder)"
+
+# Job title categories with expanded matches, shared by filtering and ranking
+TITLE_CATEGORIES = {
+    "executive": ["ceo", "founder", "co-founder", "co founder", "owner", "president", "partner", "chief executive officer", "cofounder"],
+    "engineering": ["engineer", "developer", "programmer", "architect", "technical lead", "tech lead", "software engineer", "senior engineer", "principal engineer", "staff engineer"],
+    "marketing": ["marketing", "marketer", "marketing manager", "marketing director", "marketing specialist", "brand manager", "digital marketing", "content marketing"],
+    "sales": ["sales", "sales manager", "sales director", "sales representative", "account manager", "business development", "sales executive"],
+    "finance": ["finance", "financial", "accountant", "accounting", "cfo", "chief financial officer", "financial analyst", "finance manager"],
+    "operations": ["operations", "operations manager", "ops", "operational", "operations director", "operations specialist"],
+    "hr": ["hr", "human resources", "people", "talent", "recruiter", "recruitment", "hr manager", "people manager"],
+    "product": ["product", "product manager", "product director", "product owner", "product specialist", "product lead"],
+    "design": ["design", "designer", "ux", "ui", "user experience", "user interface", "creative", "graphic designer", "product designer"],
+    "data": ["data", "analyst", "data analyst", "data scientist", "analytics", "business analyst", "data engineer"],
+    "consulting": ["consultant", "consulting", "advisor", "advisory", "strategist", "strategy"],
+    "management": ["manager", "director", "head of", "vp", "vice president", "chief", "lead", "supervisor"]
+}
+
+
+def title_category(input_lower: str) -> Optional[str]:
+    """Category whose titles appear in an already lower-cased job title, if any"""
+    for category, titles in TITLE_CATEGORIES.items():
+        if any(title in input_lower for title in titles):
+            return category
+    return None
+
+
+def category_bit(title_categories: Optional[TitleCategories], category: Optional[str]) -> Optional[int]:
+    """
+    Bit of category in title category bitmaps built with title_categories
+    (see profile_columns.title_category_bits), or None if there is no
+    category or the bitmaps were built with a different category table.
+    """
+    if category is None or not uses_title_categories(title_categories):
+        return None
+    return 1 << list(TITLE_CATEGORIES).index(category)
+
+
+def uses_title_categories(title_categories: Optional[TitleCategories]) -> bool:
+    """True if bitmaps built with title_categories follow the current TITLE_CATEGORIES, in order"""
+    return title_categories is not None and list(title_categories.items()) == list(TITLE_CATEGORIES.items())
+
+
+def expand_job_title(input_title: str) -> TitleMatcher:
+    """
+    Get all job titles in the same category as the input title.
+    Returns the titles to match against, including the original input,
+    as a TitleMatcher compiled once per category (empty for no title).
+    """
+    if not input_title:
+        return compile_titles(())
+    
+    input_lower = input_title.lower().strip()
+    
+    # Find which category the input title belongs to
+    category = title_category(input_lower)
+    if category is not None:
+        titles = TITLE_CATEGORIES[category]
+        logger.info(f"Input title '{input_title}' matched category '{category}' with {len(titles)} expanded titles")
+        return compile_titles(tuple(titles))
+    
+    # If no category match, return the original title
+    return compile_titles((input_lower,))
+
+
+def normalize_linkedin_url(url):
+    """Remove https://www. and trailing slashes from LinkedIn URL."""
+    if not url:
+        return ""
+    
+    # Remove protocol and www
+    normalized = url.lower()
+    normalized = normalized.replace("https://www.", "")
+    normalized = normalized.replace("https://", "")
+    normalized = normalized.replace("http://www.", "")
+    normalized = normalized.replace("http://", "")
+    normalized = normalized.replace("www.", "")
+    
+    # Remove trailing slash
+    normalized = normalized.rstrip("/")
+    
+    return normalized
+
+
+def parse_value(value):
+    """Safely parse JSON-like strings (CSV cells hold Python reprs or JSON)"""
+    if not value or value == '':
+        return {}
+    
+    try:
+        # Handle string representations of Python dictionaries/lists
+        if isinstance(value, str):
+            # Try to evaluate as Python literal
+            return ast.literal_eval(value)
+        return value
+    except (ValueError, SyntaxError):
+        try:
+            # Try JSON parsing as fallback
+            return json.loads(value)
+        except json.JSONDecodeError:
+            logger.debug("Could not parse value: %.100s...", value)
+            return {}
+
+
+def title_matches_any(display_title: str, expanded_titles: TitleMatcher) -> bool:
+    """
+    Check if display_title contains any of the expanded job titles.
+    """
+    if not display_title or not expanded_titles:
+        return False
+    
+    return expanded_titles.matches(display_title)
+
+
+class FilterQuery:
+    """Search inputs normalized once, in the form every engine compares against"""
+
+    def __init__(self, company_name: str = "", linkedin_url: str = "", job_title: str = ""):
+        self.input_company = company_name.strip().lower() if company_name else ""
+        self.normalized_linkedin = normalize_linkedin_url(linkedin_url) if linkedin_url else ""
+        self.input_title = job_title.strip().lower() if job_title else ""
+        self.expanded_titles = expand_job_title(job_title)
+        # Category the job title expanded to, None for a free-text title
+        self.title_category = title_category(job_title.lower().strip()) if job_title else None
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        """Queries with the same key return the same matches"""
+        return (self.input_company, self.normalized_linkedin, self.input_title)
+
+    @property
+    def is_empty(self) -> bool:
+        """True when no filter was given and every profile matches as-is"""
+        return not self.input_company and not self.normalized_linkedin and not self.input_title
+
+    def log(self):
+        logger.info(f"Applying filters - Company: '{self.input_company}', LinkedIn: '{self.normalized_linkedin}', Title: '{self.input_title}'")
+
+
+class FilterTrace:
+    """
+    Per-profile filter decisions for one query, for debugging searches.
+    
+    Counts every evaluated profile by outcome and keeps the full decision
+    (the result of each filter step) for the first max_profiles of them.
+    Tracing is off for normal searches; FilterTrace.sample() turns it on for
+    a FILTER_TRACE_SAMPLE_RATE fraction of queries.
+    """
+
+    def __init__(self, max_profiles: int = FILTER_TRACE_MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self.profiles: List[Dict[str, Any]] = []
+        self.counts = {"included": 0, "company": 0, "job_title": 0, "final_title": 0}
+
+    @classmethod
+    def sample(cls) -> Optional["FilterTrace"]:
+        """A trace for a sampled query, or None (the common case)"""
+        if FILTER_TRACE_SAMPLE_RATE > 0 and random.random() < FILTER_TRACE_SAMPLE_RATE:
+            return cls()
+        return None
+
+    def record(self, profile_id: int, profile: Dict[str, Any], decision: Dict[str, Any]):
+        decision["excluded_by"] = excluded_by(decision)
+        self.counts[decision["excluded_by"] or "included"] += 1
+        if len(self.profiles) < self.max_profiles:
+            self.profiles.append({"profile_id": profile_id, "name": profile.get("name", "Unknown"),
+                                  "url": profile.get("url", ""), **decision})
+
+    def log(self, query: "FilterQuery"):
+        logger.info("Filter trace for %s: %s", query.key, self.counts)
+        for decision in self.profiles:
+            logger.info("Filter trace profile: %s", json.dumps(decision, default=str))
+
+
+def excluded_by(decision: Dict[str, Any]) -> Optional[str]:
+    """The first filter step a profile failed ("company", "job_title" or "final_title"), None if it was included"""
+    if not decision["company_match"]:
+        return "company"
+    if not decision["job_title_match"]:
+        return "job_title"
+    if not decision["final_title_match"]:
+        return "final_title"
+    return None
+
+
+def iter_matches(profiles: Iterable[Dict[str, Any]], query: FilterQuery,
+                 experience_table: Optional[ExperienceTable] = None,
+                 trace: Optional["FilterTrace"] = None,
+                 stats: Optional[FilterStats] = None,
+                 start: int = 0,
+                 profile_columns: Optional[ProfileColumns] = None) -> Iterator[Tuple[int, Dict[str, Any], str, bool]]:
+    """
+    Apply additional filters with the correct flow:
+    1. Check experience for company name AND linkedin match
+    2. If none, check current_company for company name AND linkedin match
+    3. Check current_company_name for name matching
+    4. For title display, use only title from current_company if matched there
+    
+    If experience_table is given it must be the flattened experience of
+    `profiles` (same order); experience matching then runs as column scans
+    instead of per-profile loops, and experience cells are not parsed.
+    Likewise, if profile_columns is given, the current company, LinkedIn URL,
+    title and position are read from its precomputed values instead of being
+    parsed and normalized per query. For a job title category, titles are
+    checked against the tables' category bitmaps where they have them. Profile ids are counted from start, so
+    profiles can be a slice of the dataset (both tables still cover all of
+    it).
+    
+    Yields (profile id, profile, display title, executive inference) for
+    every matching profile, before de-duplication. profiles is consumed once,
+    so it can be a stream. The query must not be empty.
+    
+    Nothing is logged per profile. If trace is given, the outcome of every
+    step is recorded there for each profile, included or not. If stats is
+    given, the time spent in each step and the number of profiles passing it
+    are added to it once profiles is exhausted.
+    """
+    input_company = query.input_company
+    normalized_linkedin = query.normalized_linkedin
+    expanded_titles = query.expanded_titles
+
+    query.log()
+    if expanded_titles:
+        logger.info(f"Expanded titles for matching: {expanded_titles}")
+
+    # Seconds spent in and profiles passing each step, reported to stats at the end
+    clock = time.perf_counter
+    parse_seconds = experience_seconds = current_company_seconds = name_seconds = 0.0
+    title_seconds = final_title_seconds = 0.0
+    profile_count = experience_passed = current_company_passed = name_passed = company_passed = 0
+    title_passed = included_passed = 0
+
+    # Values normalized at load time, indexed by profile id - start
+    current_values = None
+    if profile_columns is not None:
+        end = start + len(profiles) if isinstance(profiles, Sized) else None
+        current_values = profile_columns.current_values(start, end)
+    # Experience entries are only read per profile when there is no table (or to count them for a trace)
+    parse_experience = experience_table is None or trace is not None
+
+    # Category search: whether each current title and position is in the category, from the bitmaps
+    current_title_in_category = position_in_category = None
+    if current_values is not None and expanded_titles:
+        bit = category_bit(profile_columns.title_categories, query.title_category)
+        if bit is not None:
+            mark = clock()
+            current_title_in_category = ((profile_columns.current_title_category_bits & bit) != 0).tolist()
+            position_in_category = ((profile_columns.position_category_bits & bit) != 0).tolist()
+            title_seconds += clock() - mark
+
+    # Resolve experience matches for all profiles up front from the flattened table
+    experience_company_matches = None
+    experience_title_matches = None
+    if experience_table is not None:
+        if input_company and normalized_linkedin:
+            mark = clock()
+            experience_company_matches = experience_table.first_company_match(input_company, normalized_linkedin)
+            experience_seconds += clock() - mark
+        if expanded_titles:
+            mark = clock()
+            bit = category_bit(experience_table.title_categories, query.title_category)
+            if bit is not None:
+                experience_title_matches = experience_table.first_category_match(bit)
+            else:
+                experience_title_matches = experience_table.first_title_match(expanded_titles)
+            title_seconds += clock() - mark
+
+    for profile_id, profile in enumerate(profiles, start):
+        mark = clock()
+        experiences = []
+        if parse_experience:
+            experiences = profile.get("experience", [])
+            if experiences is None:
+                experiences = []
+            
+            # Handle case where experience is a string that needs parsing
+            if isinstance(experiences, str):
+                experiences = parse_value(experiences)
+                if not isinstance(experiences, list):
+                    experiences = []
+        
+        if current_values is not None:
+            (current_company_name, current_company_linkedin, current_title, current_title_lower,
+             position, position_lower) = current_values[profile_id - start]
+        else:
+            # Get current company info
+            current_company_name = ""
+            current_title = ""
+            current_company_linkedin = ""
+            
+            if "current_company_name" in profile:  # Original format
+                current_company_name = str(profile.get("current_company_name", "")).strip().lower()
+                current_title = str(profile.get("title", "")).strip()
+            
+            # Also check current_company field (structured data)
+            current_company = profile.get("current_company")
+            if isinstance(current_company, str):
+                current_company = parse_value(current_company)
+            
+            if isinstance(current_company, dict):
+                if not current_company_name:
+                    current_company_name = str(current_company.get("name", "")).strip().lower()
+                if not current_title:
+                    current_title = str(current_company.get("title", "")).strip()
+                
+                # Check for LinkedIn URL in current company
+                company_url = current_company.get("link") or current_company.get("url", "")
+                if company_url:
+                    current_company_linkedin = normalize_linkedin_url(str(company_url))
+            
+            # Lower-cased and position values are derived below only if a title filter needs them
+            current_title_lower = position = position_lower = None
+
+        now = clock()
+        parse_seconds += now - mark
+        mark = now
+
+        # Step 1: Check experience for company name AND LinkedIn URL match
+        experience_match = False
+        experience_matched_title = ""
+        
+        if experience_company_matches is not None:
+            if profile_id in experience_company_matches:
+                experience_match = True
+                experience_matched_title = experience_company_matches[profile_id]
+        elif input_company and normalized_linkedin:
+            for exp in experiences:
+                if isinstance(exp, dict):
+                    exp_company = str(exp.get("company", "")).strip().lower()
+                    exp_url = exp.get("url") or exp.get("company_linkedin_url", "")
+                    exp_linkedin = normalize_linkedin_url(str(exp_url))
+                    exp_title = str(exp.get("title", "")).strip()
+                    
+                    if input_company in exp_company and normalized_linkedin in exp_linkedin:
+                        experience_match = True
+                        experience_matched_title = exp_title
+                        break
+        
+        now = clock()
+        experience_seconds += now - mark
+        mark = now
+        
+        # Step 2: If no experience match, check current_company for company name AND LinkedIn URL
+        current_company_match = False
+        current_company_matched_title = ""
+        
+        if not experience_match and input_company and normalized_linkedin:
+            if (input_company in current_company_name and 
+                normalized_linkedin in current_company_linkedin):
+                current_company_match = True
+                current_company_matched_title = current_title
+        
+        now = clock()
+        current_company_seconds += now - mark
+        mark = now
+        
+        # Step 3: Check current_company_name for name matching (only if no LinkedIn URL specified)
+        current_name_match = False
+        current_name_matched_title = ""
+        
+        if not experience_match and not current_company_match and input_company and not normalized_linkedin:
+            if input_company in current_company_name:
+                current_name_match = True
+                current_name_matched_title = current_title
+        
+        # Determine if profile has company/linkedin match
+        # If LinkedIn URL is provided, require strict matching (experience_match or current_company_match)
+        if normalized_linkedin:
+            has_company_match = experience_match or current_company_match
+        else:
+            has_company_match = experience_match or current_company_match or current_name_match
+        
+        # If no company filter provided, include all
+        if not input_company and not normalized_linkedin:
+            has_company_match = True
+        
+        now = clock()
+        name_seconds += now - mark
+        mark = now
+        
+        # Job title filter using expanded categories
+        job_title_match = True
+        matched_job_title = ""
+        
+        # Title checks already made for this profile, reused by the final check
+        title_hits = {}
+        
+        if expanded_titles:
+            job_title_match = False
+            
+            # Check current title first against all expanded titles
+            if current_title:
+                if current_title_in_category is not None:
+                    title_hits[current_title] = current_title_in_category[profile_id]
+                elif current_title_lower is not None:
+                    title_hits[current_title] = expanded_titles.matches_lower(current_title_lower)
+                else:
+                    title_hits[current_title] = title_matches_any(current_title, expanded_titles)
+            if current_title and title_hits[current_title]:
+                job_title_match = True
+                matched_job_title = current_title  # Use full current title
+            
+            # If not found in current title, check experience titles
+            if not job_title_match and experience_title_matches is not None:
+                if profile_id in experience_title_matches:
+                    job_title_match = True
+                    matched_job_title = experience_title_matches[profile_id]
+                    title_hits[matched_job_title] = True
+            elif not job_title_match:
+                for exp in experiences:
+                    if isinstance(exp, dict):
+                        exp_title = str(exp.get("title", "")).strip()
+                        if exp_title and title_matches_any(exp_title, expanded_titles):
+                            title_hits[exp_title] = True
+                            job_title_match = True
+                            matched_job_title = exp_title  # Use full experience title
+                            break
+            
+            # If still no match, check for position field for executive searches
+            if not job_title_match and current_values is None and "position" in profile:
+                position = str(profile.get("position", "")).strip()
+                position_lower = position.lower()
+            if not job_title_match and position is not None:
+                if position and (position_in_category[profile_id] if position_in_category is not None
+                                 else expanded_titles.matches_lower(position_lower)):
+                    title_hits[position] = True
+                    job_title_match = True
+                    matched_job_title = position
+        
+        now = clock()
+        title_seconds += now - mark
+        mark = now
+        
+        # Step 4: For display title, prioritize current_company title if matched there
+        display_title = ""
+        if current_company_match or current_name_match:
+            display_title = current_company_matched_title or current_name_matched_title
+        elif experience_match:
+            display_title = experience_matched_title
+        elif matched_job_title:
+            display_title = matched_job_title
+        elif current_title:
+            display_title = current_title
+        
+        # Step 5: Final filter - match expanded job titles with display_title
+        final_title_match = True
+        executive_role_inference = False
+        
+        if expanded_titles and display_title:
+            if display_title in title_hits:
+                final_title_match = title_hits[display_title]
+            else:
+                final_title_match = title_matches_any(display_title, expanded_titles)
+        elif expanded_titles and not display_title:
+            # Special case: For executive searches (CEO, Founder, etc.), include profiles 
+            # with perfect company matches even if they lack title data
+            is_executive_search = any(title in EXECUTIVE_TITLES for title in expanded_titles)
+            
+            if is_executive_search and has_company_match and (experience_match or current_company_match):
+                final_title_match = True
+                executive_role_inference = True
+                display_title = EXECUTIVE_DISPLAY_TITLE
+            else:
+                final_title_match = False
+        
+        final_title_seconds += clock() - mark
+        
+        # Include profile if it passes all filters including the final title match
+        included = has_company_match and job_title_match and final_title_match
+        profile_count += 1
+        experience_passed += experience_match
+        current_company_passed += current_company_match
+        name_passed += current_name_match
+        company_passed += has_company_match
+        title_passed += has_company_match and job_title_match
+        included_passed += included
+        if trace is not None:
+            trace.record(profile_id, profile, {
+                "current_company_name": current_company_name,
+                "current_company_linkedin": current_company_linkedin,
+                "current_title": current_title,
+                "experience_count": len(experiences),
+                "experience_match": experience_match,
+                "current_company_match": current_company_match,
+                "current_name_match": current_name_match,
+                "company_match": has_company_match,
+                "job_title_match": job_title_match,
+                "matched_job_title": matched_job_title,
+                "display_title": display_title,
+                "final_title_match": final_title_match,
+                "executive_inference": executive_role_inference,
+                "included": included,
+            })
+        if included:
+            yield profile_id, profile, display_title, executive_role_inference
+
+    if stats is not None:
+        for stage, seconds in (("parse", parse_seconds), ("experience_match", experience_seconds),
+                               ("current_company_match", current_company_seconds), ("name_match", name_seconds),
+                               ("title_match", title_seconds), ("final_title", final_title_seconds)):
+            stats.add_time(stage, seconds)
+        for stage, count in (("profiles", profile_count), ("experience_match", experience_passed),
+                             ("current_company_match", current_company_passed), ("name_match", name_passed),
+                             ("company_match", company_passed), ("title_match", title_passed),
+                             ("final_title", included_passed)):
+            stats.add_count(stage, count)
+
+
+def match_records(profiles: Iterable[Dict[str, Any]], query: FilterQuery,
+                  experience_table: Optional[ExperienceTable] = None,
+                  stats: Optional[FilterStats] = None, start: int = 0,
+                  profile_columns: Optional[ProfileColumns] = None) -> Optional[List[Match]]:
+    """
+    (profile id, display title, executive inference) for every matching
+    profile before de-duplication, or None if the query is empty. Profile
+    ids are counted from start; see iter_matches for the optional tables.
+    """
+    if query.is_empty:
+        query.log()
+        return None
+    return [(profile_id, display_title, executive_inference)
+            for profile_id, _, display_title, executive_inference
+            in iter_matches(profiles, query, experience_table, stats=stats, start=start,
+                            profile_columns=profile_columns)]
+
+
+def explain_profile(profile: Dict[str, Any], query: FilterQuery) -> Dict[str, Any]:
+    """The filter decision for a single profile row, see FilterTrace"""
+    trace = FilterTrace(max_profiles=1)
+    for _ in iter_matches([profile], query, trace=trace):
+        pass
+    decision = trace.profiles[0]
+    del decision["profile_id"]
+    return decision
+
+
+def unique_matches(matches: List[Match], get_profile) -> List[Match]:
+    """Remove duplicates based on name and current company, keeping the first"""
+    seen = set()
+    unique = []
+    for match in matches:
+        key = format_duplicate_key(get_profile(match[0]))
+        if key not in seen:
+            seen.add(key)
+            unique.append(match)
+    return unique
+
+
+def build_result(profile: Dict[str, Any], display_title: str, executive_inference: bool = False) -> Dict[str, Any]:
+    """Create a clean profile dict with standardized fields for a matched profile"""
+    experiences = profile.get("experience", [])
+    if experiences is None:
+        experiences = []
+    if isinstance(experiences, str):
+        experiences = parse_value(experiences)
+        if not isinstance(experiences, list):
+            experiences = []
+    
+    current_company = profile.get("current_company")
+    if isinstance(current_company, str):
+        current_company = parse_value(current_company)
+    
+    clean_profile = {
+        "name": profile.get("name", "Unknown"),
+        "url": profile.get("url", ""),
+        "city": profile.get("city", ""),
+        "position": profile.get("position", ""),
+        "avatar": profile.get("avatar", ""),
+        "current_company_name": profile.get("current_company_name", ""),
+        "title": profile.get("title", ""),
+        "experience": experiences,
+        "current_company": current_company if isinstance(current_company, dict) else {},
+        "matched_job_title": display_title,
+        "company_linkedin_link": profile.get("company_linkedin_link", "")
+    }
+    
+    if executive_inference:
+        clean_profile["executive_inference"] = True
+    
+    return clean_profile
+
+
+def filter_records(profiles: Iterable[Dict[str, Any]], company_name: str = "", linkedin_url: str = "",
+                   job_title: str = "") -> List[Dict[str, Any]]:
+    """
+    Filter a stream of profile rows and return the de-duplicated results.
+    Only matching profiles are kept, so profiles can be larger than memory.
+    Without any filter the rows are returned unchanged.
+    """
+    query = FilterQuery(company_name, linkedin_url, job_title)
+    if query.is_empty:
+        query.log()
+        return list(profiles)
+    
+    trace = FilterTrace.sample()
+    stats = FilterStats()
+    started = time.perf_counter()
+    seen = set()
+    results = []
+    match_count = 0
+    for _, profile, display_title, executive_inference in iter_matches(profiles, query, trace=trace, stats=stats):
+        match_count += 1
+        key = format_duplicate_key(profile)
+        if key not in seen:
+            seen.add(key)
+            results.append(build_result(profile, display_title, executive_inference))
+    stats.add_count("dedup", len(results))
+    stats.metrics.observe_query("stream", time.perf_counter() - started)
+    
+    logger.info(f"Filtered profiles -> {match_count} matches -> {len(results)} unique profiles")
+    if trace is not None:
+        trace.log(query)
+    return results
+
+
+class ProfileSource(ABC):
+    """
+    Adapter from a data source to the rows the filter reads: dicts with the
+    profile CSV's columns (name, url, city, position, avatar, current_company,
+    current_company_name, title, experience, company_linkedin_link).
+    """
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Every row of the source, in the profile CSV's shape"""
+
+    def filter(self, company_name: str = "", linkedin_url: str = "", job_title: str = "") -> List[Dict[str, Any]]:
+        """filter_records over this source"""
+        return filter_records(self.iter_records(), company_name, linkedin_url, job_title)
+
+
+class RecordSource(ProfileSource):
+    """Rows that already have the CSV's shape: parsed CSV or snapshot rows, or results stored in the database"""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.records = records
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records)
+
+
+def api_profile_record(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Reshape a downloaded Bright Data profile into a row with the profile CSV's columns"""
+    current_company = profile.get("current_company") or {}
+    company_link = current_company.get("link") or ""
+    return {
+        "name": profile.get("name") or "",
+        "url": profile.get("url") or "",
+        "city": profile.get("city") or "",
+        "position": profile.get("position") or "",
+        "avatar": profile.get("avatar") or "",
+        "current_company": {key: value for key, value in current_company.items() if value},
+        "current_company_name": current_company.get("name") or "",
+        "title": current_company.get("title") or "",
+        "experience": profile.get("experience") or [],
+        "company_linkedin_link": company_link,
+    }
+
+
+class ApiSnapshotSource(ProfileSource):
+    """Profiles streamed from a Bright Data snapshot download (see brightdata_service.iter_snapshot_profiles)"""
+
+    def __init__(self, profiles: Iterable[Dict[str, Any]]):
+        self.profiles = profiles
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        return (api_profile_record(profile) for profile in self.profiles)
@@ -0,0 +1,173 @@
+"""
+Per-stage timings and profile counts for profile searches.
+
+Every search fills a FilterStats with the time spent in each stage of the
+filter and the number of profiles that passed it; the /filter endpoints
+return it when asked (stats=1). Each stage is also added to the process-wide
+FilterMetrics, which /metrics exposes in the Prometheus text format. Metrics
+are per process: with several Gunicorn workers, each reports its own.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Stages in the order a search runs them
+STAGES = (
+    "cache_lookup",           # cached request lookup (routes only)
+    "title_expansion",        # normalizing the query and expanding the job title to its category
+    "load",                   # materializing profile rows (loop engine)
+    "parse",                  # decoding experience and current company cells (loop engine)
+    "experience_match",       # step 1: company name and LinkedIn URL in experience
+    "current_company_match",  # step 2: company name and LinkedIn URL of the current company
+    "name_match",             # step 3: company name only
+    "title_match",            # job title filter
+    "final_title",            # steps 4-5: display title and final title check
+    "dedup",                  # removing superseded and duplicate profiles
+    "hydrate",                # building result dicts
+)
+
+# Profile counts: profiles searched, then profiles passing each stage
+COUNTS = ("profiles", "experience_match", "current_company_match", "name_match", "company_match",
+          "title_match", "final_title", "dedup")
+
+# Upper bounds of the query duration histogram, in seconds
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def in_order(values: Dict[str, Any], order: Tuple[str, ...]) -> List[Tuple[str, Any]]:
+    """Items of values with keys in the given order, unknown keys last"""
+    return sorted(values.items(), key=lambda item: (order.index(item[0]) if item[0] in order else len(order), item[0]))
+
+
+class FilterMetrics:
+    """Process-wide totals of FilterStats, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._stage_seconds: Dict[str, float] = {}
+        self._stage_calls: Dict[str, int] = {}
+        self._stage_profiles: Dict[str, int] = {}
+        self._queries: Dict[str, int] = {}
+        self._duration_buckets: Dict[str, List[int]] = {}
+        self._duration_sum: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self._stage_seconds[stage] = self._stage_seconds.get(stage, 0.0) + seconds
+            self._stage_calls[stage] = self._stage_calls.get(stage, 0) + 1
+
+    def observe_count(self, stage: str, profiles: int):
+        with self._lock:
+            self._stage_profiles[stage] = self._stage_profiles.get(stage, 0) + profiles
+
+    def observe_query(self, engine: str, seconds: float):
+        with self._lock:
+            self._queries[engine] = self._queries.get(engine, 0) + 1
+            self._duration_sum[engine] = self._duration_sum.get(engine, 0.0) + seconds
+            counts = self._duration_buckets.setdefault(engine, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP filter_queries_total Profile searches evaluated, by filter engine",
+                "# TYPE filter_queries_total counter",
+            ]
+            lines += [f'filter_queries_total{{engine="{engine}"}} {count}' for engine, count in sorted(self._queries.items())]
+
+            lines += [
+                "# HELP filter_query_duration_seconds Time to match one search against the dataset",
+                "# TYPE filter_query_duration_seconds histogram",
+            ]
+            for engine, counts in sorted(self._duration_buckets.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'filter_query_duration_seconds_bucket{{engine="{engine}",le="{le}"}} {cumulative}')
+                lines.append(f'filter_query_duration_seconds_sum{{engine="{engine}"}} {self._duration_sum[engine]:.6f}')
+                lines.append(f'filter_query_duration_seconds_count{{engine="{engine}"}} {cumulative}')
+
+            lines += [
+                "# HELP filter_stage_seconds_total Time spent in each filter stage",
+                "# TYPE filter_stage_seconds_total counter",
+            ]
+            lines += [f'filter_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+                      for stage, seconds in in_order(self._stage_seconds, STAGES)]
+
+            lines += [
+                "# HELP filter_stage_calls_total Times each filter stage ran",
+                "# TYPE filter_stage_calls_total counter",
+            ]
+            lines += [f'filter_stage_calls_total{{stage="{stage}"}} {calls}'
+                      for stage, calls in in_order(self._stage_calls, STAGES)]
+
+            lines += [
+                "# HELP filter_stage_profiles_total Profiles entering the filter or passing each stage",
+                "# TYPE filter_stage_profiles_total counter",
+            ]
+            lines += [f'filter_stage_profiles_total{{stage="{stage}"}} {profiles}'
+                      for stage, profiles in in_order(self._stage_profiles, COUNTS)]
+
+        return "\n".join(lines) + "\n"
+
+
+class FilterStats:
+    """
+    Stage timings and profile counts of one search (or one batch). Stages
+    that run several times, e.g. once for the base dataset and once for
+    ingested profiles, accumulate. Counts are keyed by stage too: profiles
+    is the number of profiles searched, the other keys the number of
+    profiles that passed that stage.
+    """
+
+    def __init__(self, metrics: Optional[FilterMetrics] = None):
+        self.metrics = metrics if metrics is not None else get_filter_metrics()
+        self.engine = ""
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.metrics.observe_stage(name, seconds)
+
+    def add_count(self, name: str, profiles: int):
+        self.counts[name] = self.counts.get(name, 0) + profiles
+        self.metrics.observe_count(name, profiles)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Timings in milliseconds and counts, in pipeline order, for JSON responses"""
+        return {
+            "engine": self.engine,
+            "timings_ms": {stage: round(seconds * 1000, 3) for stage, seconds in in_order(self.timings, STAGES)},
+            "total_ms": round(sum(self.timings.values()) * 1000, 3),
+            "counts": dict(in_order(self.counts, COUNTS)),
+        }
+
+
+_metrics: Optional[FilterMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_filter_metrics() -> FilterMetrics:
+    """Return the process-wide filter metrics, creating them on first use"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = FilterMetrics()
+    return _metrics
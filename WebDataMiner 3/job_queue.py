@@ -0,0 +1,379 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in the `job` table. Workers claim due jobs with a single
+UPDATE ... WHERE id IN (SELECT ... LIMIT n) statement: on PostgreSQL the
+inner SELECT uses FOR UPDATE SKIP LOCKED so concurrent workers never wait on
+or double-claim a row; SQLite serializes writers, which makes the same
+statement atomic there. Any number of worker processes can therefore share one
+queue. A job left 'running' by a crashed worker is claimable again once its
+lock is older than JOB_LOCK_TIMEOUT; while a job runs, its worker refreshes
+the lock every JOB_HEARTBEAT_INTERVAL so long jobs are not reclaimed.
+
+Jobs that have to wait (e.g. a snapshot still building) are rescheduled with
+a backoff that grows with the time they have waited, and give up once they
+are older than JOB_MAX_WAIT; only runs that fail count towards
+JOB_MAX_ATTEMPTS. Idle workers sleep until the next job is due. On
+PostgreSQL, enqueueing sends NOTIFY so idle workers in other processes wake
+immediately.
+"""
+
+import logging
+import os
+import random
+import select as io_select
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import requests
+from sqlalchemy import and_, case, func, or_, select, text, update
+
+from app import app, db
+from models import FilterRequest, Job
+
+logger = logging.getLogger(__name__)
+
+QUEUE_CHANNEL = "job_queue"
+COMPLETION_CHANNEL = "filter_request_finished"
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+# Failed runs (errors, or a worker dying mid-job) before a job is marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+# Seconds since a job was enqueued after which it is no longer retried
+JOB_MAX_WAIT = float(os.environ.get("JOB_MAX_WAIT", 6 * 3600))
+JOB_BACKOFF_BASE = float(os.environ.get("JOB_BACKOFF_BASE", 2))
+JOB_BACKOFF_MAX = float(os.environ.get("JOB_BACKOFF_MAX", 30))
+JOB_LOCK_TIMEOUT = int(os.environ.get("JOB_LOCK_TIMEOUT", 600))
+# Seconds between refreshes of a running job's lock; well below JOB_LOCK_TIMEOUT
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", JOB_LOCK_TIMEOUT / 4))
+JOB_IDLE_INTERVAL = float(os.environ.get("JOB_IDLE_INTERVAL", 5))
+JOB_NOTIFY_URL = os.environ.get("JOB_NOTIFY_URL")
+
+
+class RetryLater(Exception):
+    """Raised by a job handler when the job should run again after a backoff"""
+
+
+def _is_postgres() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def enqueue_job(kind: str, filter_request_id: Optional[int] = None, delay: float = 0) -> Job:
+    """
+    Add a job to the caller's transaction; it becomes visible to workers (and
+    wakes them on PostgreSQL) when the caller commits.
+    """
+    job = Job(kind=kind, filter_request_id=filter_request_id, status='queued',
+              run_after=datetime.utcnow() + timedelta(seconds=delay))
+    db.session.add(job)
+    if _is_postgres():
+        db.session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                           {"channel": QUEUE_CHANNEL, "payload": kind})
+    return job
+
+
+def claim_jobs(worker_id: str, limit: int = 1) -> List[Job]:
+    """Atomically mark up to limit due jobs as running for this worker and return them"""
+    now = datetime.utcnow()
+    claimable = or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT)),
+    )
+    candidates = select(Job.id).where(claimable).order_by(Job.run_after).limit(limit)
+    if _is_postgres():
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    # Reclaiming a job whose worker died counts as a failed attempt
+    reclaimed = case((Job.status == 'running', 1), else_=0)
+    claimed_ids = [row[0] for row in db.session.execute(
+        update(Job)
+        .where(Job.id.in_(candidates.scalar_subquery()))
+        .values(status='running', locked_by=worker_id, locked_at=now, attempts=Job.attempts + reclaimed)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    )]
+    db.session.commit()
+
+    if not claimed_ids:
+        return []
+    return Job.query.filter(Job.id.in_(claimed_ids)).order_by(Job.run_after).all()
+
+
+def seconds_until_next_job(default: float = JOB_IDLE_INTERVAL) -> float:
+    """How long an idle worker can sleep before the next queued job is due"""
+    next_run = db.session.query(func.min(Job.run_after)).filter(Job.status == 'queued').scalar()
+    db.session.commit()
+    if next_run is None:
+        return default
+    return max(0.0, min(default, (next_run - datetime.utcnow()).total_seconds()))
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base, 2 x base, 4 x base ... capped at JOB_BACKOFF_MAX"""
+    delay = min(JOB_BACKOFF_BASE * 2 ** max(attempts - 1, 0), JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def wait_delay(waited: float) -> float:
+    """
+    Backoff for a job that has waited waited seconds so far: about as long
+    again, so polls double in spacing, between JOB_BACKOFF_BASE and
+    JOB_BACKOFF_MAX, with jitter
+    """
+    delay = min(max(waited, JOB_BACKOFF_BASE), JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def refresh_lock(job_id: int, worker_id: str) -> bool:
+    """
+    Bump locked_at of a job this worker is running, on its own connection so
+    it does not touch the handler's transaction. Returns False if the job is
+    no longer locked by worker_id.
+    """
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id)
+            .values(locked_at=datetime.utcnow())
+        )
+    return result.rowcount == 1
+
+
+class JobHeartbeat:
+    """
+    Refreshes a running job's lock every JOB_HEARTBEAT_INTERVAL until stopped,
+    then once more; lost is True if another worker had reclaimed the job.
+    """
+
+    def __init__(self, job: Job, interval: float = JOB_HEARTBEAT_INTERVAL):
+        self.job_id = job.id
+        self.worker_id = job.locked_by
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job.id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        if not self.lost:
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            if not refresh_lock(self.job_id, self.worker_id):
+                self.lost = True
+                logger.warning(f"Job {self.job_id} is no longer locked by {self.worker_id}")
+        except Exception as e:
+            logger.error(f"Error refreshing lock of job {self.job_id}: {str(e)}")
+
+    def _run(self):
+        with app.app_context():
+            while not self.lost and not self._stop.wait(self.interval):
+                self._refresh()
+
+
+def complete_job(job: Job):
+    job.status = 'done'
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    db.session.commit()
+
+
+def job_age(job: Job) -> float:
+    """Seconds since the job was enqueued"""
+    return (datetime.utcnow() - job.created_at).total_seconds()
+
+
+def fail_job(job: Job, reason: str):
+    job.status = 'failed'
+    job.last_error = reason
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    db.session.commit()
+    logger.error(f"Job {job.id} failed ({job.attempts} failed attempts): {reason}")
+
+
+def reschedule_job(job: Job, reason: str) -> bool:
+    """
+    Queue a job whose run failed again after a backoff, or mark it failed
+    once it has used JOB_MAX_ATTEMPTS or waited JOB_MAX_WAIT. Returns True if
+    it was rescheduled.
+    """
+    job.attempts += 1
+    if job.attempts >= JOB_MAX_ATTEMPTS or job_age(job) >= JOB_MAX_WAIT:
+        fail_job(job, reason)
+        return False
+    return _requeue(job, reason, backoff_delay(job.attempts))
+
+
+def retry_job_later(job: Job, reason: str) -> bool:
+    """
+    Queue a job that has to wait (RetryLater) again, without using up an
+    attempt, or mark it failed once it has waited JOB_MAX_WAIT. Returns True
+    if it was rescheduled.
+    """
+    waited = job_age(job)
+    if waited >= JOB_MAX_WAIT:
+        fail_job(job, f"Gave up after waiting {waited:.0f}s: {reason}")
+        return False
+    return _requeue(job, reason, wait_delay(waited))
+
+
+def _requeue(job: Job, reason: str, delay: float) -> bool:
+    job.last_error = reason
+    job.locked_by = None
+    job.status = 'queued'
+    job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+    db.session.commit()
+    logger.info(f"Job {job.id} rescheduled in {delay:.1f}s: {reason}")
+    return True
+
+
+def notify_request_finished(filter_request: FilterRequest):
+    """
+    Announce that a request has finished: NOTIFY on PostgreSQL (channel
+    filter_request_finished, payload the request id) and, if JOB_NOTIFY_URL is
+    set, a JSON POST to that URL.
+    """
+    logger.info(f"Request {filter_request.id} finished with status {filter_request.status}")
+
+    if _is_postgres():
+        db.session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                           {"channel": COMPLETION_CHANNEL, "payload": str(filter_request.id)})
+        db.session.commit()
+
+    if JOB_NOTIFY_URL:
+        try:
+            requests.post(JOB_NOTIFY_URL, timeout=5, json={
+                "request_id": filter_request.id,
+                "status": filter_request.status,
+                "result_count": filter_request.result_count or 0,
+            })
+        except requests.RequestException as e:
+            logger.error(f"Error sending completion notification for request {filter_request.id}: {str(e)}")
+
+
+class JobWorkerPool:
+    """
+    A pool of worker threads claiming and running jobs from the queue.
+    handlers maps a job kind to a function taking the claimed Job. The job is
+    marked done when the handler returns; raising RetryLater reschedules it
+    to wait, any other exception (which is logged) is a failed attempt and
+    reschedules it with backoff.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[Job], None]], size: int = JOB_WORKERS):
+        self.handlers = handlers
+        self.size = size
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for index in range(self.size):
+            thread = threading.Thread(target=self._run, args=(f"{self.worker_prefix}:{index}",),
+                                      name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        with app.app_context():
+            postgres = _is_postgres()
+        if postgres:
+            threading.Thread(target=self._listen, name="job-listener", daemon=True).start()
+
+        logger.info(f"Started {self.size} job workers")
+
+    def stop(self, timeout: float = 30):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wake(self):
+        """Wake idle workers, e.g. after enqueueing a job in this process"""
+        self._wake.set()
+
+    def _run(self, worker_id: str):
+        with app.app_context():
+            while not self._stop.is_set():
+                try:
+                    jobs = claim_jobs(worker_id)
+                except Exception as e:
+                    logger.error(f"Error claiming jobs: {str(e)}")
+                    db.session.rollback()
+                    self._stop.wait(JOB_IDLE_INTERVAL)
+                    continue
+
+                if not jobs:
+                    try:
+                        idle = seconds_until_next_job()
+                    except Exception as e:
+                        logger.error(f"Error checking job queue: {str(e)}")
+                        db.session.rollback()
+                        idle = JOB_IDLE_INTERVAL
+                    self._wake.wait(idle)
+                    self._wake.clear()
+                    continue
+
+                for job in jobs:
+                    self._run_job(job)
+
+    def _run_job(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            fail_job(job, f"No handler for job kind {job.kind}")
+            return
+
+        started = time.perf_counter()
+        heartbeat = JobHeartbeat(job)
+        error: Optional[Exception] = None
+        try:
+            with heartbeat:
+                handler(job)
+        except Exception as e:
+            error = e
+            db.session.rollback()
+
+        if heartbeat.lost:
+            # Reclaimed by another worker, which now owns the job's status
+            logger.warning(f"Job {job.id} finished after its lock was lost")
+            db.session.rollback()
+        elif isinstance(error, RetryLater):
+            retry_job_later(job, str(error))
+        elif error is not None:
+            logger.error(f"Error running job {job.id}: {str(error)}")
+            reschedule_job(job, str(error))
+        else:
+            complete_job(job)
+            logger.debug(f"Job {job.id} ({job.kind}) ran in {time.perf_counter() - started:.2f}s")
+
+    def _listen(self):
+        """Wake workers when another process enqueues a job (PostgreSQL LISTEN)"""
+        while not self._stop.is_set():
+            try:
+                with app.app_context():
+                    pooled_connection = db.engine.raw_connection()
+                try:
+                    connection = pooled_connection.driver_connection  # psycopg2
+                    connection.set_isolation_level(0)  # autocommit, required for LISTEN
+                    connection.cursor().execute(f"LISTEN {QUEUE_CHANNEL}")
+                    while not self._stop.is_set():
+                        io_select.select([connection], [], [], JOB_IDLE_INTERVAL)
+                        connection.poll()
+                        if connection.notifies:
+                            connection.notifies.clear()
+                            self._wake.set()
+                finally:
+                    pooled_connection.invalidate()
+            except Exception as e:
+                logger.error(f"Job queue listener error: {str(e)}")
+                self._stop.wait(JOB_IDLE_INTERVAL)
@@ -1,5 +1,10 @@
 from datetime import datetime, timedelta
 from app import db
+from csv_data_service import filter_logic_version
+from filter_engine import normalize_linkedin_url
+from profile_store import get_profile_store
+from sqlalchemy import insert, inspect, text
+import hashlib
 import json
 import logging
 
@@ -8,6 +13,10 @@ logger = logging.getLogger(__name__)
 class FilterRequest(db.Model):
     """Model for storing filter requests and results with caching capabilities"""
     
+    __table_args__ = (
+        db.Index('ix_filter_request_cache_key_completed_at', 'cache_key', 'completed_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     base_company = db.Column(db.String(255), nullable=False)
     extra_company = db.Column(db.String(255), nullable=True)
@@ -16,15 +25,22 @@ class FilterRequest(db.Model):
     status = db.Column(db.String(50), nullable=False, default='pending')
     snapshot_id = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    completed_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True, index=True)
     result_count = db.Column(db.Integer, nullable=True, default=0)
-    results_json = db.Column(db.Text, nullable=True)  # Store JSON results
+    results_json = db.Column(db.Text, nullable=True)  # Full JSON results (external data, older rows)
+    result_refs = db.Column(db.Text, nullable=True)  # JSON [profile id, matched title, executive] rows
+    dataset_version = db.Column(db.String(16), nullable=True)  # Profile dataset result_refs point into
+    dataset_base = db.Column(db.String(16), nullable=True)  # Its base dataset, see get_matches
+    cache_key = db.Column(db.String(64), nullable=True)  # See build_cache_key
     
     def __repr__(self):
         return f'<FilterRequest {self.id}: {self.base_company}>'
     
     def set_results(self, results):
         """Store results as JSON"""
+        self.result_refs = None
+        self.dataset_version = None
+        self.dataset_base = None
         if results is not None:
             self.results_json = json.dumps(results)
             self.result_count = len(results) if isinstance(results, list) else 0
@@ -32,14 +48,99 @@ class FilterRequest(db.Model):
             self.results_json = None
             self.result_count = 0
     
+    def set_matches(self, matches, service):
+        """
+        Store results as references into service's profile dataset: one
+        [profile id, matched job title, executive inference] row per result
+        instead of the full profile JSON.
+        """
+        self.result_refs = json.dumps([[profile_id, display_title, 1 if executive_inference else 0]
+                                       for profile_id, display_title, executive_inference in matches],
+                                      separators=(',', ':'))
+        self.dataset_version = service.dataset_version
+        self.dataset_base = service.base_version
+        self.results_json = None
+        self.result_count = len(matches)
+    
+    def copy_results_from(self, other):
+        """Share another request's stored results without decoding them"""
+        self.results_json = other.results_json
+        self.result_refs = other.result_refs
+        self.dataset_version = other.dataset_version
+        self.dataset_base = other.dataset_base
+        self.result_count = other.result_count
+    
+    def match_query(self):
+        """
+        (company_name, linkedin_url, job_title) to match this request with.
+        Only company and LinkedIn are filtered here; job titles are filtered
+        on the results page.
+        """
+        return self.base_company, self.linkedin_url or "", ""
+    
+    def match_profiles(self, service, stats=None):
+        """Run this request against a profile dataset, adding stage timings to stats if given"""
+        return service.match_profiles(*self.match_query(), stats=stats)
+    
+    def get_matches(self, service):
+        """
+        Stored references as (profile id, matched title, executive inference)
+        tuples for service's dataset. Profile ids are positions in the base
+        dataset followed by the append-only ingest log, so they stay valid
+        while the base dataset is unchanged: ingesting profiles only adds ids,
+        and the stored results are served as they were found, matching
+        result_count. If the base dataset has been replaced since, the filter
+        is re-run in memory; the stored references are left as they are,
+        reading a request never writes to the database, so callers count the
+        results they serve rather than trusting result_count.
+        """
+        if self.dataset_version == service.dataset_version or (
+                self.dataset_base is not None and self.dataset_base == service.base_version):
+            matches = [(profile_id, display_title, bool(executive_inference))
+                       for profile_id, display_title, executive_inference in json.loads(self.result_refs)]
+            if all(profile_id < service.profile_count for profile_id, _, _ in matches):
+                return matches
+        
+        logger.info(f"Base dataset changed since request {self.id} was stored, re-running filter")
+        return self.match_profiles(service)
+    
+    def count_results(self):
+        """Number of results get_results returns, without hydrating them"""
+        if self.result_refs:
+            return len(self.get_matches(get_profile_store().get_service()))
+        return self.result_count or 0
+    
+    def iter_results(self):
+        """
+        Results one at a time without building the full list, for streaming.
+        Stored references are resolved up front, so the returned iterator does
+        not touch the database.
+        """
+        if self.result_refs:
+            service = get_profile_store().get_service()
+            return service.iter_hydrated(self.get_matches(service))
+        return iter(self.get_results())
+    
     def get_results(self):
-        """Retrieve results from JSON"""
+        """
+        Retrieve results, rehydrating profile references if stored that way.
+        Raises if stored results cannot be loaded, so a failure is never
+        mistaken for (and cached as) an empty result set.
+        """
+        if self.result_refs:
+            try:
+                service = get_profile_store().get_service()
+                return service.hydrate_matches(self.get_matches(service))
+            except Exception as e:
+                logger.error(f"Failed to load results for request {self.id}: {str(e)}")
+                raise
+        
         if self.results_json:
             try:
                 return json.loads(self.results_json)
             except json.JSONDecodeError:
                 logger.error(f"Failed to decode JSON for request {self.id}")
-                return []
+                raise
         return []
     
     def is_cache_valid(self, cache_days=30):
@@ -50,39 +151,112 @@ class FilterRequest(db.Model):
         expiry_date = self.completed_at + timedelta(days=cache_days)
         return datetime.utcnow() < expiry_date
     
+    @staticmethod
+    def build_cache_key(base_company, extra_company=None, linkedin_url=None, job_title=None, dataset_version=None):
+        """
+        Hash of the normalized search parameters, the dataset version and the
+        filter logic version. Requests that would produce the same results share
+        a key; reloading the CSV or changing the matching code changes it.
+        """
+        normalized = [
+            (base_company or "").strip().lower(),
+            (extra_company or "").strip().lower(),
+            normalize_linkedin_url((linkedin_url or "").strip()),
+            (job_title or "").strip().lower(),
+            dataset_version or "",
+            filter_logic_version(),
+        ]
+        return hashlib.sha256(json.dumps(normalized).encode('utf-8')).hexdigest()
+    
     @classmethod
-    def find_cached_request(cls, base_company, extra_company=None, linkedin_url=None, job_title=None):
-        """Find a valid cached request with the same parameters"""
-        # Temporarily disable caching to ensure new filtering logic is applied
-        # This can be re-enabled later once filtering is stable
-        return None
-        
-        query = cls.query.filter(
-            cls.base_company == base_company,
+    def find_cached_request(cls, cache_key, cache_days=30):
+        """Find the most recent valid cached request with the given cache key"""
+        cutoff = datetime.utcnow() - timedelta(days=cache_days)
+        return cls.query.filter(
+            cls.cache_key == cache_key,
+            cls.completed_at >= cutoff,
             cls.status == 'completed'
-        )
-        
-        # Handle nullable fields properly
-        if extra_company is None:
-            query = query.filter(cls.extra_company.is_(None))
-        else:
-            query = query.filter(cls.extra_company == extra_company)
-        
-        if linkedin_url is None:
-            query = query.filter(cls.linkedin_url.is_(None))
-        else:
-            query = query.filter(cls.linkedin_url == linkedin_url)
+        ).order_by(cls.completed_at.desc()).first()
+    
+    @classmethod
+    def find_cached_requests(cls, cache_keys, cache_days=30):
+        """find_cached_request for many keys in one query, as a cache key -> request dict"""
+        cutoff = datetime.utcnow() - timedelta(days=cache_days)
+        cached = {}
+        for cached_request in cls.query.filter(
+            cls.cache_key.in_(set(cache_keys)),
+            cls.completed_at >= cutoff,
+            cls.status == 'completed'
+        ).order_by(cls.completed_at.desc()):
+            cached.setdefault(cached_request.cache_key, cached_request)
+        return cached
+    
+    @classmethod
+    def bulk_insert(cls, filter_requests):
+        """
+        Insert new (not yet added) requests with one multi-row INSERT and set
+        their ids. The returned ids come back in the order of the input rows
+        (sort_by_parameter_order), whatever order the database assigns them in;
+        on SQLite, which cannot guarantee that, SQLAlchemy inserts row by row.
+        """
+        if not filter_requests:
+            return
         
-        if job_title is None:
-            query = query.filter(cls.job_title.is_(None))
-        else:
-            query = query.filter(cls.job_title == job_title)
+        now = datetime.utcnow()
+        rows = []
+        for filter_request in filter_requests:
+            if filter_request.created_at is None:
+                filter_request.created_at = now
+            rows.append({column.name: getattr(filter_request, column.name)
+                         for column in cls.__table__.columns if column.name != 'id'})
         
-        # Find the most recent valid cached request
-        cached_requests = query.order_by(cls.completed_at.desc()).all()
+        statement = insert(cls.__table__).returning(cls.__table__.c.id, sort_by_parameter_order=True)
+        result = db.session.execute(statement, rows)
+        for filter_request, (request_id,) in zip(filter_requests, result):
+            filter_request.id = request_id
+
+
+class Job(db.Model):
+    """Persistent background job, claimed by one worker at a time (see job_queue.py)"""
+    
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    filter_request_id = db.Column(db.Integer, db.ForeignKey('filter_request.id'), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<Job {self.id}: {self.kind} {self.status}>'
+
+
+def upgrade_schema():
+    """
+    Add columns and indexes introduced after a table was first created.
+    db.create_all() only creates missing tables, so existing databases get
+    new nullable columns added here.
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
         
-        for request in cached_requests:
-            if request.is_cache_valid():
-                return request
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+        db.session.commit()
         
-        return None
\ No newline at end of file
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
@@ -0,0 +1,248 @@
+"""
+Loop engine searches spread over worker processes.
+
+The reference loop engine walks every profile in Python and is bound to one
+core by the GIL. With FILTER_WORKERS > 1, searches over at least
+FILTER_PARALLEL_MIN_PROFILES profiles are split into one contiguous shard of
+profile ids per worker, and each worker filters only its own slice.
+Shard matches come back in profile id order, so the caller's de-duplication
+runs over exactly the matches a single process would produce.
+
+Workers are started from a fork server, never forked from the threaded web
+process, so they cannot inherit locks held by its other threads. Each worker
+always gets the same shard of a dataset and decodes only that range of rows:
+from the CSV's compiled snapshot, memory-mapped and so shared through the
+page cache, plus the ingest log up to the offset the profile store recorded.
+It keeps them until a search names a newer dataset. Datasets without a
+snapshot are filtered in the request thread, and if the source has moved on
+in the meantime the search falls back to it as well (see DatasetChanged).
+
+One pool serves every dataset of a process. Each Gunicorn worker has its own,
+so keep workers * FILTER_WORKERS at or below the number of cores.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from filter_engine import FilterQuery, Match, match_records
+from filter_stats import FilterMetrics, FilterStats
+from profile_columns import ExperienceTable, ProfileColumns
+
+if TYPE_CHECKING:
+    from csv_data_service import CSVDataService, DatasetSource
+
+logger = logging.getLogger(__name__)
+
+# Processes filtering shards of a loop engine search; 1 filters in the request thread, 0 uses every core
+FILTER_WORKERS = int(os.environ.get("FILTER_WORKERS", 1)) or os.cpu_count() or 1
+# Smaller datasets are filtered in the request thread, where a search costs less than the round trip
+FILTER_PARALLEL_MIN_PROFILES = int(os.environ.get("FILTER_PARALLEL_MIN_PROFILES", 50000))
+
+ShardTask = Tuple["DatasetSource", int, int, int, FilterQuery]
+
+
+class Shard:
+    """Run in a worker: profile ids start to end of a dataset, decoded from its snapshot and ingest log"""
+
+    def __init__(self, source: "DatasetSource", profile_count: int, start: int, end: int):
+        from csv_data_service import DatasetChanged
+        from profile_ingest import IngestLog
+        from profile_snapshot import ProfileSnapshot
+
+        csv_file_path, content_hash, ingest_path, ingest_offset = source
+        snapshot = ProfileSnapshot.open_if_fresh(csv_file_path)
+        if snapshot is None or (content_hash is not None and snapshot.source_sha1 != content_hash):
+            raise DatasetChanged(f"{csv_file_path} changed since the dataset was loaded")
+        entries = IngestLog(ingest_path).read(0, ingest_offset)[0] if ingest_path is not None and ingest_offset else []
+        base_count = len(snapshot)
+        if base_count + len(entries) != profile_count:
+            raise DatasetChanged(f"{csv_file_path} has {base_count + len(entries)} profiles, expected {profile_count}")
+
+        self.start = start
+        self.records: List[Dict[str, Any]] = [snapshot.record(profile_id)
+                                              for profile_id in range(start, min(end, base_count))]
+        self.records += [entry["record"] for entry in entries[max(start - base_count, 0):max(end - base_count, 0)]]
+        # The snapshot's tables cover the base rows, ingested rows are parsed per search
+        self.experience_table: Optional[ExperienceTable] = None
+        self.profile_columns: Optional[ProfileColumns] = None
+        if end <= base_count:
+            self.experience_table = snapshot.experience_table
+            self.profile_columns = snapshot.profile_columns
+            self.profile_columns.current_values(start, end)
+
+    def match(self, query: FilterQuery, stats: FilterStats) -> List[Match]:
+        return match_records(self.records, query, experience_table=self.experience_table, stats=stats,
+                             start=self.start, profile_columns=self.profile_columns)
+
+
+# In a worker: the shard it last loaded, with the (source, profile count, start, end) it was loaded for
+_worker_shard: Optional[Tuple[Tuple["DatasetSource", int, int, int], Shard]] = None
+
+
+def _match_shard(task: ShardTask) -> Tuple[List[Match], Dict[str, float], Dict[str, int]]:
+    """Run in a worker: matches, stage timings and counts for profile ids start to end"""
+    global _worker_shard
+    source, profile_count, start, end, query = task
+    # Stats go back to the parent, which adds them to its own metrics
+    stats = FilterStats(metrics=FilterMetrics())
+    key = (source, profile_count, start, end)
+    if _worker_shard is None or _worker_shard[0] != key:
+        # Release the previous shard before loading the next
+        _worker_shard = None
+        with stats.stage("load"):
+            _worker_shard = (key, Shard(source, profile_count, start, end))
+    matches = _worker_shard[1].match(query, stats)
+    return matches, stats.timings, stats.counts
+
+
+def _shard_worker(connection):
+    """Run in a worker: filter the shards the parent sends until it sends None"""
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        try:
+            connection.send((_match_shard(task), None))
+        except Exception as e:
+            connection.send((None, e))
+
+
+def shard_ranges(profile_count: int, shards: int) -> List[Tuple[int, int]]:
+    """Split profile ids 0..profile_count into up to shards contiguous (start, end) ranges"""
+    size = -(-profile_count // shards) if profile_count else 0
+    return [(start, min(start + size, profile_count)) for start in range(0, profile_count, size or 1)]
+
+
+class ShardPool:
+    """
+    Worker processes, started from a fork server, filtering shards of a
+    dataset's profiles. Shard i of every search goes to worker i, so a worker
+    only ever holds its own range of rows. Searches from several threads
+    take turns.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.context = multiprocessing.get_context("forkserver")
+        # Imported once in the fork server rather than in every worker
+        self.context.set_forkserver_preload(["csv_data_service"])
+        self._lock = threading.Lock()
+        self._processes = [self._start_worker() for _ in range(workers)]
+        logger.info(f"Started {workers} filter workers")
+
+    def _start_worker(self):
+        connection, worker_connection = self.context.Pipe()
+        process = self.context.Process(target=_shard_worker, args=(worker_connection,), daemon=True)
+        process.start()
+        worker_connection.close()
+        return process, connection
+
+    def _restart_worker(self, index: int):
+        process, connection = self._processes[index]
+        logger.error(f"Filter worker {index} exited, restarting it")
+        connection.close()
+        process.join(1)
+        self._processes[index] = self._start_worker()
+
+    def _result(self, index: int, task: ShardTask, sent: bool) -> Tuple[Any, Optional[Exception]]:
+        """(result, error) of worker index for task, running it once more on a restarted worker if it died"""
+        if sent:
+            try:
+                return self._processes[index][1].recv()
+            except (EOFError, OSError):
+                self._restart_worker(index)
+        try:
+            connection = self._processes[index][1]
+            connection.send(task)
+            return connection.recv()
+        except (EOFError, OSError) as e:
+            self._restart_worker(index)
+            return None, e
+
+    def match(self, service: "CSVDataService", query: FilterQuery, stats: FilterStats) -> List[Match]:
+        """Matches of the loop engine over every profile id of service, in id order, before de-duplication"""
+        tasks = [(service.source, service.profile_count, start, end, query)
+                 for start, end in shard_ranges(service.profile_count, self.workers)]
+        matches: List[Match] = []
+        with self._lock:
+            sent = []
+            for index, task in enumerate(tasks):
+                try:
+                    self._processes[index][1].send(task)
+                    sent.append(True)
+                except OSError:
+                    self._restart_worker(index)
+                    sent.append(False)
+            # Every worker's reply is read before any error is raised, so the pipes stay in step
+            results = [self._result(index, task, sent[index]) for index, task in enumerate(tasks)]
+
+        for result, error in results:
+            if error is not None:
+                raise error
+            shard_matches, timings, counts = result
+            matches += shard_matches
+            for stage, seconds in timings.items():
+                stats.add_time(stage, seconds)
+            for stage, profiles in counts.items():
+                stats.add_count(stage, profiles)
+        return matches
+
+    def close(self):
+        """Let an in-flight search finish, then stop the workers and wait for them to exit"""
+        with self._lock:
+            for process, connection in self._processes:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                connection.close()
+            for process, _ in self._processes:
+                process.join()
+
+
+_pool: Optional[ShardPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_shard_pool(workers: int) -> ShardPool:
+    """Return the process-wide pool, replacing one with a different number of workers"""
+    global _pool
+    with _pool_lock:
+        previous = None
+        if _pool is None or _pool.workers != workers:
+            previous = _pool
+            _pool = ShardPool(workers)
+        pool = _pool
+    if previous is not None:
+        previous.close()
+    return pool
+
+
+def use_parallel(service: "CSVDataService", workers: Optional[int] = None) -> bool:
+    """
+    True when a loop engine search over service should be sharded across
+    workers (default FILTER_WORKERS). Workers decode their rows from the
+    compiled snapshot, and ingested profiles are only reproducible in a
+    worker when the profile store recorded the log they came from.
+    """
+    workers = workers or FILTER_WORKERS
+    reproducible = service.snapshot is not None and (service.delta is None or service.source[2] is not None)
+    return workers > 1 and reproducible and service.profile_count >= FILTER_PARALLEL_MIN_PROFILES
+
+
+def match_parallel(service: "CSVDataService", query: FilterQuery, stats: FilterStats,
+                   workers: Optional[int] = None) -> List[Match]:
+    """
+    Loop engine matches over service, filtered by workers processes (default
+    FILTER_WORKERS). Raises DatasetChanged if the workers could not load it.
+    """
+    workers = workers or FILTER_WORKERS
+    started = time.perf_counter()
+    matches = get_shard_pool(workers).match(service, query, stats)
+    logger.info(f"Filtered {service.profile_count} profiles in {workers} shards "
+                f"in {time.perf_counter() - started:.3f}s")
+    return matches
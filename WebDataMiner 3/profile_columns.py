@@ -0,0 +1,355 @@
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from columnar import StringColumn
+from title_matcher import TitleMatcher, compile_titles
+
+# Job title categories as passed to build_title_categories, one bit each in a uint16
+TitleCategories = Dict[str, List[str]]
+MAX_TITLE_CATEGORIES = 16
+
+
+def title_category_bits(column: StringColumn, title_categories: TitleCategories) -> np.ndarray:
+    """
+    Per row of column, bit i is set when the non-empty value contains any
+    title of the i-th category: the rows a search for that category matches.
+    """
+    if len(title_categories) > MAX_TITLE_CATEGORIES:
+        raise ValueError(f"At most {MAX_TITLE_CATEGORIES} title categories fit in a bitmap")
+    bits = np.zeros(len(column), dtype=np.uint16)
+    non_empty = column.non_empty_rows()
+    for index, titles in enumerate(title_categories.values()):
+        rows = np.intersect1d(column.match_rows(compile_titles(tuple(titles))), non_empty, assume_unique=True)
+        bits[rows] |= 1 << index
+    return bits
+
+
+def save_title_categories(directory: str, title_categories: Optional[TitleCategories], bitmaps: Dict[str, np.ndarray]):
+    """Write the category table the bitmaps were built with, and the bitmaps"""
+    if title_categories is None:
+        return
+    with open(os.path.join(directory, "title_categories.json"), 'w') as f:
+        json.dump(title_categories, f)
+    for name, bits in bitmaps.items():
+        np.save(os.path.join(directory, f"{name}.npy"), bits)
+
+
+def load_title_categories(directory: str, names: Tuple[str, ...]) -> Tuple[Optional[TitleCategories], Dict[str, np.ndarray]]:
+    """The category table and bitmaps saved by save_title_categories, (None, {}) if there are none"""
+    path = os.path.join(directory, "title_categories.json")
+    if not os.path.exists(path):
+        return None, {}
+    with open(path) as f:
+        title_categories = json.load(f)
+    return title_categories, {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in names}
+
+
+def iter_experience_dicts(experiences: Any) -> Iterator[Dict[str, Any]]:
+    """Yield the dict entries of a parsed experience value, skipping anything else"""
+    if isinstance(experiences, (list, tuple)):
+        for exp in experiences:
+            if isinstance(exp, dict):
+                yield exp
+
+
+class ExperienceTable:
+    """
+    Every profile's experience entries flattened into contiguous columns.
+
+    Rows are stored in profile order and, within a profile, in the order the
+    entries appear in its experience list, so "the first matching entry of a
+    profile" is simply the lowest matching row. Rows of profile p are
+    profile_offsets[p]:profile_offsets[p + 1].
+
+    After build_title_categories, title_category_bits holds each row's job
+    title categories (see title_category_bits), built with the category
+    table in title_categories.
+    """
+
+    STRING_COLUMNS = ("company_lower", "linkedin", "title", "title_lower")
+    BITMAPS = ("title_category_bits",)
+
+    def __init__(self, profile_id: np.ndarray, profile_offsets: np.ndarray, columns: Dict[str, StringColumn]):
+        self.profile_id = profile_id
+        self.profile_offsets = profile_offsets
+        self.company_lower = columns["company_lower"]
+        self.linkedin = columns["linkedin"]
+        self.title = columns["title"]
+        self.title_lower = columns["title_lower"]
+        self.title_categories: Optional[TitleCategories] = None
+        self.title_category_bits: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], parse_value: Callable[[str], Any],
+                     normalize_linkedin_url: Callable[[str], str]) -> "ExperienceTable":
+        """
+        Flatten the experience lists of the given profile records. Values are
+        normalized exactly like filter_engine.iter_matches does.
+        """
+        profile_ids: List[int] = []
+        profile_offsets = [0]
+        values: Dict[str, List[str]] = {name: [] for name in cls.STRING_COLUMNS}
+
+        for profile_id, profile in enumerate(records):
+            experiences = profile.get("experience", [])
+            if isinstance(experiences, str):
+                experiences = parse_value(experiences)
+                if not isinstance(experiences, list):
+                    experiences = []
+
+            for exp in iter_experience_dicts(experiences):
+                exp_url = exp.get("url") or exp.get("company_linkedin_url", "")
+                exp_title = str(exp.get("title", "")).strip()
+
+                profile_ids.append(profile_id)
+                values["company_lower"].append(str(exp.get("company", "")).strip().lower())
+                values["linkedin"].append(normalize_linkedin_url(str(exp_url)))
+                values["title"].append(exp_title)
+                values["title_lower"].append(exp_title.lower())
+
+            profile_offsets.append(len(profile_ids))
+
+        columns = {name: StringColumn.from_strings(column) for name, column in values.items()}
+        return cls(np.array(profile_ids, dtype=np.int32), np.array(profile_offsets, dtype=np.int64), columns)
+
+    def __len__(self) -> int:
+        return len(self.profile_id)
+    
+    def build_indexes(self):
+        """Build n-gram indexes over the matched experience columns"""
+        for name in ("company_lower", "linkedin", "title_lower"):
+            getattr(self, name).build_index()
+
+    def build_title_categories(self, title_categories: TitleCategories):
+        """Precompute the job title categories of every experience title"""
+        self.title_category_bits = title_category_bits(self.title_lower, title_categories)
+        self.title_categories = title_categories
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "profile_id.npy"), self.profile_id)
+        np.save(os.path.join(directory, "profile_offsets.npy"), self.profile_offsets)
+        for name in self.STRING_COLUMNS:
+            getattr(self, name).save(directory, name)
+        save_title_categories(directory, self.title_categories, {name: getattr(self, name) for name in self.BITMAPS})
+
+    @classmethod
+    def load(cls, directory: str) -> "ExperienceTable":
+        columns = {name: StringColumn.load(directory, name) for name in cls.STRING_COLUMNS}
+        table = cls(
+            np.load(os.path.join(directory, "profile_id.npy"), mmap_mode='r'),
+            np.load(os.path.join(directory, "profile_offsets.npy"), mmap_mode='r'),
+            columns,
+        )
+        table.title_categories, bitmaps = load_title_categories(directory, cls.BITMAPS)
+        for name, bits in bitmaps.items():
+            setattr(table, name, bits)
+        return table
+
+    def _first_row_per_profile(self, rows: np.ndarray) -> Dict[int, int]:
+        """Map profile id -> lowest of the given (sorted) experience rows"""
+        if len(rows) == 0:
+            return {}
+        profile_ids, first = np.unique(self.profile_id[rows], return_index=True)
+        return dict(zip(profile_ids.tolist(), rows[first].tolist()))
+
+    def first_company_match(self, input_company: str, normalized_linkedin: str) -> Dict[int, str]:
+        """
+        Step 1 of the filter for every profile at once: map profile id to the
+        title of its first experience whose company contains input_company and
+        whose LinkedIn URL contains normalized_linkedin.
+        """
+        rows = np.intersect1d(self.company_lower.contains_rows(input_company),
+                              self.linkedin.contains_rows(normalized_linkedin), assume_unique=True)
+        return {profile_id: self.title[row] for profile_id, row in self._first_row_per_profile(rows).items()}
+
+    def first_title_match(self, expanded_titles: TitleMatcher) -> Dict[int, str]:
+        """
+        Map profile id to its first non-empty experience title containing any
+        of the expanded titles.
+        """
+        rows = self.title_lower.match_rows(expanded_titles)
+        rows = np.intersect1d(rows, self.title_lower.non_empty_rows(), assume_unique=True)
+        return {profile_id: self.title[row] for profile_id, row in self._first_row_per_profile(rows).items()}
+
+    def first_category_match(self, category_bit: int, profile_ids: Optional[np.ndarray] = None) -> Dict[int, str]:
+        """
+        first_title_match for a whole job title category, read from the
+        precomputed bitmap instead of scanning titles. If profile_ids is given,
+        only those profiles are looked up.
+        """
+        rows = np.flatnonzero(self.title_category_bits & category_bit)
+        if profile_ids is not None:
+            rows = rows[np.isin(self.profile_id[rows], profile_ids)]
+        return {profile_id: self.title[row] for profile_id, row in self._first_row_per_profile(rows).items()}
+
+
+def format_duplicate_key(profile: Dict[str, Any]) -> str:
+    """
+    Name and current company of a profile record, the key results are
+    de-duplicated on. Same defaults as filter_engine.build_result and
+    unique_matches.
+    """
+    return (str(profile.get("name", "Unknown")).lower().strip() + "\x1f"
+            + str(profile.get("current_company_name", "")).lower().strip())
+
+
+# Per-profile values the loop engine compares: (current company name, current
+# company LinkedIn URL, current title, current title lower-cased, position,
+# position lower-cased); the positions are None for profiles without one
+CurrentValues = Tuple[str, str, str, str, Optional[str], Optional[str]]
+
+
+class ProfileColumns:
+    """
+    Per-profile values the filter compares against, derived once at load time
+    with the same rules filter_engine.iter_matches applies per query.
+
+    duplicate_group gives profiles with the same name and current company
+    (the key results are de-duplicated on) the same id; duplicate_key holds
+    that key as a string. url is the normalized profile URL that ingested
+    profiles are upserted on.
+
+    After build_title_categories, each profile's job title categories are
+    kept as bitmaps (see title_category_bits) of its current title, its
+    position and all of its experience titles, so category searches and
+    category counts are bitwise operations.
+    """
+
+    STRING_COLUMNS = ("company_name_lower", "company_linkedin", "current_title", "current_title_lower",
+                      "position", "position_lower", "url", "duplicate_key")
+    BITMAPS = ("current_title_category_bits", "position_category_bits", "experience_category_bits")
+
+    def __init__(self, has_position: np.ndarray, duplicate_group: np.ndarray, columns: Dict[str, StringColumn]):
+        self.has_position = has_position
+        self.duplicate_group = duplicate_group
+        self.company_name_lower = columns["company_name_lower"]
+        self.company_linkedin = columns["company_linkedin"]
+        self.current_title = columns["current_title"]
+        self.current_title_lower = columns["current_title_lower"]
+        self.position = columns["position"]
+        self.position_lower = columns["position_lower"]
+        self.url = columns["url"]
+        self.duplicate_key = columns["duplicate_key"]
+        self.title_categories: Optional[TitleCategories] = None
+        self.current_title_category_bits: Optional[np.ndarray] = None
+        self.position_category_bits: Optional[np.ndarray] = None
+        self.experience_category_bits: Optional[np.ndarray] = None
+        self._current_values: Optional[Tuple[int, List[CurrentValues]]] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], parse_value: Callable[[str], Any],
+                     normalize_linkedin_url: Callable[[str], str]) -> "ProfileColumns":
+        has_position: List[bool] = []
+        duplicate_group: List[int] = []
+        group_ids: Dict[str, int] = {}
+        values: Dict[str, List[str]] = {name: [] for name in cls.STRING_COLUMNS}
+
+        for profile in records:
+            current_company_name = ""
+            current_title = ""
+            current_company_linkedin = ""
+
+            if "current_company_name" in profile:
+                current_company_name = str(profile.get("current_company_name", "")).strip().lower()
+                current_title = str(profile.get("title", "")).strip()
+
+            current_company = profile.get("current_company")
+            if isinstance(current_company, str):
+                current_company = parse_value(current_company)
+
+            if isinstance(current_company, dict):
+                if not current_company_name:
+                    current_company_name = str(current_company.get("name", "")).strip().lower()
+                if not current_title:
+                    current_title = str(current_company.get("title", "")).strip()
+                company_url = current_company.get("link") or current_company.get("url", "")
+                if company_url:
+                    current_company_linkedin = normalize_linkedin_url(str(company_url))
+
+            position = str(profile.get("position", "")).strip()
+
+            # Same defaults as filter_engine.build_result and unique_matches
+            duplicate_key = format_duplicate_key(profile)
+            duplicate_group.append(group_ids.setdefault(duplicate_key, len(group_ids)))
+
+            has_position.append("position" in profile)
+            values["company_name_lower"].append(current_company_name)
+            values["company_linkedin"].append(current_company_linkedin)
+            values["current_title"].append(current_title)
+            values["current_title_lower"].append(current_title.lower())
+            values["position"].append(position)
+            values["position_lower"].append(position.lower())
+            values["url"].append(normalize_linkedin_url(str(profile.get("url", "")).strip()))
+            values["duplicate_key"].append(duplicate_key)
+
+        columns = {name: StringColumn.from_strings(column) for name, column in values.items()}
+        return cls(np.array(has_position, dtype=bool), np.array(duplicate_group, dtype=np.int32), columns)
+
+    def __len__(self) -> int:
+        return len(self.has_position)
+
+    def current_values(self, start: int = 0, end: Optional[int] = None) -> List[CurrentValues]:
+        """
+        The compared values of profiles start to end (default: to the last)
+        as Python strings, indexed from start, for the loop engine (see
+        filter_engine.iter_matches). Decoded from the columns on first use and
+        kept, so searches never re-derive them from the rows; a shard worker
+        only decodes its own range.
+        """
+        end = len(self) if end is None else end
+        if self._current_values is not None:
+            cached_start, values = self._current_values
+            if cached_start <= start and end <= cached_start + len(values):
+                if (start, end) == (cached_start, cached_start + len(values)):
+                    return values
+                return values[start - cached_start:end - cached_start]
+
+        has_position = self.has_position[start:end].tolist()
+        values = [
+            (self.company_name_lower[index], self.company_linkedin[index], self.current_title[index],
+             self.current_title_lower[index],
+             self.position[index] if has_position[index - start] else None,
+             self.position_lower[index] if has_position[index - start] else None)
+            for index in range(start, end)
+        ]
+        self._current_values = (start, values)
+        return values
+    
+    def build_indexes(self):
+        """Build n-gram indexes over the matched profile columns"""
+        for name in ("company_name_lower", "company_linkedin", "current_title_lower", "position_lower"):
+            getattr(self, name).build_index()
+
+    def build_title_categories(self, title_categories: TitleCategories, experience_table: ExperienceTable):
+        """
+        Precompute every profile's job title categories. experience_table
+        must be the profiles' experience with its categories already built.
+        """
+        self.current_title_category_bits = title_category_bits(self.current_title_lower, title_categories)
+        self.position_category_bits = title_category_bits(self.position_lower, title_categories)
+        experience_bits = np.zeros(len(self), dtype=np.uint16)
+        np.bitwise_or.at(experience_bits, experience_table.profile_id, experience_table.title_category_bits)
+        self.experience_category_bits = experience_bits
+        self.title_categories = title_categories
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "has_position.npy"), self.has_position)
+        np.save(os.path.join(directory, "duplicate_group.npy"), self.duplicate_group)
+        for name in self.STRING_COLUMNS:
+            getattr(self, name).save(directory, name)
+        save_title_categories(directory, self.title_categories, {name: getattr(self, name) for name in self.BITMAPS})
+
+    @classmethod
+    def load(cls, directory: str) -> "ProfileColumns":
+        columns = {name: StringColumn.load(directory, name) for name in cls.STRING_COLUMNS}
+        profile_columns = cls(np.load(os.path.join(directory, "has_position.npy"), mmap_mode='r'),
+                              np.load(os.path.join(directory, "duplicate_group.npy"), mmap_mode='r'), columns)
+        profile_columns.title_categories, bitmaps = load_title_categories(directory, cls.BITMAPS)
+        for name, bits in bitmaps.items():
+            setattr(profile_columns, name, bits)
+        return profile_columns
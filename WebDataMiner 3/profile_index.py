@@ -0,0 +1,118 @@
+import os
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from columnar import StringColumn
+
+NGRAM = 3
+
+# Once this few distinct values are left, check them directly instead of
+# intersecting further posting lists
+VERIFY_THRESHOLD = 32
+
+
+def ngrams(value: str) -> set:
+    return {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+
+class NgramIndex:
+    """
+    Trigram inverted index over the distinct values of a StringColumn.
+
+    Company names, LinkedIn slugs and titles repeat across many rows, so the
+    index is kept over distinct values: trigram -> posting list of value ids,
+    plus value id -> the rows holding that value. A substring query intersects
+    the posting lists of the needle's trigrams (rarest first), verifies the few
+    remaining values with `in`, and expands them back to rows. Results are the
+    same as a full scan with `needle in value`.
+    """
+
+    def __init__(self, values: "StringColumn", grams: np.ndarray, gram_offsets: np.ndarray,
+                 gram_postings: np.ndarray, value_row_offsets: np.ndarray, value_rows: np.ndarray):
+        self.values = values
+        self.grams = grams
+        self.gram_offsets = gram_offsets
+        self.gram_postings = gram_postings
+        self.value_row_offsets = value_row_offsets
+        self.value_rows = value_rows
+
+    @classmethod
+    def build(cls, column: "StringColumn") -> "NgramIndex":
+        from columnar import StringColumn
+
+        value_ids: Dict[str, int] = {}
+        row_values = np.fromiter((value_ids.setdefault(value, len(value_ids)) for value in column),
+                                 dtype=np.int32, count=len(column))
+        distinct = list(value_ids)
+
+        postings: Dict[bytes, List[int]] = defaultdict(list)
+        for value_id, value in enumerate(distinct):
+            for gram in ngrams(value):
+                postings[gram.encode('utf-8')].append(value_id)
+
+        grams = sorted(postings)
+        gram_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum([len(postings[gram]) for gram in grams], out=gram_offsets[1:])
+        gram_postings = np.fromiter((value_id for gram in grams for value_id in postings[gram]),
+                                    dtype=np.int32, count=int(gram_offsets[-1]))
+
+        value_rows = np.argsort(row_values, kind='stable').astype(np.int32)
+        value_row_offsets = np.zeros(len(distinct) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_values, minlength=len(distinct)), out=value_row_offsets[1:])
+
+        return cls(StringColumn.from_strings(distinct), np.array(grams, dtype=f'S{4 * NGRAM}'),
+                   gram_offsets, gram_postings, value_row_offsets, value_rows)
+
+    def _posting(self, gram: str) -> Optional[np.ndarray]:
+        encoded = gram.encode('utf-8')
+        position = int(np.searchsorted(self.grams, encoded))
+        if position == len(self.grams) or self.grams[position] != encoded:
+            return None
+        return self.gram_postings[self.gram_offsets[position]:self.gram_offsets[position + 1]]
+
+    def contains_rows(self, needle: str) -> Optional[np.ndarray]:
+        """
+        Sorted indices of the rows whose value contains needle, or None if the
+        needle is too short to use the index and the caller has to scan.
+        """
+        if len(needle) < NGRAM:
+            return None
+
+        postings = []
+        for gram in ngrams(needle):
+            posting = self._posting(gram)
+            if posting is None:
+                return np.empty(0, dtype=np.int64)
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if len(candidates) <= VERIFY_THRESHOLD:
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        matching = [value_id for value_id in candidates.tolist() if needle in self.values[value_id]]
+        if not matching:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.concatenate([self.value_rows[self.value_row_offsets[value_id]:self.value_row_offsets[value_id + 1]]
+                               for value_id in matching])
+        return np.sort(rows).astype(np.int64)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.values.save(directory, "values")
+        for name in ("grams", "gram_offsets", "gram_postings", "value_row_offsets", "value_rows"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str) -> "NgramIndex":
+        from columnar import StringColumn
+
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                  for name in ("grams", "gram_offsets", "gram_postings", "value_row_offsets", "value_rows")}
+        return cls(StringColumn.load(directory, "values"), **arrays)
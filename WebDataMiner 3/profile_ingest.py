@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Incremental ingestion of downloaded profiles into the profile store.
+
+The compiled CSV snapshot stays immutable. Profiles from Bright Data snapshots
+are upserted by profile URL into an append-only NDJSON log next to it; a
+profile is only written when its content hash differs from the version the
+store already has. Every ProfileStore tails the log and layers the ingested
+profiles over the base dataset as a ProfileDelta, segments with their own
+columns, indexes and filter engine, hiding the rows they supersede. New data
+is therefore searchable after reading just the new log lines and building
+columns for them, without re-parsing the CSV or rebuilding the base indexes.
+
+Usage:
+    python profile_ingest.py <snapshot.ndjson> [...]
+"""
+
+import bisect
+import copy
+import fcntl
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from filter_engine import TITLE_CATEGORIES, FilterQuery, Match, api_profile_record, normalize_linkedin_url, parse_value
+from filter_stats import FilterStats
+from profile_columns import ExperienceTable, ProfileColumns, format_duplicate_key
+from vectorized_filter import VectorizedFilterEngine
+
+if TYPE_CHECKING:
+    from csv_data_service import CSVDataService
+    from profile_store import ProfileStore
+
+logger = logging.getLogger(__name__)
+
+# Ingest downloaded Bright Data snapshots into the profile store
+PROFILE_INGEST = os.environ.get("PROFILE_INGEST", "1") == "1"
+# Changed profiles are appended to the log in batches of this size
+INGEST_BATCH_SIZE = int(os.environ.get("PROFILE_INGEST_BATCH_SIZE", 1000))
+
+
+def default_ingest_path(csv_file_path: str) -> str:
+    """Ingest log used for a CSV when none is configured"""
+    return f"{csv_file_path}.ingest.ndjson"
+
+
+# Columns of a profile row, as built by api_profile_record
+PROFILE_COLUMNS = tuple(api_profile_record({}))
+
+
+def canonical_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A profile row in one shape whether it is a base row (parsed from the CSV,
+    with missing cells as NaN) or an api_profile_record: the profile columns
+    only, text as str, and current_company and experience parsed, without
+    empty values.
+    """
+    canonical: Dict[str, Any] = {}
+    for column in PROFILE_COLUMNS:
+        value = record.get(column)
+        if column == "current_company":
+            current_company = parse_value(value)
+            canonical[column] = ({key: item for key, item in current_company.items() if item}
+                                 if isinstance(current_company, dict) else {})
+        elif column == "experience":
+            canonical[column] = parse_value(value) or []
+        elif value is None or (isinstance(value, float) and math.isnan(value)):
+            canonical[column] = ""
+        else:
+            canonical[column] = str(value)
+    return canonical
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """Content hash of a profile row (see canonical_record), used to skip profiles that have not changed"""
+    encoded = json.dumps(canonical_record(record), sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+class IngestLog:
+    """
+    Append-only NDJSON file of ingested profiles, one {"url", "hash", "record"}
+    entry per line; the last entry for a URL wins. Writers from several
+    processes are serialized with an exclusive file lock, and readers only
+    consume complete lines, so a reader never sees a partial append.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read(self, offset: int = 0, end: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Entries appended after byte offset (up to byte end if given), and the offset to continue from"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read() if end is None else f.read(max(end - offset, 0))
+        except OSError:
+            return [], offset
+
+        end = data.rfind(b"\n") + 1
+        entries = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping malformed line in ingest log {self.path}: {str(e)}")
+        return entries, offset + end
+
+
+class DeltaSegment:
+    """
+    Columns, indexes and filter engine over a run of consecutive delta rows,
+    with the upsert bookkeeping for the entries in it
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], start: int, build_indexes: bool = False):
+        self.start = start
+        self.records = records
+        self.experience_table = ExperienceTable.from_records(records, parse_value, normalize_linkedin_url)
+        self.profile_columns = ProfileColumns.from_records(records, parse_value, normalize_linkedin_url)
+        if build_indexes:
+            self.experience_table.build_indexes()
+            self.profile_columns.build_indexes()
+        self.experience_table.build_title_categories(TITLE_CATEGORIES)
+        self.profile_columns.build_title_categories(TITLE_CATEGORIES, self.experience_table)
+        self.vectorized_engine = VectorizedFilterEngine(self.profile_columns, self.experience_table)
+        # URL -> content hash and profile id of its latest entry in this segment
+        self.hashes: Dict[str, str] = {}
+        self.latest_rows: Dict[str, int] = {}
+        # Duplicate group of each row, and the ids of earlier rows the entries supersede
+        self.duplicate_group = np.empty(0, dtype=np.int32)
+        self.replaced = np.empty(0, dtype=np.int64)
+        # Duplicate keys first seen in this segment -> their new groups
+        self.group_ids: Dict[str, int] = {}
+
+    @classmethod
+    def merge(cls, first: "DeltaSegment", second: "DeltaSegment", build_indexes: bool = False) -> "DeltaSegment":
+        """One segment over the rows of first followed by those of second"""
+        segment = cls(first.records + second.records, first.start, build_indexes)
+        segment.hashes = {**first.hashes, **second.hashes}
+        segment.latest_rows = {**first.latest_rows, **second.latest_rows}
+        segment.duplicate_group = np.concatenate([first.duplicate_group, second.duplicate_group])
+        segment.replaced = np.concatenate([first.replaced, second.replaced])
+        segment.group_ids = {**first.group_ids, **second.group_ids}
+        return segment
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def match(self, query: FilterQuery, stats: Optional[FilterStats] = None) -> List[Match]:
+        """VectorizedFilterEngine.match over the segment, with dataset-wide profile ids"""
+        return [(profile_id + self.start, display_title, executive_inference)
+                for profile_id, display_title, executive_inference in self.vectorized_engine.match(query, stats)]
+
+
+class ProfileDelta:
+    """
+    Ingested profiles layered over a base dataset.
+
+    Every ingest log entry is a delta row, with id base_count + its position
+    in the log, so ids depend only on the log contents and not on how it was
+    read. Base rows and earlier delta rows with the URL of a later entry are
+    superseded and dropped from every result. Duplicate groups cover base and
+    delta rows, so de-duplication works across both.
+
+    A delta is never modified: extend() returns a new one sharing this one's
+    segments, so searches in flight keep a consistent view. Each extend
+    builds a new segment holding the new rows with their columns, URL and
+    duplicate key lookups, so its cost depends on the new rows only; lookups
+    search the segments newest first. A segment is merged with the one
+    before it once it is as large, which keeps the number of segments
+    logarithmic in the number of rows.
+    """
+
+    def __init__(self, base: "CSVDataService", build_indexes: bool = False):
+        self.base_count = base.profile_count
+        self.build_indexes = build_indexes
+        self.segments: List[DeltaSegment] = []
+        self.base_duplicate_group = (base.profile_columns.duplicate_group if base.profile_columns is not None
+                                     else np.empty(0, dtype=np.int32))
+        self._count = 0
+        self._replaced: Optional[np.ndarray] = None
+        self._base_url_rows = base.profile_url_rows()
+        self._base_group_ids = base.duplicate_group_ids()
+        self._next_group = int(self.base_duplicate_group.max()) + 1 if len(self.base_duplicate_group) else 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def extend(self, entries: List[Dict[str, Any]]) -> "ProfileDelta":
+        """A delta with entries appended, see the class docstring; this one is left unchanged"""
+        if not entries:
+            return self
+        delta = copy.copy(self)
+        delta._replaced = None
+        start = self.base_count + self._count
+        segment = DeltaSegment([entry["record"] for entry in entries], start, self.build_indexes)
+
+        replaced = []
+        for profile_id, entry in enumerate(entries, start):
+            url = entry["url"]
+            previous = segment.latest_rows.get(url, self.latest_row(url))
+            if previous is not None:
+                replaced.append(previous)
+            else:
+                replaced += self._base_url_rows.get(url, ())
+            segment.hashes[url] = entry["hash"]
+            segment.latest_rows[url] = profile_id
+        segment.replaced = np.array(replaced, dtype=np.int64)
+
+        # Delta profiles join the base duplicate group with the same key, or get new ones
+        groups = []
+        for record in segment.records:
+            key = format_duplicate_key(record)
+            group = segment.group_ids.get(key, self._group_id(key))
+            if group is None:
+                group = segment.group_ids[key] = delta._next_group
+                delta._next_group += 1
+            groups.append(group)
+        segment.duplicate_group = np.array(groups, dtype=np.int32)
+
+        segments = self.segments + [segment]
+        while len(segments) > 1 and len(segments[-2]) <= len(segments[-1]):
+            segments[-2:] = [DeltaSegment.merge(segments[-2], segments[-1], self.build_indexes)]
+        delta.segments = segments
+        delta._count = self._count + len(entries)
+        return delta
+
+    def latest_row(self, url: str) -> Optional[int]:
+        """Profile id of the latest delta row for a normalized profile URL, if any"""
+        for segment in reversed(self.segments):
+            if url in segment.latest_rows:
+                return segment.latest_rows[url]
+        return None
+
+    def current_hash(self, url: str) -> Optional[str]:
+        """Content hash of the latest delta row for a normalized profile URL, if any"""
+        for segment in reversed(self.segments):
+            if url in segment.hashes:
+                return segment.hashes[url]
+        return None
+
+    def _group_id(self, key: str) -> Optional[int]:
+        if key in self._base_group_ids:
+            return self._base_group_ids[key]
+        for segment in self.segments:
+            if key in segment.group_ids:
+                return segment.group_ids[key]
+        return None
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """Every delta row, in profile id order"""
+        return [record for segment in self.segments for record in segment.records]
+
+    @property
+    def replaced(self) -> np.ndarray:
+        """Ids of the base and delta rows superseded by a later ingested profile"""
+        if self._replaced is None:
+            self._replaced = np.concatenate([np.empty(0, dtype=np.int64)] +
+                                            [segment.replaced for segment in self.segments])
+        return self._replaced
+
+    def _segment(self, profile_id: int) -> DeltaSegment:
+        starts = [segment.start for segment in self.segments]
+        return self.segments[bisect.bisect_right(starts, profile_id) - 1]
+
+    def record(self, profile_id: int) -> Dict[str, Any]:
+        segment = self._segment(profile_id)
+        return segment.records[profile_id - segment.start]
+
+    def record_range(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """Delta rows with profile ids start to end"""
+        records: List[Dict[str, Any]] = []
+        for segment in self.segments:
+            if segment.start < end and start < segment.start + len(segment):
+                records += segment.records[max(start - segment.start, 0):end - segment.start]
+        return records
+
+    def duplicate_groups(self, profile_ids: np.ndarray) -> np.ndarray:
+        """Duplicate group of each of profile_ids, base or delta rows"""
+        groups = np.empty(len(profile_ids), dtype=np.int32)
+        in_base = profile_ids < self.base_count
+        groups[in_base] = self.base_duplicate_group[profile_ids[in_base]]
+        for segment in self.segments:
+            in_segment = (profile_ids >= segment.start) & (profile_ids < segment.start + len(segment))
+            groups[in_segment] = segment.duplicate_group[profile_ids[in_segment] - segment.start]
+        return groups
+
+    def profile_ids_for_url(self, url: str) -> List[int]:
+        """Delta rows whose normalized profile URL is url, superseded ones included"""
+        return [segment.start + index for segment in self.segments
+                for index, row_url in enumerate(segment.profile_columns.url) if row_url == url]
+
+    def match(self, query: FilterQuery, stats: Optional[FilterStats] = None) -> List[Match]:
+        """VectorizedFilterEngine.match over every segment, with dataset-wide profile ids"""
+        matches: List[Match] = []
+        for segment in self.segments:
+            matches += segment.match(query, stats)
+        return matches
+
+    def drop_replaced(self, matches: List[Match]) -> List[Match]:
+        """Matches without the rows superseded by a later ingested profile"""
+        if len(self.replaced) == 0:
+            return matches
+        profile_ids = np.fromiter((match[0] for match in matches), dtype=np.int64, count=len(matches))
+        keep = ~np.isin(profile_ids, self.replaced)
+        return [match for match, kept in zip(matches, keep.tolist()) if kept]
+
+    def live_profile_ids(self) -> List[int]:
+        """Every current profile id: base and delta rows not superseded"""
+        live = np.ones(self.base_count + self._count, dtype=bool)
+        live[self.replaced] = False
+        return np.flatnonzero(live).tolist()
+
+
+class ProfileIngestor:
+    """
+    Upserts profiles into a ProfileStore's ingest log. Each profile is
+    compared by content hash against the version the store currently holds
+    (ingested or base) and only new or changed ones are written, in batches
+    of batch_size. finish() flushes the rest and makes them searchable.
+    """
+
+    def __init__(self, store: "ProfileStore", batch_size: int = INGEST_BATCH_SIZE):
+        self.store = store
+        self.service = store.get_service()
+        self.batch_size = batch_size
+        self.pending: List[Dict[str, Any]] = []
+        self.written: Dict[str, str] = {}
+        self.stats = {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+
+    def _current_hash(self, url: str) -> Optional[str]:
+        if url in self.written:
+            return self.written[url]
+        delta = self.service.delta
+        if delta is not None:
+            current_hash = delta.current_hash(url)
+            if current_hash is not None:
+                return current_hash
+        rows = self.service.profile_url_rows().get(url, ())
+        if len(rows) == 1:
+            return record_hash(self.service.get_record(rows[0]))
+        return None
+
+    def add(self, profile: Dict[str, Any]):
+        """Queue a downloaded profile for upserting if it is new or changed"""
+        record = api_profile_record(profile)
+        url = normalize_linkedin_url(str(record["url"]).strip())
+        if not url:
+            self.stats["skipped"] += 1
+            return
+
+        content_hash = record_hash(record)
+        current_hash = self._current_hash(url)
+        if content_hash == current_hash:
+            self.stats["unchanged"] += 1
+            return
+
+        known = current_hash is not None or url in self.service.profile_url_rows()
+        self.stats["updated" if known else "added"] += 1
+        self.written[url] = content_hash
+        self.pending.append({"url": url, "hash": content_hash, "record": record})
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def tee(self, profiles: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass profiles through unchanged while ingesting them"""
+        for profile in profiles:
+            self.add(profile)
+            yield profile
+
+    def flush(self):
+        self.store.ingest_log.append(self.pending)
+        self.pending = []
+
+    def finish(self) -> Dict[str, int]:
+        """Write remaining profiles, reload the store so they are searchable, return counts"""
+        self.flush()
+        if self.stats["added"] or self.stats["updated"]:
+            self.store.reload_if_changed()
+        logger.info(f"Ingested profiles: {self.stats}")
+        return self.stats
+
+
+def ingest_profiles(profiles: Iterable[Dict[str, Any]], store: Optional["ProfileStore"] = None) -> Dict[str, int]:
+    """Upsert downloaded profiles into the profile store, see ProfileIngestor"""
+    if store is None:
+        from profile_store import get_profile_store
+        store = get_profile_store()
+
+    ingestor = ProfileIngestor(store)
+    for profile in profiles:
+        ingestor.add(profile)
+    return ingestor.finish()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from brightdata_service import iter_snapshot_profiles
+
+    for snapshot_file in sys.argv[1:]:
+        with open(snapshot_file, 'rb') as f:
+            print(snapshot_file, ingest_profiles(iter_snapshot_profiles(iter(lambda: f.read(1 << 16), b''))))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Compiled binary snapshots of the profile CSV.
+
+Parsing the CSV means running ast.literal_eval over every nested
+current_company/experience cell, which dominates worker start-up. The compile
+step does that work once and writes the parsed rows to a snapshot directory
+next to the CSV; workers then open the snapshot with mmap and only decode the
+rows they actually touch.
+
+Usage:
+    python profile_snapshot.py [csv_file_path] [snapshot_path]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from columnar import StringColumn
+from profile_columns import ExperienceTable, ProfileColumns
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 7
+MANIFEST_NAME = "manifest.json"
+
+
+def default_snapshot_path(csv_file_path: str) -> str:
+    """Snapshot directory used for a CSV when none is configured"""
+    return f"{csv_file_path}.snapshot"
+
+
+def file_sha1(path: str) -> str:
+    """SHA-1 of a file's contents, read in 1 MiB chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compile_snapshot(csv_file_path: str, snapshot_path: Optional[str] = None) -> str:
+    """
+    Parse the CSV once and write it out as a snapshot directory.
+    Returns the snapshot path.
+    """
+    from csv_data_service import CSVDataService
+
+    snapshot_path = snapshot_path or default_snapshot_path(csv_file_path)
+    started = time.perf_counter()
+
+    source_stat = os.stat(csv_file_path)
+    service = CSVDataService(csv_file_path, use_snapshot=False)
+    if service.experience_table is None:
+        raise ValueError(f"Could not parse {csv_file_path}, snapshot not written")
+    records = service.data.to_dict('records')
+
+    # Build into a temporary directory and swap it in, so a worker opening the
+    # snapshot concurrently sees either the old or the new version
+    tmp_path = f"{snapshot_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    StringColumn.from_strings(
+        json.dumps(record, ensure_ascii=False, default=str) for record in records
+    ).save(tmp_path, "records")
+    service.experience_table.save(os.path.join(tmp_path, "experience"))
+    service.profile_columns.save(os.path.join(tmp_path, "profiles"))
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "row_count": len(records),
+        "columns": [str(column) for column in service.data.columns],
+        "source": {
+            "path": os.path.abspath(csv_file_path),
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "sha1": file_sha1(csv_file_path),
+        },
+        "created_at": time.time(),
+    }
+    with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = f"{snapshot_path}.old-{os.getpid()}"
+    if os.path.exists(snapshot_path):
+        os.rename(snapshot_path, old_path)
+    os.rename(tmp_path, snapshot_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    logger.info(f"Compiled {len(records)} profiles into {snapshot_path} in {time.perf_counter() - started:.2f}s")
+    return snapshot_path
+
+
+class ProfileSnapshot:
+    """Read-only, memory-mapped view of a compiled profile snapshot"""
+
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        with open(os.path.join(snapshot_path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {self.manifest.get('format_version')}")
+
+        self.columns: List[str] = self.manifest["columns"]
+        self._records = StringColumn.load(snapshot_path, "records")
+        self.experience_table = ExperienceTable.load(os.path.join(snapshot_path, "experience"))
+        self.profile_columns = ProfileColumns.load(os.path.join(snapshot_path, "profiles"))
+
+    @classmethod
+    def open_if_fresh(cls, csv_file_path: str, snapshot_path: Optional[str] = None) -> Optional["ProfileSnapshot"]:
+        """
+        Open the snapshot for csv_file_path if one exists and was compiled from
+        the current CSV contents. Returns None when the caller should fall back
+        to parsing the CSV.
+        """
+        snapshot_path = snapshot_path or default_snapshot_path(csv_file_path)
+        if not os.path.exists(os.path.join(snapshot_path, MANIFEST_NAME)):
+            return None
+
+        try:
+            snapshot = cls(snapshot_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable snapshot {snapshot_path}: {str(e)}")
+            return None
+
+        if not snapshot.is_fresh_for(csv_file_path):
+            logger.warning(f"Snapshot {snapshot_path} is stale, falling back to CSV. "
+                           f"Run `python profile_snapshot.py {csv_file_path}` to recompile.")
+            return None
+
+        return snapshot
+
+    @property
+    def source_sha1(self) -> str:
+        return self.manifest["source"]["sha1"]
+
+    def is_fresh_for(self, csv_file_path: str) -> bool:
+        """True if the snapshot was compiled from the CSV as it is now"""
+        try:
+            stat = os.stat(csv_file_path)
+        except OSError:
+            # Snapshot-only deployments ship without the CSV
+            return True
+
+        source = self.manifest["source"]
+        if stat.st_size != source["size"]:
+            return False
+        if stat.st_mtime_ns == source["mtime_ns"]:
+            return True
+
+        # Same size, different mtime (e.g. a fresh checkout) - compare contents
+        return file_sha1(csv_file_path) == source["sha1"]
+
+    def __len__(self) -> int:
+        return self.manifest["row_count"]
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Decode a single profile row"""
+        return json.loads(self._records[index])
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.record(index)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from csv_data_service import DEFAULT_CSV_PATH
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV_PATH
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    compile_snapshot(csv_path, output_path)
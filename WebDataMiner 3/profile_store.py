@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from csv_data_service import CSVDataService, DEFAULT_CSV_PATH
+from profile_ingest import IngestLog, ProfileDelta, default_ingest_path
+from profile_snapshot import ProfileSnapshot, file_sha1
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileStore:
+    """
+    Process-wide holder of the parsed profile dataset.
+
+    The CSV is parsed once and the resulting CSVDataService is shared by every
+    request thread. A background thread checks the source file every
+    check_interval seconds; when it changes a fresh service is built off to
+    the side and swapped in atomically, so in-flight searches keep using the
+    dataset they started with and requests never wait for a reload.
+
+    Profiles ingested from Bright Data snapshots are tailed from the ingest log
+    (see profile_ingest) and layered over the parsed dataset; only the new log
+    lines are read and columns are built for them alone.
+    """
+
+    def __init__(self, csv_file_path: str = DEFAULT_CSV_PATH, check_interval: float = 5.0,
+                 ingest_path: Optional[str] = None):
+        self.csv_file_path = csv_file_path
+        self.check_interval = check_interval
+        self.ingest_log = IngestLog(ingest_path or default_ingest_path(csv_file_path))
+        self._service: Optional[CSVDataService] = None
+        self._base_service: Optional[CSVDataService] = None
+        self._ingested: List[Dict[str, Any]] = []
+        self._ingest_offset = 0
+        self._delta: Optional[ProfileDelta] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._content_hash: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher_pid: Optional[int] = None
+
+    @property
+    def version(self) -> str:
+        """Short content hash identifying the loaded dataset"""
+        return self.get_service().dataset_version
+
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        """Cheap change detector for the source file: (mtime_ns, size)"""
+        try:
+            stat = os.stat(self.csv_file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _hash_source(self) -> Optional[str]:
+        """SHA-1 of the source file contents, used to ignore touch-only changes"""
+        try:
+            return file_sha1(self.csv_file_path)
+        except OSError:
+            return None
+
+    def get_service(self) -> CSVDataService:
+        """Return the current dataset, loading it on first use"""
+        if self._service is None:
+            self.reload_if_changed()
+        self._start_watcher()
+        return self._service
+
+    def _start_watcher(self):
+        """Start the reload thread in this process (threads do not survive a fork, so once per pid)"""
+        if self._watcher_pid == os.getpid() or self.check_interval <= 0:
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="profile-store-reload", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Error reloading profile store: {str(e)}")
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        Re-parse the source file if its signature and content hash changed,
+        and apply profiles appended to the ingest log since the last check.
+        Returns True when a new dataset was swapped in.
+        """
+        with self._reload_lock:
+            base_changed = self._reload_base(force)
+            entries, replayed = self._read_ingest_log()
+            if not base_changed and not replayed and not entries:
+                return False
+
+            started = time.perf_counter()
+            if base_changed or replayed or self._delta is None:
+                # Profile ids of the delta follow the base rows, start over from the whole log
+                self._delta = self._base_service.empty_delta()
+                entries = self._ingested
+            self._delta = self._delta.extend(entries)
+
+            service = self._base_service
+            if len(self._delta):
+                service = service.with_delta(self._delta)
+                service.source = (self.csv_file_path, self._content_hash, self.ingest_log.path, self._ingest_offset)
+                version_source = f"{self._content_hash}:delta:{self._ingest_offset}"
+                service.dataset_version = hashlib.sha1(version_source.encode('utf-8')).hexdigest()[:16]
+                logger.info(f"Profile store applied {len(entries)} ingested profiles "
+                            f"in {time.perf_counter() - started:.2f}s (version {service.dataset_version})")
+
+            # Single reference assignment, readers never see a half-built dataset
+            self._service = service
+            return True
+
+    def _reload_base(self, force: bool = False) -> bool:
+        """Parse the source file into a new base dataset if it changed, returns True if it did"""
+        signature = self._source_signature()
+
+        if not force and self._base_service is not None and signature == self._signature:
+            return False
+
+        # A current snapshot records the hash of the CSV it was compiled from, so the
+        # file is only read in full when there is no snapshot and it has to be parsed
+        snapshot = ProfileSnapshot.open_if_fresh(self.csv_file_path)
+        content_hash = snapshot.source_sha1 if snapshot is not None else self._hash_source()
+        if not force and self._base_service is not None and content_hash == self._content_hash:
+            # Touched but not modified - keep the parsed data
+            self._signature = signature
+            return False
+
+        started = time.perf_counter()
+        service = CSVDataService(self.csv_file_path, snapshot=snapshot)
+        service.dataset_version = service.base_version = (content_hash or "empty")[:16]
+        service.source = (self.csv_file_path, content_hash, None, 0)
+
+        self._base_service = service
+        self._signature = signature
+        self._content_hash = content_hash
+
+        logger.info(f"Profile store loaded {service.profile_count} profiles from {self.csv_file_path} "
+                    f"in {time.perf_counter() - started:.2f}s (version {service.dataset_version})")
+        return True
+
+    def _read_ingest_log(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Entries appended to the ingest log since the last read, and whether the
+        log was truncated or replaced and has been read again from the start
+        """
+        replayed = self.ingest_log.size() < self._ingest_offset
+        if replayed:
+            self._ingested = []
+            self._ingest_offset = 0
+
+        entries, self._ingest_offset = self.ingest_log.read(self._ingest_offset)
+        self._ingested += entries
+        return entries, replayed
+
+    def filter_profiles(self, company_name: str = "", linkedin_url: str = "", job_title: str = "") -> List[Dict[str, Any]]:
+        """Filter the shared dataset, see CSVDataService.filter_profiles"""
+        return self.get_service().filter_profiles(company_name, linkedin_url, job_title)
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    """Return the process-wide profile store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProfileStore(
+                    csv_file_path=os.environ.get("PROFILE_CSV_PATH", DEFAULT_CSV_PATH),
+                    check_interval=float(os.environ.get("PROFILE_RELOAD_INTERVAL", "5")),
+                    ingest_path=os.environ.get("PROFILE_INGEST_PATH"),
+                )
+    return _store
+
+
+def preload_profile_store() -> ProfileStore:
+    """
+    Load the dataset eagerly. Called at app import time so that with
+    `gunicorn --preload` the parsed data is created before workers fork and
+    shared between them copy-on-write. The reload thread is left to each
+    worker's first request, so none runs (or holds a lock) across the fork.
+    """
+    store = get_profile_store()
+    store.reload_if_changed()
+    return store
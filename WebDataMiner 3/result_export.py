@@ -0,0 +1,107 @@
+"""
+Streaming serializers for result downloads.
+
+Each writer takes an iterable of result dicts and yields text chunks, so a
+download is produced one profile at a time instead of being built in memory.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from profile_columns import iter_experience_dicts
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+# Content-Encoding -> zlib wbits (gzip container, zlib-wrapped deflate as HTTP expects)
+COMPRESSIONS = {"gzip": 31, "deflate": 15}
+
+CSV_PROFILE_FIELDS = ("name", "url", "city", "position", "title", "matched_job_title",
+                      "executive_inference", "current_company_name", "company_linkedin_link")
+CSV_EXPERIENCE_FIELDS = ("title", "company", "url", "location", "start_date", "end_date", "duration")
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json(profiles: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Same text as json.dumps(list(profiles), indent=2), one profile at a time"""
+    first = True
+    for profile in profiles:
+        item = json.dumps(profile, indent=2).replace("\n", "\n  ")
+        yield ("[\n  " if first else ",\n  ") + item
+        first = False
+    yield "[]" if first else "\n]"
+
+
+def iter_ndjson(profiles: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for profile in profiles:
+        yield json.dumps(profile) + "\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def iter_csv(profiles: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    One row per experience entry with the profile's fields repeated, or a
+    single row with empty experience columns for profiles without any.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(CSV_PROFILE_FIELDS) + [f"experience_{field}" for field in CSV_EXPERIENCE_FIELDS])
+
+    for profile in profiles:
+        profile_row = [_csv_value(profile.get(field)) for field in CSV_PROFILE_FIELDS]
+        experiences = list(iter_experience_dicts(profile.get("experience")))
+        for exp in experiences or [{}]:
+            writer.writerow(profile_row + [_csv_value(exp.get(field)) for field in CSV_EXPERIENCE_FIELDS])
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+WRITERS = {"json": iter_json, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def iter_export(profiles: Iterable[Dict[str, Any]], export_format: str,
+                compression: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Serialize profiles in export_format as encoded chunks of about CHUNK_SIZE
+    bytes, compressed with compression ("gzip"/"deflate") if given.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, COMPRESSIONS[compression]) if compression else None
+    pending = []
+    pending_size = 0
+
+    for text in WRITERS[export_format](profiles):
+        data = text.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size < CHUNK_SIZE:
+            continue
+
+        chunk = b"".join(pending)
+        pending, pending_size = [], 0
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+
+    chunk = b"".join(pending)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
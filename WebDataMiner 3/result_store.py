@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """
+    Server-side store for filter results, keyed by request id.
+
+    Recently used result lists are kept in process memory in LRU order up to
+    an approximate byte budget; anything evicted (or created by another
+    worker) is reloaded from the FilterRequest row in the database. This keeps
+    result payloads out of the Flask session cookie.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, Tuple[List[Dict[str, Any]], int]]" = OrderedDict()
+        self._derived: Dict[int, Dict[str, Any]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_size(results: List[Dict[str, Any]], sample: int = 20) -> int:
+        """Approximate serialized size of results, extrapolated from the first few"""
+        if not results:
+            return 0
+        head = results[:sample]
+        return len(json.dumps(head, default=str)) * len(results) // len(head)
+
+    def put(self, request_id: int, results: List[Dict[str, Any]], size: Optional[int] = None):
+        """Cache results for a request; size is their serialized size in bytes if known"""
+        if size is None:
+            size = self.estimate_size(results)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if request_id in self._entries:
+                self._size -= self._entries.pop(request_id)[1]
+            self._derived.pop(request_id, None)
+
+            self._entries[request_id] = (results, size)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                evicted_id, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._derived.pop(evicted_id, None)
+                logger.debug(f"Evicted results for request {evicted_id} from result store")
+
+    def get(self, request_id: int) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(request_id)
+            return entry[0]
+
+    def get_or_load(self, filter_request) -> List[Dict[str, Any]]:
+        """
+        Results for a FilterRequest, from memory if present, otherwise from the
+        database. Errors loading them propagate and nothing is cached.
+        """
+        results = self.get(filter_request.id)
+        if results is None:
+            results = filter_request.get_results()
+            self.put(filter_request.id, results)
+        return results
+
+    def iter_results(self, filter_request) -> Iterator[Dict[str, Any]]:
+        """
+        Results for a FilterRequest one at a time: from memory if cached,
+        otherwise streamed from the dataset without caching the full list.
+        """
+        results = self.get(filter_request.id)
+        if results is not None:
+            return iter(results)
+        return filter_request.iter_results()
+
+    def get_derived(self, filter_request, name: str, build: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+        """
+        A value computed from a request's results (e.g. ranking features),
+        built on first use and dropped together with the cached results.
+        """
+        results = self.get_or_load(filter_request)
+        with self._lock:
+            derived = self._derived.get(filter_request.id, {})
+            if name in derived:
+                return derived[name]
+
+        value = build(results)
+        with self._lock:
+            if filter_request.id in self._entries:
+                self._derived.setdefault(filter_request.id, {})[name] = value
+        return value
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Return the process-wide result store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+    return _store
+
+
+# Fields results can be sorted on by the results API
+SORT_FIELDS = ("name", "city", "position", "current_company_name", "matched_job_title")
+
+
+def sort_order(results: List[Dict[str, Any]], sort: str = "", descending: bool = False) -> List[int]:
+    """Result indices sorted on a field (case-insensitive, stable), or the filter's order"""
+    order = list(range(len(results)))
+    if sort:
+        order.sort(key=lambda index: str(results[index].get(sort) or "").lower(), reverse=descending)
+    return order
+
+
+def project(profiles: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Profiles reduced to the given fields, or unchanged if none are given"""
+    if not fields:
+        return profiles
+    return [{field: profile.get(field) for field in fields if field in profile} for profile in profiles]
+
+
+def page_results(results: List[Dict[str, Any]], offset: int, limit: int, sort: str = "",
+                 descending: bool = False, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    One page of results, optionally sorted and projected onto the given
+    fields. Unsorted pages keep the filter's order.
+    """
+    if sort:
+        page = [results[index] for index in sort_order(results, sort, descending)[offset:offset + limit]]
+    else:
+        page = results[offset:offset + limit]
+    return project(page, fields)
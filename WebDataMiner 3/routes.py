@@ -1,13 +1,29 @@
-from flask import render_template, request, jsonify, session, redirect, url_for, make_response
+from flask import Response, render_template, request, jsonify, session, redirect, url_for, stream_with_context
 from app import app, db
+from csv_data_service import BatchUnavailable
+from filter_engine import FilterQuery
+from filter_stats import FilterStats, get_filter_metrics
 from models import FilterRequest
-from csv_data_service import CSVDataService
+from profile_store import get_profile_store
+from result_export import COMPRESSIONS, EXPORT_FORMATS, iter_export
+from result_store import SORT_FIELDS, get_result_store, page_results, project, sort_order
+from title_ranking import TitleFeatures, rank_results, resolve_titles
 from datetime import datetime
 import json
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SPECS = 500
+
+def wants_stats(payload=None):
+    """True if the client asked for per-stage filter stats (stats=1 in the form, query string or JSON body)"""
+    value = (payload or {}).get('stats', request.values.get('stats', ''))
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
 @app.route('/')
 def index():
     """Main page with filtering form"""
@@ -25,16 +41,22 @@ def filter_profiles():
         if not base_company:
             return jsonify({'error': 'Base company name is required'}), 400
         
-        # Check if we have cached results from previous requests
-        cached_request = FilterRequest.find_cached_request(
-            base_company, extra_company or None, linkedin_url or None, job_title or None
+        # Pin the dataset for this request so the cache key matches the data searched
+        profile_service = get_profile_store().get_service()
+        cache_key = FilterRequest.build_cache_key(
+            base_company, extra_company or None, linkedin_url or None, job_title or None,
+            profile_service.dataset_version
         )
         
+        # Check if we have cached results from previous requests
+        stats = FilterStats()
+        with stats.stage('cache_lookup'):
+            cached_request = FilterRequest.find_cached_request(cache_key)
+        
         if cached_request:
             logger.info(f"Returning cached results from request ID: {cached_request.id}")
-            cached_results = cached_request.get_results()
             
-            # Create new filter request record for this cached result
+            # Create new filter request record sharing the cached result references
             filter_request = FilterRequest(
                 base_company=base_company,
                 extra_company=extra_company or None,
@@ -42,31 +64,23 @@ def filter_profiles():
                 job_title=job_title or None,
                 status='completed',
                 completed_at=datetime.utcnow(),
-                result_count=len(cached_results)
+                cache_key=cache_key
             )
-            filter_request.set_results(cached_results)
+            filter_request.copy_results_from(cached_request)
             db.session.add(filter_request)
             db.session.commit()
             
-            # Store results in session
-            session[f'results_{filter_request.id}'] = cached_results
+            session['last_request_id'] = filter_request.id
             
-            return jsonify({
+            response = {
                 'success': True,
                 'request_id': filter_request.id,
                 'cached': True,
-                'result_count': len(cached_results)
-            })
-        
-        # Process data directly using CSV service
-        csv_service = CSVDataService()
-        
-        # Filter profiles immediately using CSV data (no job title filtering at this stage)
-        filtered_profiles = csv_service.filter_profiles(
-            company_name=base_company,
-            linkedin_url=linkedin_url,
-            job_title=""  # No job title filtering initially - will be done on results page
-        )
+                'result_count': filter_request.result_count
+            }
+            if wants_stats():
+                response['stats'] = stats.to_dict()
+            return jsonify(response)
         
         # Create filter request record with completed results
         filter_request = FilterRequest(
@@ -76,36 +90,139 @@ def filter_profiles():
             job_title=job_title or None,
             status='completed',
             completed_at=datetime.utcnow(),
-            result_count=len(filtered_profiles)
+            cache_key=cache_key
         )
-        filter_request.set_results(filtered_profiles)
+        
+        # Filter profiles immediately using the shared, preloaded CSV data
+        # (no job title filtering at this stage - will be done on results page)
+        matches = filter_request.match_profiles(profile_service, stats)
+        
+        # Store references into the dataset rather than full profile JSON
+        filter_request.set_matches(matches, profile_service)
         db.session.add(filter_request)
         db.session.commit()
         
-        # Store results in session
-        session[f'results_{filter_request.id}'] = filtered_profiles
+        # Keep results server-side, the session only carries the request id
+        get_result_store().put(filter_request.id, profile_service.hydrate_matches(matches, stats))
+        session['last_request_id'] = filter_request.id
         
-        return jsonify({
+        response = {
             'success': True,
             'request_id': filter_request.id,
             'cached': False,
-            'result_count': len(filtered_profiles)
-        })
+            'result_count': len(matches)
+        }
+        if wants_stats():
+            response['stats'] = stats.to_dict()
+        return jsonify(response)
             
     except Exception as e:
         logger.error(f"Error in filter_profiles: {str(e)}")
         return jsonify({'error': 'An error occurred while processing your request'}), 500
 
+@app.route('/filter/batch', methods=['POST'])
+def filter_profiles_batch():
+    """
+    Run many searches at once. Expects a JSON body
+    {"specs": [{"company": ..., "linkedin_url": ..., "job_title": ...}, ...]}
+    and returns one request id per spec, in order.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        specs = payload.get('specs')
+        
+        if not isinstance(specs, list) or not specs:
+            return jsonify({'error': 'specs must be a non-empty list'}), 400
+        if len(specs) > MAX_BATCH_SPECS:
+            return jsonify({'error': f'At most {MAX_BATCH_SPECS} specs per batch'}), 400
+        
+        normalized_specs = []
+        for index, spec in enumerate(specs):
+            if not isinstance(spec, dict):
+                return jsonify({'error': f'Spec {index} must be an object'}), 400
+            company = str(spec.get('company') or spec.get('base_company') or '').strip()
+            if not company:
+                return jsonify({'error': f'Spec {index}: company is required'}), 400
+            normalized_specs.append((company,
+                                     str(spec.get('linkedin_url') or '').strip(),
+                                     str(spec.get('job_title') or '').strip()))
+        
+        # Pin one dataset for the whole batch
+        profile_service = get_profile_store().get_service()
+        cache_keys = [FilterRequest.build_cache_key(company, None, linkedin_url or None, job_title or None,
+                                                    profile_service.dataset_version)
+                      for company, linkedin_url, job_title in normalized_specs]
+        stats = FilterStats()
+        with stats.stage('cache_lookup'):
+            cached_requests = FilterRequest.find_cached_requests(cache_keys)
+        
+        filter_requests = [
+            FilterRequest(
+                base_company=company,
+                linkedin_url=linkedin_url or None,
+                job_title=job_title or None,
+                status='completed',
+                completed_at=datetime.utcnow(),
+                cache_key=cache_key
+            )
+            for (company, linkedin_url, job_title), cache_key in zip(normalized_specs, cache_keys)
+        ]
+        
+        # Evaluate the uncached specs together
+        uncached = [filter_request for filter_request in filter_requests
+                    if filter_request.cache_key not in cached_requests]
+        batch_matches = profile_service.match_profiles_batch(
+            [filter_request.match_query() for filter_request in uncached], stats=stats
+        )
+        for filter_request, matches in zip(uncached, batch_matches):
+            filter_request.set_matches(matches, profile_service)
+        for filter_request in filter_requests:
+            if filter_request.cache_key in cached_requests:
+                filter_request.copy_results_from(cached_requests[filter_request.cache_key])
+        
+        FilterRequest.bulk_insert(filter_requests)
+        db.session.commit()
+        
+        logger.info(f"Batch filter: {len(filter_requests)} specs, {len(filter_requests) - len(uncached)} cached")
+        response = {
+            'success': True,
+            'results': [
+                {
+                    'company': filter_request.base_company,
+                    'linkedin_url': filter_request.linkedin_url,
+                    'job_title': filter_request.job_title,
+                    'request_id': filter_request.id,
+                    'cached': filter_request.cache_key in cached_requests,
+                    'result_count': filter_request.result_count
+                }
+                for filter_request in filter_requests
+            ]
+        }
+        if wants_stats(payload):
+            response['stats'] = stats.to_dict()
+        return jsonify(response)
+        
+    except BatchUnavailable as e:
+        logger.error(f"Rejected batch: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Batch search is unavailable for the loaded dataset'}), 503
+    except Exception as e:
+        logger.error(f"Error in filter_profiles_batch: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'An error occurred while processing your request'}), 500
+
 @app.route('/check_status/<int:request_id>')
 def check_status(request_id):
     """Check the status of a filter request"""
     try:
-        filter_request = FilterRequest.query.get_or_404(request_id)
+        filter_request = db.session.get(FilterRequest, request_id)
+        if filter_request is None:
+            return jsonify({'error': 'Request not found'}), 404
         
         # Since CSV processing is immediate, all requests should be completed
         return jsonify({
             'status': filter_request.status,
-            'result_count': filter_request.result_count or 0
+            'result_count': filter_request.count_results() if filter_request.status == 'completed' else 0
         })
         
     except Exception as e:
@@ -121,38 +238,238 @@ def results(request_id):
         if filter_request.status != 'completed':
             return redirect(url_for('index'))
         
-        # Get results from session first, fallback to database
-        results_data = session.get(f'results_{request_id}')
-        if not results_data:
-            results_data = filter_request.get_results()
-        
+        # Profiles are loaded page by page from /api/results
         return render_template('results.html', 
                              filter_request=filter_request,
-                             profiles=results_data,
-                             total_count=len(results_data))
+                             total_count=filter_request.count_results(),
+                             page_size=DEFAULT_PAGE_SIZE)
                              
     except Exception as e:
         logger.error(f"Error displaying results: {str(e)}")
         return redirect(url_for('index'))
 
+def parse_page_args():
+    """
+    Read offset, limit (max 100), sort (one of SORT_FIELDS), order (asc/desc)
+    and fields (comma-separated projection) from the query string.
+    Raises ValueError with a message for the client on invalid values.
+    """
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    sort = request.args.get('sort', '').strip()
+    order = request.args.get('order', 'asc').strip().lower()
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'offset must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}')
+    if sort and sort not in SORT_FIELDS:
+        raise ValueError(f'sort must be one of: {", ".join(SORT_FIELDS)}')
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    
+    return offset, limit, sort, order == 'desc', fields
+
+@app.route('/api/results/<int:request_id>')
+def api_results(request_id):
+    """Paginated results as JSON, see parse_page_args for the query parameters"""
+    try:
+        filter_request = db.session.get(FilterRequest, request_id)
+        if filter_request is None:
+            return jsonify({'error': 'Request not found'}), 404
+        
+        if filter_request.status != 'completed':
+            return jsonify({'error': 'Results not ready'}), 400
+        
+        try:
+            offset, limit, sort, descending, fields = parse_page_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results_data = get_result_store().get_or_load(filter_request)
+        total = len(results_data)
+        page = page_results(results_data, offset, limit, sort, descending, fields)
+        
+        return jsonify({
+            'request_id': request_id,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if offset + limit < total else None,
+            'results': page
+        })
+        
+    except Exception as e:
+        logger.error(f"Error loading results page: {str(e)}")
+        return jsonify({'error': 'Error loading results'}), 500
+
+@app.route('/api/results/<int:request_id>/rank')
+def api_rank_results(request_id):
+    """
+    Results matching a job title category (category=...) or custom title
+    (title=...), ranked by title relevance. Returns the ranked result indices
+    (positions in /api/results order) and one page of the ranked profiles;
+    paging, tie order (sort) and projection work as for /api/results.
+    """
+    try:
+        filter_request = db.session.get(FilterRequest, request_id)
+        if filter_request is None:
+            return jsonify({'error': 'Request not found'}), 404
+        
+        if filter_request.status != 'completed':
+            return jsonify({'error': 'Results not ready'}), 400
+        
+        try:
+            offset, limit, sort, descending, fields = parse_page_args()
+            category, expanded_titles = resolve_titles(request.args.get('category', '').strip(),
+                                                       request.args.get('title', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        store = get_result_store()
+        results_data = store.get_or_load(filter_request)
+        features = store.get_derived(filter_request, 'title_features', TitleFeatures.from_results)
+        
+        tie_order = np.array(sort_order(results_data, sort, descending), dtype=np.int64) if sort else None
+        ranked, scores = rank_results(features, expanded_titles, tie_order)
+        total = len(ranked)
+        
+        return jsonify({
+            'request_id': request_id,
+            'category': category,
+            'titles': expanded_titles,
+            'total': total,
+            'ids': ranked.tolist(),
+            'scores': scores.tolist(),
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if offset + limit < total else None,
+            'results': project([results_data[index] for index in ranked[offset:offset + limit].tolist()], fields)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error ranking results: {str(e)}")
+        return jsonify({'error': 'Error ranking results'}), 500
+
+@app.route('/api/explain')
+def api_explain():
+    """
+    Why a profile is or is not in a search's results. Takes profile_url and
+    either request_id (explain a stored request's search) or company_name,
+    linkedin_url and job_title. Returns each row with that profile URL and
+    the outcome of every filter step for it.
+    """
+    try:
+        profile_url = request.args.get('profile_url', '').strip()
+        if not profile_url:
+            return jsonify({'error': 'profile_url is required'}), 400
+        
+        request_id = request.args.get('request_id', type=int)
+        if request_id is not None:
+            filter_request = db.session.get(FilterRequest, request_id)
+            if filter_request is None:
+                return jsonify({'error': 'Request not found'}), 404
+            company_name, linkedin_url, job_title = filter_request.match_query()
+        else:
+            company_name = request.args.get('company_name', '')
+            linkedin_url = request.args.get('linkedin_url', '')
+            job_title = request.args.get('job_title', '')
+        
+        profile_service = get_profile_store().get_service()
+        query = FilterQuery(company_name, linkedin_url, job_title)
+        profiles = profile_service.explain(query, profile_url)
+        if not profiles:
+            return jsonify({'error': 'Profile not found'}), 404
+        
+        return jsonify({
+            'dataset_version': profile_service.dataset_version,
+            'query': {
+                'company_name': query.input_company,
+                'linkedin_url': query.normalized_linkedin,
+                'job_title': query.input_title,
+                'expanded_titles': list(query.expanded_titles)
+            },
+            'profiles': profiles
+        })
+        
+    except Exception as e:
+        logger.error(f"Error explaining profile: {str(e)}")
+        return jsonify({'error': 'Error explaining profile'}), 500
+
+@app.route('/api/categories')
+def api_categories():
+    """
+    Profiles per job title category, from the precomputed category bitmaps.
+    Counts every profile, or with company_name and/or linkedin_url the
+    de-duplicated profiles matching that company.
+    """
+    try:
+        company_name = request.args.get('company_name', '')
+        linkedin_url = request.args.get('linkedin_url', '')
+        
+        profile_service = get_profile_store().get_service()
+        query = FilterQuery(company_name, linkedin_url)
+        profile_ids = None if query.is_empty else [match[0] for match in profile_service.match_query(query)]
+        counts = profile_service.category_counts(profile_ids)
+        if not counts:
+            return jsonify({'error': 'Category counts are not available for this dataset'}), 503
+        
+        return jsonify({
+            'dataset_version': profile_service.dataset_version,
+            'query': {
+                'company_name': query.input_company,
+                'linkedin_url': query.normalized_linkedin
+            },
+            'profiles': profile_service.live_profile_count if profile_ids is None else len(profile_ids),
+            'categories': counts
+        })
+        
+    except Exception as e:
+        logger.error(f"Error counting title categories: {str(e)}")
+        return jsonify({'error': 'Error counting title categories'}), 500
+
+@app.route('/metrics')
+def metrics():
+    """Filter stage timings and counts of this worker process in the Prometheus text format"""
+    return Response(get_filter_metrics().render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/download/<int:request_id>')
 def download_results(request_id):
-    """Download results as JSON file"""
+    """
+    Stream results as a file download.
+    format: json (default, pretty-printed), ndjson or csv (one row per
+    experience entry). Compressed with gzip/deflate when the client accepts it,
+    or as forced by compress=gzip|deflate|none.
+    """
     try:
-        filter_request = FilterRequest.query.get_or_404(request_id)
+        filter_request = db.session.get(FilterRequest, request_id)
+        if filter_request is None:
+            return jsonify({'error': 'Request not found'}), 404
         
         if filter_request.status != 'completed':
             return jsonify({'error': 'Results not ready'}), 400
         
-        # Get results from session first, fallback to database
-        results_data = session.get(f'results_{request_id}')
-        if not results_data:
-            results_data = filter_request.get_results()
+        export_format = request.args.get('format', 'json').strip().lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        
+        compression = request.args.get('compress', '').strip().lower()
+        if not compression:
+            compression = request.accept_encodings.best_match(list(COMPRESSIONS))
+        elif compression == 'none':
+            compression = None
+        elif compression not in COMPRESSIONS:
+            return jsonify({'error': f'compress must be one of: {", ".join(COMPRESSIONS)}, none'}), 400
+        
+        # Results are produced one profile at a time while the response is sent
+        profiles = get_result_store().iter_results(filter_request)
+        mimetype, extension = EXPORT_FORMATS[export_format]
         
-        # Create response
-        response = make_response(json.dumps(results_data, indent=2))
-        response.headers['Content-Type'] = 'application/json'
-        response.headers['Content-Disposition'] = f'attachment; filename=matched_profiles_{request_id}.json'
+        response = Response(stream_with_context(iter_export(profiles, export_format, compression)),
+                            mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename=matched_profiles_{request_id}.{extension}'
+        response.headers['Vary'] = 'Accept-Encoding'
+        if compression:
+            response.headers['Content-Encoding'] = compression
         
         return response
         
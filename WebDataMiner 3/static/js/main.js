@@ -143,11 +143,21 @@ function isValidLinkedInUrl(url) {
     return url.toLowerCase().includes('linkedin.com');
 }
 
-// Sanitize HTML to prevent XSS
+// Escape text for HTML element content and quoted attribute values
+const HTML_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'};
+
 function sanitizeHtml(str) {
-    const div = document.createElement('div');
-    div.textContent = str;
-    return div.innerHTML;
+    return String(str ?? '').replace(/[&<>"']/g, char => HTML_ESCAPES[char]);
+}
+
+// Return url if it is an absolute http(s) URL, otherwise fallback
+function safeUrl(url, fallback = '') {
+    try {
+        const parsed = new URL(url);
+        return parsed.protocol === 'http:' || parsed.protocol === 'https:' ? parsed.href : fallback;
+    } catch (_) {
+        return fallback;
+    }
 }
 
 // Debounce function for search inputs
@@ -350,6 +360,7 @@ window.AppUtils = {
     isValidUrl,
     isValidLinkedInUrl,
     sanitizeHtml,
+    safeUrl,
     debounce,
     copyToClipboard,
     downloadJSON,
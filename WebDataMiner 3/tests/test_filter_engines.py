@@ -0,0 +1,147 @@
+"""
+Every filter engine returns exactly what the reference filter_records
+returns over the same rows, for randomized queries over a generated dataset.
+"""
+
+import random
+
+import pytest
+
+import parallel_filter
+from benchmarks.generate_profiles import ANCHOR_COMPANIES, FREE_TITLES, generate_profiles
+from csv_data_service import CSVDataService
+from filter_engine import TITLE_CATEGORIES, filter_records, parse_value
+from profile_ingest import ingest_profiles
+from profile_snapshot import compile_snapshot
+from profile_store import ProfileStore
+
+PROFILE_COUNT = 3000
+QUERY_COUNT = 120
+SEED = 11
+
+
+def company_variants(name, rng):
+    return [name, name.lower(), f" {name.upper()} ", name[:rng.randint(1, max(len(name), 1))]]
+
+
+def linkedin_variants(url):
+    return [url, url.rstrip("/") + "/", url.replace("https://www.", "")] if url else [""]
+
+
+def random_queries(records, rng, count):
+    """(company, LinkedIn URL, job title) queries built from companies and company URLs found in records"""
+    companies = [name for name, _ in ANCHOR_COMPANIES] + ["", "none", "a"]
+    linkedin_urls = [f"linkedin.com/company/{slug}" for _, slug in ANCHOR_COMPANIES] + ["", "company/none"]
+    # Company and LinkedIn URL of the same position, for searches that need both to match
+    pairs = [(name, f"linkedin.com/company/{slug}") for name, slug in ANCHOR_COMPANIES]
+    for record in rng.sample(records, 40):
+        current_company = parse_value(record["current_company"])
+        experiences = parse_value(record["experience"])
+        positions = [(record["current_company_name"], record["company_linkedin_link"])]
+        if isinstance(current_company, dict):
+            positions.append((current_company.get("name"), current_company.get("link")))
+        if isinstance(experiences, list):
+            positions += [(entry.get("company"), entry.get("url") or entry.get("company_linkedin_url"))
+                          for entry in experiences]
+        name, url = rng.choice(positions)
+        name, url = str(name or ""), str(url or "")
+        companies += company_variants(name, rng)
+        linkedin_urls += linkedin_variants(url)
+        pairs += [(company, linkedin_url) for company in company_variants(name, rng)[:2]
+                  for linkedin_url in linkedin_variants(url)]
+
+    titles = ["", "", "zzz"] + list(FREE_TITLES)
+    for category, category_titles in TITLE_CATEGORIES.items():
+        titles += [category, rng.choice(category_titles), rng.choice(category_titles).upper()]
+
+    queries = [("", "", "")]
+    while len(queries) < count:
+        roll = rng.random()
+        if roll < 0.4:
+            company, linkedin_url = rng.choice(pairs)
+        else:
+            company, linkedin_url = rng.choice(companies), rng.choice(linkedin_urls) if roll < 0.55 else ""
+        queries.append((company, linkedin_url, rng.choice(titles) if rng.random() < 0.6 else ""))
+    return queries
+
+
+def ingested_profiles(records, rng):
+    """Downloaded profiles updating some base rows and adding new ones, some URLs more than once"""
+    profiles = []
+    for index, record in enumerate(rng.sample(records, 300)):
+        current_company = parse_value(record["current_company"])
+        current_company = dict(current_company) if isinstance(current_company, dict) else {}
+        if rng.random() < 0.5:
+            name, slug = rng.choice(ANCHOR_COMPANIES)
+            current_company.update(name=name, link=f"https://www.linkedin.com/company/{slug}")
+        if rng.random() < 0.5:
+            current_company["title"] = rng.choice(rng.choice(list(TITLE_CATEGORIES.values()))).title()
+        experiences = parse_value(record["experience"])
+        url = record["url"] if index % 3 else f"https://www.linkedin.com/in/ingested-{index % 40}"
+        profiles.append({
+            "name": record["name"],
+            "url": url,
+            "city": record["city"],
+            "position": record["position"],
+            "current_company": current_company,
+            "experience": experiences if isinstance(experiences, list) else [],
+        })
+    return profiles
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    return generate_profiles(PROFILE_COUNT, str(tmp_path_factory.mktemp("profiles") / "profiles.csv"), seed=SEED)
+
+
+@pytest.fixture(scope="module")
+def datasets(csv_path):
+    """Services over the generated CSV: parsed, from its snapshot, and with ingested profiles"""
+    parsed = CSVDataService(csv_path, use_snapshot=False)
+    compile_snapshot(csv_path)
+    store = ProfileStore(csv_path, check_interval=0)
+    snapshot = store.get_service()
+
+    rng = random.Random(SEED)
+    profiles = ingested_profiles(parsed.get_records(), rng)
+    ingest_profiles(profiles[:200], store)
+    ingest_profiles(profiles[100:], store)
+    delta = store.get_service()
+    assert delta.snapshot is not None and len(delta.delta.segments) > 0 and len(delta.delta.replaced) > 0
+
+    yield {"csv": parsed, "snapshot": snapshot, "delta": delta}
+    if parallel_filter._pool is not None:
+        parallel_filter._pool.close()
+        parallel_filter._pool = None
+
+
+@pytest.fixture(scope="module")
+def queries(datasets):
+    return random_queries(datasets["csv"].get_records(), random.Random(SEED), QUERY_COUNT)
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    monkeypatch.setattr(parallel_filter, "FILTER_WORKERS", 2)
+    monkeypatch.setattr(parallel_filter, "FILTER_PARALLEL_MIN_PROFILES", 0)
+
+
+@pytest.mark.parametrize("dataset,engine", [
+    ("csv", "loop"), ("csv", "vectorized"),
+    ("snapshot", "loop"), ("snapshot", "vectorized"), ("snapshot", "sharded"),
+    ("delta", "loop"), ("delta", "vectorized"), ("delta", "sharded"),
+])
+def test_engine_matches_reference(request, datasets, queries, dataset, engine):
+    service = datasets[dataset]
+    if engine == "sharded":
+        request.getfixturevalue("sharded")
+        assert parallel_filter.use_parallel(service)
+
+    records = list(service.iter_records())
+    differences = []
+    for query in queries:
+        expected = filter_records(records, *query)
+        results = service.filter_profiles(*query, engine="loop" if engine == "sharded" else engine)
+        if results != expected:
+            differences.append((query, len(results), len(expected)))
+    assert differences == []
@@ -0,0 +1,61 @@
+import csv
+
+import pytest
+
+from benchmarks.generate_profiles import generate_profiles
+from filter_engine import api_profile_record
+from profile_ingest import ingest_profiles
+from profile_snapshot import compile_snapshot
+from profile_store import ProfileStore
+
+PROFILE = {
+    "name": "Ada Example",
+    "url": "https://www.linkedin.com/in/ada-example/",
+    "city": "London, England, United Kingdom",
+    "position": "CEO at Kast",
+    "avatar": None,
+    "current_company": {"name": "Kast", "title": "CEO", "link": "https://www.linkedin.com/company/kast", "id": None},
+    "experience": [{"company": "Kast", "title": "CEO", "url": "https://www.linkedin.com/company/kast",
+                    "start_date": "2021", "end_date": "Present"}],
+}
+SPARSE_PROFILE = {"name": "Bo Sparse", "url": "https://www.linkedin.com/in/bo-sparse", "city": None,
+                  "current_company": {}, "experience": []}
+
+
+def append_csv_row(csv_path, profile):
+    """
+    Append a downloaded profile to the CSV the way the dataset stores it:
+    current_company as downloaded and experience as Python reprs, empty
+    values as empty cells
+    """
+    row = dict(api_profile_record(profile), current_company=profile["current_company"])
+    row = {column: (repr(value) if value else "") if isinstance(value, (dict, list)) else value or ""
+           for column, value in row.items()}
+    with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+        csv.DictWriter(f, fieldnames=list(row)).writerow(row)
+
+
+@pytest.fixture(params=["snapshot", "csv"])
+def store(request, tmp_path):
+    csv_path = generate_profiles(200, str(tmp_path / "profiles.csv"), seed=5)
+    append_csv_row(csv_path, PROFILE)
+    append_csv_row(csv_path, SPARSE_PROFILE)
+    if request.param == "snapshot":
+        compile_snapshot(csv_path)
+    return ProfileStore(csv_path, check_interval=0)
+
+
+def test_reingesting_unchanged_base_profile_is_noop(store):
+    stats = ingest_profiles([PROFILE, SPARSE_PROFILE], store)
+
+    assert stats == {"added": 0, "updated": 0, "unchanged": 2, "skipped": 0}
+    assert store.ingest_log.size() == 0
+    assert store.get_service().delta is None
+
+
+def test_changed_base_profile_is_updated(store):
+    changed = dict(PROFILE, current_company=dict(PROFILE["current_company"], title="Chairman"))
+
+    assert ingest_profiles([changed], store)["updated"] == 1
+    assert ingest_profiles([changed], store)["unchanged"] == 1
+    assert store.get_service().live_profile_count == 202
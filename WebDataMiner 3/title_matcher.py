@@ -0,0 +1,43 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List
+
+
+class TitleMatcher(list):
+    """
+    Expanded job titles plus one compiled alternation that checks all of them
+    in a single pass over a string.
+
+    Behaves like the plain list of titles it replaces, so existing callers that
+    iterate, log or test membership keep working. matches(text) is equivalent
+    to any(title in text.lower() for title in titles).
+    """
+
+    def __init__(self, titles: Iterable[str]):
+        super().__init__(titles)
+        # Longest first so the automaton prefers the most specific title; any
+        # alternative matching anywhere is all the caller cares about
+        ordered = sorted(set(self), key=len, reverse=True)
+        encoded = [re.escape(title.encode('utf-8')) for title in ordered if "\x00" not in title]
+        self.pattern = re.compile("|".join(re.escape(title) for title in ordered)) if ordered else None
+        self.bytes_pattern = re.compile(b"|".join(encoded)) if encoded else None
+
+    @classmethod
+    def of(cls, titles: List[str]) -> "TitleMatcher":
+        """Reuse an existing matcher or compile one for a plain list"""
+        if isinstance(titles, cls):
+            return titles
+        return cls(titles)
+
+    def matches_lower(self, text_lower: str) -> bool:
+        """Check an already lower-cased string"""
+        return self.pattern is not None and self.pattern.search(text_lower) is not None
+
+    def matches(self, text: str) -> bool:
+        return self.matches_lower(text.lower())
+
+
+@lru_cache(maxsize=256)
+def compile_titles(titles: tuple) -> TitleMatcher:
+    """Shared, cached matcher for a fixed tuple of titles (one per category)"""
+    return TitleMatcher(titles)
@@ -0,0 +1,89 @@
+"""
+Job title relevance ranking for stored result sets.
+
+Scores follow the results page's original client-side ranking: for every
+expanded title, 100 if a profile's displayed or current title equals it, 80 if
+one starts with it and 60 if one contains it. Profiles scoring 0 are dropped
+and the rest are ordered by score, ties keeping their original order.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from filter_engine import TITLE_CATEGORIES, expand_job_title, title_category
+
+EXACT_SCORE = 100
+PREFIX_SCORE = 80
+CONTAINS_SCORE = 60
+
+
+class TitleFeatures:
+    """
+    Lower-cased (displayed title, current title) pairs for a result set.
+    Many profiles share the same pair, so they are stored once and each result
+    keeps the id of its pair; scoring then runs once per distinct pair.
+    """
+
+    def __init__(self, pairs: List[Tuple[str, str]], pair_ids: np.ndarray):
+        self.pairs = pairs
+        self.pair_ids = pair_ids
+
+    @classmethod
+    def from_results(cls, results: List[Dict[str, Any]]) -> "TitleFeatures":
+        pair_index: Dict[Tuple[str, str], int] = {}
+        pair_ids = np.fromiter(
+            (pair_index.setdefault(((profile.get("matched_job_title") or profile.get("position") or "").lower(),
+                                    (profile.get("title") or "").lower()), len(pair_index))
+             for profile in results),
+            dtype=np.int32, count=len(results))
+        return cls(list(pair_index), pair_ids)
+
+    def __len__(self) -> int:
+        return len(self.pair_ids)
+
+    def scores(self, expanded_titles: Sequence[str]) -> np.ndarray:
+        """Relevance score of every result for the expanded titles"""
+        pair_scores = np.fromiter((score_titles(title, current_title, expanded_titles)
+                                   for title, current_title in self.pairs),
+                                  dtype=np.int64, count=len(self.pairs))
+        return pair_scores[self.pair_ids]
+
+
+def score_titles(title: str, current_title: str, expanded_titles: Sequence[str]) -> int:
+    score = 0
+    for category_title in expanded_titles:
+        if title == category_title or current_title == category_title:
+            score += EXACT_SCORE
+        elif title.startswith(category_title) or current_title.startswith(category_title):
+            score += PREFIX_SCORE
+        elif category_title in title or category_title in current_title:
+            score += CONTAINS_SCORE
+    return score
+
+
+def resolve_titles(category: str = "", title: str = "") -> Tuple[Optional[str], List[str]]:
+    """
+    Expanded titles to rank by: a custom title is expanded to its category (or
+    used as-is), otherwise the named category's titles. Returns the category
+    too, or None when the custom title matched no category.
+    """
+    if title.strip():
+        return title_category(title.lower().strip()), list(expand_job_title(title))
+    if category in TITLE_CATEGORIES:
+        return category, list(TITLE_CATEGORIES[category])
+    raise ValueError(f"Unknown job title category: {category}")
+
+
+def rank_results(features: TitleFeatures, expanded_titles: Sequence[str],
+                 order: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of the results scoring above zero, highest score first, and their
+    scores. Ties keep the order given by order (default: stored order).
+    """
+    scores = features.scores(expanded_titles)
+    if order is None:
+        order = np.arange(len(features))
+    order = order[scores[order] > 0]
+    ranked = order[np.argsort(-scores[order], kind='stable')]
+    return ranked, scores[ranked]
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Columnar implementation of the profile filter in filter_engine.
+
+Instead of walking every profile dict, each filter step is evaluated for the
+whole dataset at once as a boolean mask over the precomputed ProfileColumns
+and ExperienceTable. Only the profiles that survive the masks are touched in
+Python, so query cost follows the number of matches rather than dataset size.
+
+Run this module directly to check that both engines return identical results:
+    python vectorized_filter.py [csv_file_path]
+"""
+
+import json
+import logging
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from columnar import StringColumn
+from filter_engine import (EXECUTIVE_DISPLAY_TITLE, EXECUTIVE_TITLES, FilterQuery, Match, category_bit,
+                           title_matches_any)
+from filter_stats import FilterStats
+from profile_columns import ExperienceTable, ProfileColumns
+from title_matcher import TitleMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class VectorizedFilterEngine:
+    """Evaluates the five-step profile filter as column scans and boolean masks"""
+
+    def __init__(self, profile_columns: ProfileColumns, experience_table: ExperienceTable):
+        self.profiles = profile_columns
+        self.experience = experience_table
+        self.size = len(profile_columns)
+
+    def _mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _category_bit(self, query: FilterQuery) -> Optional[int]:
+        """Bit of the query's title category if both tables have current category bitmaps"""
+        if self.experience.title_category_bits is None or self.profiles.current_title_category_bits is None:
+            return None
+        if self.experience.title_categories != self.profiles.title_categories:
+            return None
+        return category_bit(self.profiles.title_categories, query.title_category)
+
+    def _title_mask(self, column: StringColumn, matcher: TitleMatcher) -> np.ndarray:
+        """Profiles whose non-empty value in column contains any expanded title"""
+        return self._mask(column.match_rows(matcher)) & self._mask(column.non_empty_rows())
+
+    def match(self, query: FilterQuery, stats: Optional[FilterStats] = None) -> List[Match]:
+        """
+        Return (profile id, display title, executive inference) for every
+        profile passing the filter, in profile order and before de-duplication.
+        Same matches as filter_engine.iter_matches; the query must not be empty.
+        Step timings and counts are added to stats if given.
+        """
+        if stats is None:
+            stats = FilterStats()
+
+        input_company = query.input_company
+        normalized_linkedin = query.normalized_linkedin
+        expanded_titles = query.expanded_titles
+        profiles = self.profiles
+        size = self.size
+
+        # Steps 1-3: company matching
+        experience_titles = {}
+        experience_match = np.zeros(size, dtype=bool)
+        current_company_match = np.zeros(size, dtype=bool)
+        current_name_match = np.zeros(size, dtype=bool)
+
+        if input_company and normalized_linkedin:
+            with stats.stage("experience_match"):
+                experience_titles = self.experience.first_company_match(input_company, normalized_linkedin)
+                experience_match[list(experience_titles)] = True
+            with stats.stage("current_company_match"):
+                current_company_match = (~experience_match
+                                         & self._mask(profiles.company_name_lower.contains_rows(input_company))
+                                         & self._mask(profiles.company_linkedin.contains_rows(normalized_linkedin)))
+        elif input_company:
+            with stats.stage("name_match"):
+                current_name_match = self._mask(profiles.company_name_lower.contains_rows(input_company))
+
+        if not input_company and not normalized_linkedin:
+            has_company_match = np.ones(size, dtype=bool)
+        else:
+            has_company_match = experience_match | current_company_match | current_name_match
+
+        # Job title filter using expanded categories
+        bit = self._category_bit(query)
+        with stats.stage("title_match"):
+            if bit is not None:
+                # A whole category: read the precomputed bitmaps, and only look up
+                # the experience title of candidates that need it
+                current_title_hit = (profiles.current_title_category_bits & bit) != 0
+                experience_title_hit = (profiles.experience_category_bits & bit) != 0
+                position_hit = ((profiles.position_category_bits & bit) != 0) & profiles.has_position
+                candidates = has_company_match & (current_title_hit | experience_title_hit | position_hit)
+                experience_title_matches = self.experience.first_category_match(
+                    bit, np.flatnonzero(candidates & ~current_title_hit & experience_title_hit))
+            elif expanded_titles:
+                matcher = TitleMatcher.of(expanded_titles)
+                current_title_hit = self._title_mask(profiles.current_title_lower, matcher)
+                experience_title_matches = self.experience.first_title_match(expanded_titles)
+                experience_title_hit = np.zeros(size, dtype=bool)
+                experience_title_hit[list(experience_title_matches)] = True
+                position_hit = self._title_mask(profiles.position_lower, matcher) & profiles.has_position
+                candidates = has_company_match & (current_title_hit | experience_title_hit | position_hit)
+            else:
+                current_title_hit = experience_title_hit = position_hit = None
+                experience_title_matches = {}
+                candidates = has_company_match
+
+        is_executive_search = any(title in EXECUTIVE_TITLES for title in expanded_titles)
+
+        # Steps 4-5 only run for the surviving candidates
+        with stats.stage("final_title"):
+            matches: List[Match] = []
+            for profile_id in np.flatnonzero(candidates).tolist():
+                current_title = profiles.current_title[profile_id]
+
+                matched_job_title = ""
+                if expanded_titles:
+                    if current_title_hit[profile_id]:
+                        matched_job_title = current_title
+                    elif experience_title_hit[profile_id]:
+                        matched_job_title = experience_title_matches[profile_id]
+                    else:
+                        matched_job_title = profiles.position[profile_id]
+
+                if current_company_match[profile_id] or current_name_match[profile_id]:
+                    display_title = current_title
+                elif experience_match[profile_id]:
+                    display_title = experience_titles[profile_id]
+                elif matched_job_title:
+                    display_title = matched_job_title
+                else:
+                    display_title = current_title
+
+                executive_role_inference = False
+                if expanded_titles and display_title:
+                    if not title_matches_any(display_title, expanded_titles):
+                        continue
+                elif expanded_titles:
+                    if not (is_executive_search and (experience_match[profile_id] or current_company_match[profile_id])):
+                        continue
+                    executive_role_inference = True
+                    display_title = EXECUTIVE_DISPLAY_TITLE
+
+                matches.append((profile_id, display_title, executive_role_inference))
+
+        stats.add_count("profiles", size)
+        stats.add_count("experience_match", int(experience_match.sum()))
+        stats.add_count("current_company_match", int(current_company_match.sum()))
+        stats.add_count("name_match", int(current_name_match.sum()))
+        stats.add_count("company_match", int(has_company_match.sum()))
+        stats.add_count("title_match", int(candidates.sum()))
+        stats.add_count("final_title", len(matches))
+        return matches
+
+
+def compare_engines(csv_file_path: str, queries: Optional[List[Tuple[str, str, str]]] = None) -> bool:
+    """Run the same queries through both engines and report any difference"""
+    from csv_data_service import CSVDataService
+
+    queries = queries or [
+        ("kast", "linkedin.com/company/kast", ""),
+        ("kast", "https://www.linkedin.com/company/kastofficial/", ""),
+        ("abound", "", ""),
+        ("abound", "", "director"),
+        ("kast", "linkedin.com/company/kast", "ceo"),
+        ("", "", "ceo"),
+        ("", "", "manager"),
+        ("", "", "data"),
+    ]
+
+    service = CSVDataService(csv_file_path)
+    identical = True
+    for company, linkedin, title in queries:
+        loop_results = json.dumps(service.filter_profiles(company, linkedin, title, engine="loop"), default=str)
+        vector_results = json.dumps(service.filter_profiles(company, linkedin, title, engine="vectorized"), default=str)
+        same = loop_results == vector_results
+        identical = identical and same
+        print(f"{'OK  ' if same else 'DIFF'} company={company!r} linkedin={linkedin!r} title={title!r}")
+    return identical
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    from csv_data_service import DEFAULT_CSV_PATH
+
+    sys.exit(0 if compare_engines(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV_PATH) else 1)